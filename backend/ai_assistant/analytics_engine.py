@@ -0,0 +1,330 @@
+"""
+Declarative analytics queries behind ANALYZE_DATA.
+
+A query names an entity, the metrics to compute, the dimensions to group by
+and an optional time bucket:
+
+    run_query(user, 'contract', metrics=['sum_amount', 'count'],
+              group_by=['industry'], bucket='quarter', date_field='start_date')
+
+and is answered by one GROUP BY query scoped to the user's organization.
+Dimensions, metrics and date fields are whitelisted per entity (ENTITIES):
+nothing the model asks for reaches .filter()/.values() unchecked. Queries
+that only need counts/amounts of contracts or tasks per status and creation
+month are read from the rollup table (core.models.AnalyticsRollup) instead
+of the rows.
+
+chart_action() turns a result into the UI_CHART action rendered by the chat.
+"""
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from django.db import models
+from django.db.models import Count, Sum, Avg, Min, Max, Q
+from django.db.models.functions import TruncDay, TruncWeek, TruncMonth, TruncQuarter, TruncYear
+from django.utils import timezone
+from core.models import AnalyticsRollup
+from crm.models import Space, Contact, Contract, Meeting
+from tasks.models import Task
+from ai_assistant.utils.periods import range_filter
+
+MAX_ROWS = 200
+MAX_SERIES = 8 # Lines/bars per chart when a time bucket is split by a dimension
+
+ENTITIES = {
+    'contract': {
+        'model': Contract,
+        'label': 'contrats',
+        'rollup': 'contract', # AnalyticsRollup.kind
+        'date_fields': ('start_date', 'end_date', 'created_at'), # The first one is the default
+        'dimensions': {
+            'status': 'status',
+            'space': 'space__name',
+            'industry': 'space__industry',
+            'created_by': 'created_by__username',
+        },
+        'metrics': {
+            'count': Count('pk'),
+            'sum_amount': Sum('amount'),
+            'avg_amount': Avg('amount'),
+            'min_amount': Min('amount'),
+            'max_amount': Max('amount'),
+        },
+    },
+    'task': {
+        'model': Task,
+        'label': 'tâches',
+        'rollup': 'task',
+        'date_fields': ('due_date', 'created_at'),
+        'dimensions': {
+            'status': 'status',
+            'priority': 'priority',
+            'space': 'space__name',
+            'industry': 'space__industry',
+            'assigned_to': 'assigned_to__username',
+        },
+        'metrics': {'count': Count('pk')},
+    },
+    'meeting': {
+        'model': Meeting,
+        'label': 'réunions',
+        'date_fields': ('date', 'created_at'),
+        'dimensions': {
+            'type': 'type',
+            'space': 'space__name',
+            'industry': 'space__industry',
+            'contract': 'contract__title',
+        },
+        'metrics': {'count': Count('pk')},
+    },
+    'space': {
+        'model': Space,
+        'label': 'espaces',
+        'date_fields': ('created_at',),
+        'dimensions': {
+            'industry': 'industry',
+            'size': 'size',
+            'type': 'type__name',
+        },
+        'metrics': {'count': Count('pk')},
+    },
+    'contact': {
+        'model': Contact,
+        'label': 'contacts',
+        'date_fields': ('created_at',),
+        'dimensions': {
+            'space': 'space__name',
+            'industry': 'space__industry',
+            'position': 'position',
+        },
+        'metrics': {'count': Count('pk')},
+    },
+}
+
+FILTER_ALIASES = {'space_name': 'space'}
+
+BUCKETS = {
+    'day': TruncDay,
+    'week': TruncWeek,
+    'month': TruncMonth,
+    'quarter': TruncQuarter,
+    'year': TruncYear,
+}
+
+# What AnalyticsRollup (contracts/tasks per creation month and status) can answer
+ROLLUP_METRICS = {'count': Sum('count'), 'sum_amount': Sum('amount')}
+ROLLUP_BUCKETS = (None, 'month', 'quarter', 'year')
+ROLLUP_PERIODS = (None, 'all_time', 'this_month', 'last_month', 'this_year') # Whole months only
+
+METRIC_LABELS = {
+    'count': 'Nombre',
+    'sum_amount': 'Montant total',
+    'avg_amount': 'Montant moyen',
+    'min_amount': 'Montant minimum',
+    'max_amount': 'Montant maximum',
+}
+
+MONTHS_FR = {
+    1: 'Janv', 2: 'Févr', 3: 'Mars', 4: 'Avr', 5: 'Mai', 6: 'Juin',
+    7: 'Juil', 8: 'Août', 9: 'Sept', 10: 'Oct', 11: 'Nov', 12: 'Déc'
+}
+
+UNDEFINED = "Non défini"
+
+
+def _choose(value, allowed, what):
+    if value not in allowed:
+        raise ValueError(f"{what} inconnu(e) '{value}'. Valeurs possibles : {', '.join(str(a) for a in allowed if a)}")
+    return value
+
+
+def build_filters(spec, filters):
+    """Q of the filters ({dimension: value or [values]}), whitelisted dimensions only."""
+    condition = Q()
+    for name, value in (filters or {}).items():
+        if value in (None, '', 'any') or value == []:
+            continue
+        name = FILTER_ALIASES.get(name, name)
+        lookup = spec['dimensions'][_choose(name, spec['dimensions'], "Filtre")]
+        if isinstance(value, (list, tuple)):
+            condition &= Q(**{f"{lookup}__in": value})
+        elif name == 'space':
+            # An id, or part of the name
+            try:
+                condition &= Q(space_id=uuid.UUID(str(value)))
+            except ValueError:
+                condition &= Q(space__name__icontains=value)
+        else:
+            condition &= Q(**{f"{lookup}__iexact": value})
+    return condition
+
+
+def _uses_rollup(spec, metrics, group_by, bucket, date_field, time_period, filters):
+    if 'rollup' not in spec or not set(metrics) <= set(ROLLUP_METRICS):
+        return False
+    if not set(group_by) <= {'status'} or not {FILTER_ALIASES.get(name, name) for name in filters or {}} <= {'status'}:
+        return False
+    if bucket is None and time_period in (None, 'all_time'):
+        return True # No date involved
+    return date_field == 'created_at' and bucket in ROLLUP_BUCKETS and time_period in ROLLUP_PERIODS
+
+
+def _period_label(value, bucket):
+    if isinstance(value, datetime):
+        value = timezone.localtime(value) if timezone.is_aware(value) else value
+        value = value.date()
+    if bucket == 'year':
+        return str(value.year)
+    if bucket == 'quarter':
+        return f"T{(value.month - 1) // 3 + 1} {value.year}"
+    if bucket == 'month':
+        return f"{MONTHS_FR[value.month]} {value.year}"
+    if bucket == 'week':
+        return f"Sem. {value.isocalendar()[1]} {value.isocalendar()[0]}"
+    return value.strftime('%d/%m/%Y')
+
+
+def run_query(user, entity, metrics=None, group_by=None, bucket=None, date_field=None,
+              time_period=None, filters=None, order='default', limit=MAX_ROWS):
+    """
+    Runs one aggregate query. Raises ValueError (French message) on anything
+    outside the whitelists. Returns:
+    {'entity', 'metrics', 'group_by', 'bucket', 'date_field', 'time_period',
+     'source': 'table' | 'rollup', 'rows': [{dimension: value, 'period': label, metric: value}]}
+    order: 'default' (by period, or by the first metric descending), or a metric name.
+    """
+    spec = ENTITIES[_choose(entity, ENTITIES, "Entité")]
+    metrics = [_choose(metric, spec['metrics'], "Métrique") for metric in (metrics or ['count'])]
+    group_by = [_choose(name, spec['dimensions'], "Dimension") for name in (group_by or [])]
+    if bucket is not None:
+        _choose(bucket, BUCKETS, "Intervalle")
+    date_field = _choose(date_field or spec['date_fields'][0], spec['date_fields'], "Champ date")
+    condition = build_filters(spec, filters)
+    limit = min(limit or MAX_ROWS, MAX_ROWS)
+
+    source = 'rollup' if _uses_rollup(spec, metrics, group_by, bucket, date_field, time_period, filters) else 'table'
+    if source == 'rollup':
+        queryset = AnalyticsRollup.objects.filter(organization_id=user.organization_id, kind=spec['rollup'])
+        if time_period:
+            queryset = queryset.filter(**range_filter('month', time_period, date_only=True))
+        # The rollup filters are on status, as its column
+        queryset = queryset.filter(condition)
+        lookups = {name: 'status' for name in group_by}
+        aggregates = {f"m_{metric}": ROLLUP_METRICS[metric] for metric in set(metrics) | {'count'}}
+        bucket_field = 'month'
+    else:
+        queryset = spec['model'].objects.filter(organization_id=user.organization_id).filter(condition)
+        if time_period:
+            date_only = not isinstance(spec['model']._meta.get_field(date_field), models.DateTimeField)
+            queryset = queryset.filter(**range_filter(date_field, time_period, date_only=date_only))
+        lookups = {name: spec['dimensions'][name] for name in group_by}
+        aggregates = {f"m_{metric}": spec['metrics'][metric] for metric in metrics}
+        bucket_field = date_field
+
+    if not group_by and bucket is None:
+        totals = queryset.aggregate(**aggregates)
+        rows = [{metric: totals[f"m_{metric}"] or 0 for metric in metrics}]
+    else:
+        values = list(dict.fromkeys(lookups.values()))
+        if bucket is not None:
+            queryset = queryset.filter(**{f"{bucket_field}__isnull": False}).annotate(period=BUCKETS[bucket](bucket_field))
+            values.append('period')
+        queryset = queryset.values(*values).annotate(**aggregates)
+        if source == 'rollup':
+            # Rows of rollups whose contracts/tasks all moved away
+            queryset = queryset.filter(m_count__gt=0)
+        if bucket is not None and order == 'default':
+            queryset = queryset.order_by('period', *lookups.values())
+        else:
+            metric = metrics[0] if order == 'default' else _choose(order, metrics, "Tri")
+            queryset = queryset.order_by(f"-m_{metric}", *lookups.values())
+
+        rows = []
+        for row in queryset[:limit]:
+            item = {name: row[lookup] if row[lookup] not in (None, '') else UNDEFINED for name, lookup in lookups.items()}
+            if bucket is not None:
+                item['period'] = _period_label(row['period'], bucket)
+            item.update({metric: row[f"m_{metric}"] or 0 for metric in metrics})
+            rows.append(item)
+
+    return {
+        'entity': entity,
+        'metrics': metrics,
+        'group_by': group_by,
+        'bucket': bucket,
+        'date_field': date_field,
+        'time_period': time_period,
+        'source': source,
+        'rows': rows,
+    }
+
+
+def _number(value):
+    # JSON-safe (the action is stored on the Message)
+    if isinstance(value, Decimal):
+        return round(float(value), 2)
+    return value
+
+
+def format_value(metric, value):
+    if metric == 'count':
+        return str(value)
+    return f"{Decimal(value or 0):.2f} €"
+
+
+def describe(result):
+    """Text of a result, one line per row."""
+    label = ENTITIES[result['entity']]['label']
+    by = [*result['group_by'], *(['période'] if result['bucket'] else [])]
+    lines = [f"Analyse des {label}" + (f" par {', '.join(by)}" if by else "") + f" ({result['time_period'] or 'tout le temps'}) :"]
+    if not result['rows']:
+        lines.append("Aucune donnée.")
+    for row in result['rows']:
+        keys = [str(row[name]) for name in result['group_by']] + ([row['period']] if result['bucket'] else [])
+        metrics = ", ".join(f"{METRIC_LABELS[m]} : {format_value(m, row[m])}" for m in result['metrics'])
+        lines.append(f"- {' / '.join(keys)} : {metrics}" if keys else f"- {metrics}")
+    return "\n".join(lines)
+
+
+def chart_action(result, chart_type=None, title=None):
+    """
+    UI_CHART action of a result:
+    {'type': 'UI_CHART', 'chart_type', 'title', 'data': [{'name': x, <series>: y}],
+     'dataKeys': {'x': 'name', 'y': <first series>}, 'series': [...], 'labels': {series: label}}
+    A time bucket split by one dimension gives one series per dimension value,
+    otherwise each metric is a series.
+    """
+    rows = result['rows']
+    group_by, bucket = result['group_by'], result['bucket']
+    metric = result['metrics'][0]
+
+    if bucket and group_by:
+        data, series = {}, []
+        for row in rows:
+            key = " / ".join(str(row[name]) for name in group_by)
+            if key not in series:
+                if len(series) >= MAX_SERIES:
+                    continue
+                series.append(key)
+            data.setdefault(row['period'], {'name': row['period']})[key] = _number(row[metric])
+        data = list(data.values())
+        labels = {key: key for key in series}
+    else:
+        series = result['metrics']
+        labels = {key: METRIC_LABELS[key] for key in series}
+        data = []
+        for row in rows:
+            name = row['period'] if bucket else " / ".join(str(row[key]) for key in group_by) or METRIC_LABELS[metric]
+            data.append({'name': name, **{key: _number(row[key]) for key in series}})
+
+    by = [*group_by, *([bucket] if bucket else [])]
+    return {
+        'type': 'UI_CHART',
+        'chart_type': chart_type or ('line' if bucket else 'bar'),
+        'title': title or f"{METRIC_LABELS[metric]} des {ENTITIES[result['entity']]['label']}" + (f" par {', '.join(by)}" if by else ""),
+        'description': result['time_period'] if result['time_period'] not in (None, 'all_time') else None,
+        'data': data,
+        'dataKeys': {'x': 'name', 'y': series[0] if series else metric},
+        'series': series,
+        'labels': labels,
+    }
@@ -0,0 +1,98 @@
+import math
+import time
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+class Command(BaseCommand):
+    help = 'Load-tests the chat pipeline (ChatView -> run_agent -> tools/LLM) and reports requests/s, TTFT and tail latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000', help='Backend base URL')
+        parser.add_argument('--username', help='Account used to obtain a JWT')
+        parser.add_argument('--password', help='Password of --username')
+        parser.add_argument('--token', help='Existing JWT access token (skips login)')
+        parser.add_argument('--requests', type=int, default=100, help='Total chat requests to send')
+        parser.add_argument('--concurrency', type=int, default=8, help='Concurrent clients')
+        parser.add_argument('--message', action='append', help='User message to send (repeat to rotate several)')
+        parser.add_argument('--timeout', type=float, default=60.0, help='Per-request timeout in seconds')
+
+    def handle(self, *args, **options):
+        base_url = options['url'].rstrip('/')
+        token = options['token'] or self._login(base_url, options['username'], options['password'])
+        messages = options['message'] or ["Quelles sont mes tâches urgentes ?"]
+        total = options['requests']
+
+        self.stdout.write(f"Sending {total} chat requests to {base_url} with concurrency {options['concurrency']}...")
+
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            samples = list(executor.map(
+                lambda i: self._send(base_url, token, messages[i % len(messages)], options['timeout']),
+                range(total)
+            ))
+        elapsed = time.monotonic() - start
+
+        ok = [s for s in samples if s['ok']]
+        errors = [s for s in samples if not s['ok']]
+        latencies = [s['latency'] * 1000 for s in ok]
+        ttfts = [s['ttft'] * 1000 for s in ok]
+
+        self.stdout.write(f"Completed: {len(ok)}/{total} in {elapsed:.2f}s ({len(errors)} errors)")
+        self.stdout.write(f"Throughput: {len(ok) / elapsed if elapsed else 0:.2f} requests/s")
+        if ok:
+            self.stdout.write(
+                f"TTFT (ms): mean {statistics.mean(ttfts):.1f} | p50 {percentile(ttfts, 50):.1f} | "
+                f"p95 {percentile(ttfts, 95):.1f} | p99 {percentile(ttfts, 99):.1f}"
+            )
+            self.stdout.write(
+                f"Latency (ms): mean {statistics.mean(latencies):.1f} | p50 {percentile(latencies, 50):.1f} | "
+                f"p90 {percentile(latencies, 90):.1f} | p95 {percentile(latencies, 95):.1f} | "
+                f"p99 {percentile(latencies, 99):.1f} | max {max(latencies):.1f}"
+            )
+        for sample in errors[:5]:
+            self.stdout.write(self.style.WARNING(f"Error: {sample['error']}"))
+
+    def _login(self, base_url, username, password):
+        if not username or not password:
+            raise CommandError("Provide --token or --username/--password.")
+        response = requests.post(f"{base_url}/api/auth/token/", json={'username': username, 'password': password}, timeout=30)
+        if response.status_code != 200:
+            raise CommandError(f"Authentication failed ({response.status_code}): {response.text[:200]}")
+        return response.json()['access']
+
+    def _send(self, base_url, token, message, timeout):
+        """
+        Sends one chat request and measures time to first body byte (TTFT)
+        and total latency. Tool answers are plain JSON, so TTFT == latency.
+        """
+        start = time.monotonic()
+        ttft = None
+        try:
+            response = requests.post(
+                f"{base_url}/api/ai/chat/",
+                json={'messages': [{'role': 'user', 'content': message}]},
+                headers={'Authorization': f"Bearer {token}"},
+                stream=True,
+                timeout=timeout,
+            )
+            for chunk in response.iter_content(chunk_size=None):
+                if chunk and ttft is None:
+                    ttft = time.monotonic() - start
+            latency = time.monotonic() - start
+            if response.status_code >= 400:
+                return {'ok': False, 'error': f"HTTP {response.status_code}"}
+            return {'ok': True, 'ttft': ttft if ttft is not None else latency, 'latency': latency}
+        except requests.RequestException as e:
+            return {'ok': False, 'error': str(e)}
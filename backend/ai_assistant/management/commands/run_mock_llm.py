@@ -0,0 +1,51 @@
+import json
+from django.core.management.base import BaseCommand, CommandError
+from ai_assistant.mock_llm import MockLLMServer
+
+class Command(BaseCommand):
+    help = 'Runs a local deterministic OpenAI-compatible LLM stand-in (chat/completions + embeddings) for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--latency', type=float, default=0.2, help='Seconds before the first token (TTFT)')
+        parser.add_argument('--token-rate', type=float, default=50.0, help='Streamed tokens per second (0 = no throttling)')
+        parser.add_argument('--reply-tokens', type=int, default=40, help='Length of generated replies in tokens')
+        parser.add_argument('--embedding-dim', type=int, default=1536, help='Dimension of returned embeddings')
+        parser.add_argument('--script', help='JSON file with scripted rules: [{"match": "regex", "tool_calls": [{"name": "CREATE_TASK", "arguments": {...}}]}, {"match": "regex", "reply": "..."}]')
+
+    def handle(self, *args, **options):
+        script = []
+        if options['script']:
+            try:
+                with open(options['script']) as f:
+                    script = json.load(f)
+            except (OSError, json.JSONDecodeError) as e:
+                raise CommandError(f"Invalid script file: {e}")
+            if isinstance(script, dict):
+                script = script.get('rules', [])
+
+        server = MockLLMServer(
+            host=options['host'],
+            port=options['port'],
+            latency=options['latency'],
+            token_rate=options['token_rate'],
+            reply_tokens=options['reply_tokens'],
+            embedding_dim=options['embedding_dim'],
+            script=script,
+        )
+
+        try:
+            server.bind()
+        except OSError as e:
+            raise CommandError(f"Cannot listen on {options['host']}:{options['port']}: {e}")
+
+        # The bound port: --port 0 picks a free one
+        base_url = f"http://{options['host']}:{server.port}/v1"
+        self.stdout.write(f"Mock LLM running on {base_url} ({len(script)} scripted rules)")
+        self.stdout.write(f"Point the backend at it with: AI_PROVIDER=openai AI_API_KEY=mock AI_BASE_URL={base_url} AI_EMBEDDING_BASE_URL={base_url} OPENIA_API_KEY_CMS_PERSO=mock")
+
+        try:
+            server.run()
+        except KeyboardInterrupt:
+            self.stdout.write("Mock LLM stopped.")
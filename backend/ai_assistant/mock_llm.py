@@ -0,0 +1,256 @@
+import re
+import json
+import time
+import uuid
+import base64
+import struct
+import random
+import hashlib
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger("mock_llm")
+
+# Vocabulary used to build deterministic replies
+WORDS = (
+    "le client souhaite valider le contrat avant la fin du mois et planifier une réunion "
+    "de suivi avec l'équipe projet afin de préparer la livraison des prochaines tâches"
+).split()
+
+
+class MockLLMServer:
+    """
+    Deterministic stand-in for an OpenAI-compatible provider.
+
+    Speaks /v1/chat/completions (plain, streaming and tool calls) and
+    /v1/embeddings so the whole AI stack can run offline by pointing
+    AI_CONF['BASE_URL'] (and AI_CONF['EMBEDDING_BASE_URL']) at it.
+
+    - latency: seconds waited before the first token (TTFT)
+    - token_rate: tokens per second once streaming (0 = as fast as possible)
+    - script: list of rules {"match": regex, "tool_calls": [...]} or
+      {"match": regex, "reply": text}, checked against the last user message
+    """
+
+    def __init__(self, host='127.0.0.1', port=8765, latency=0.0, token_rate=0.0,
+                 reply_tokens=40, embedding_dim=1536, script=None, model='mock-llm'):
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.token_rate = token_rate
+        self.reply_tokens = reply_tokens
+        self.embedding_dim = embedding_dim
+        self.script = script or []
+        self.model = model
+        self.httpd = None
+
+    # --- Behaviour ---
+
+    def match_rule(self, messages, tools_offered):
+        """
+        Returns the first script rule matching the last user message.
+        Tool rules only apply when tools are offered and the model is not
+        already looking at tool results, so agent loops always terminate.
+        """
+        last_user_msg = next((m.get('content') or '' for m in reversed(messages) if m.get('role') == 'user'), '')
+        answering_tools = bool(messages) and messages[-1].get('role') == 'tool'
+
+        for rule in self.script:
+            if not re.search(rule.get('match', '.*'), last_user_msg, re.IGNORECASE):
+                continue
+            if rule.get('tool_calls'):
+                if not tools_offered or answering_tools:
+                    continue
+            return rule
+        return None
+
+    def build_reply(self, messages):
+        """Deterministic text derived from the conversation."""
+        seed = hashlib.sha256(json.dumps(messages, sort_keys=True, default=str).encode()).hexdigest()
+        rng = random.Random(seed)
+        return " ".join(rng.choice(WORDS) for _ in range(self.reply_tokens))
+
+    def embed(self, text):
+        """Deterministic unit vector derived from the text."""
+        rng = random.Random(hashlib.sha256(text.encode()).hexdigest())
+        vector = [rng.uniform(-1, 1) for _ in range(self.embedding_dim)]
+        norm = sum(v * v for v in vector) ** 0.5 or 1.0
+        return [v / norm for v in vector]
+
+    def completion_plan(self, payload):
+        """Returns (content, tool_calls) for a chat/completions payload."""
+        messages = payload.get('messages', [])
+        rule = self.match_rule(messages, bool(payload.get('tools')))
+
+        if rule and rule.get('tool_calls'):
+            digest = hashlib.sha256(json.dumps(messages, sort_keys=True, default=str).encode()).hexdigest()
+            tool_calls = [
+                {
+                    "id": f"call_{digest[:12]}_{index}",
+                    "type": "function",
+                    "function": {
+                        "name": call['name'],
+                        "arguments": json.dumps(call.get('arguments', {}), ensure_ascii=False)
+                    }
+                }
+                for index, call in enumerate(rule['tool_calls'])
+            ]
+            return None, tool_calls
+
+        if rule and rule.get('reply'):
+            return rule['reply'], None
+        return self.build_reply(messages), None
+
+    # --- Server ---
+
+    def bind(self):
+        """Opens the listening socket (port=0 picks a free port)."""
+        self.httpd = ThreadingHTTPServer((self.host, self.port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        return self.port
+
+    def run(self):
+        if self.httpd is None:
+            self.bind()
+        logger.info(f"Mock LLM listening on http://{self.host}:{self.port}/v1")
+        try:
+            self.httpd.serve_forever()
+        finally:
+            self.httpd.server_close()
+
+    def shutdown(self):
+        if self.httpd:
+            self.httpd.shutdown()
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.0'
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+            def _send_json(self, status, body):
+                data = json.dumps(body, ensure_ascii=False).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _read_json(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                raw = self.rfile.read(length) if length else b'{}'
+                return json.loads(raw or b'{}')
+
+            def do_GET(self):
+                if self.path.rstrip('/').endswith('/models'):
+                    return self._send_json(200, {
+                        "object": "list",
+                        "data": [{"id": server.model, "object": "model", "owned_by": "mock"}]
+                    })
+                self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+            def do_POST(self):
+                try:
+                    payload = self._read_json()
+                except json.JSONDecodeError:
+                    return self._send_json(400, {"error": {"message": "Invalid JSON body"}})
+
+                path = self.path.split('?')[0].rstrip('/')
+                if path.endswith('/chat/completions'):
+                    return self._chat(payload)
+                if path.endswith('/embeddings'):
+                    return self._embeddings(payload)
+                self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+            def _chat(self, payload):
+                content, tool_calls = server.completion_plan(payload)
+                completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+                model = payload.get('model') or server.model
+                created = int(time.time())
+                finish_reason = 'tool_calls' if tool_calls else 'stop'
+                prompt_tokens = sum(len(str(m.get('content') or '').split()) for m in payload.get('messages', []))
+
+                if server.latency:
+                    time.sleep(server.latency)
+
+                if not payload.get('stream'):
+                    if content and server.token_rate:
+                        time.sleep(len(content.split()) / server.token_rate)
+                    message = {"role": "assistant", "content": content}
+                    if tool_calls:
+                        message["tool_calls"] = tool_calls
+                    return self._send_json(200, {
+                        "id": completion_id,
+                        "object": "chat.completion",
+                        "created": created,
+                        "model": model,
+                        "choices": [{"index": 0, "message": message, "finish_reason": finish_reason}],
+                        "usage": {
+                            "prompt_tokens": prompt_tokens,
+                            "completion_tokens": len((content or '').split()),
+                            "total_tokens": prompt_tokens + len((content or '').split())
+                        }
+                    })
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/event-stream')
+                self.send_header('Cache-Control', 'no-cache')
+                self.end_headers()
+
+                def send_chunk(delta, finish=None):
+                    chunk = {
+                        "id": completion_id,
+                        "object": "chat.completion.chunk",
+                        "created": created,
+                        "model": model,
+                        "choices": [{"index": 0, "delta": delta, "finish_reason": finish}]
+                    }
+                    self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode('utf-8'))
+                    self.wfile.flush()
+
+                try:
+                    send_chunk({"role": "assistant", "content": ""})
+                    if tool_calls:
+                        send_chunk({"tool_calls": [dict(call, index=i) for i, call in enumerate(tool_calls)]})
+                    else:
+                        for i, word in enumerate(content.split()):
+                            if i and server.token_rate:
+                                time.sleep(1.0 / server.token_rate)
+                            send_chunk({"content": word if i == 0 else f" {word}"})
+                    send_chunk({}, finish=finish_reason)
+                    self.wfile.write(b"data: [DONE]\n\n")
+                    self.wfile.flush()
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def _embeddings(self, payload):
+                inputs = payload.get('input', [])
+                if isinstance(inputs, str):
+                    inputs = [inputs]
+
+                if server.latency:
+                    time.sleep(server.latency)
+
+                data = []
+                for index, text in enumerate(inputs):
+                    vector = server.embed(str(text))
+                    if payload.get('encoding_format') == 'base64':
+                        # The official SDK requests base64-packed float32 by default
+                        embedding = base64.b64encode(struct.pack(f'<{len(vector)}f', *vector)).decode('ascii')
+                    else:
+                        embedding = vector
+                    data.append({"object": "embedding", "index": index, "embedding": embedding})
+
+                tokens = sum(len(str(t).split()) for t in inputs)
+                self._send_json(200, {
+                    "object": "list",
+                    "data": data,
+                    "model": payload.get('model') or server.model,
+                    "usage": {"prompt_tokens": tokens, "total_tokens": tokens}
+                })
+
+        return Handler
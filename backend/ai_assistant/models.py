@@ -10,6 +10,12 @@ class Conversation(models.Model):
     title = models.CharField(max_length=255, blank=True, null=True)
     summary = models.TextField(blank=True, null=True) # Long-term memory
 
+    class Meta:
+        indexes = [
+            # Keyset pages of the history (core/pagination.py)
+            models.Index(fields=['user', 'updated_at', 'id'], name='conversation_user_updated_idx'),
+        ]
+
     def __str__(self):
         return f"{self.user} - {self.created_at}"
 
@@ -29,6 +35,9 @@ class Message(models.Model):
 
     class Meta:
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['conversation', 'created_at', 'id'], name='message_conv_created_idx'),
+        ]
 
     def __str__(self):
         return f"{self.role}: {self.content[:50]}..."
@@ -236,15 +236,33 @@ TOOLS_SCHEMA = [
         "type": "function",
         "function": {
             "name": "ANALYZE_DATA",
-            "description": "Analyze CRM data (counts, sums, stats).",
+            "description": "Analyze CRM data (counts, sums, averages), optionally grouped by dimensions and/or time buckets, answered with a chart. E.g. 'revenue by industry per quarter': entity_type=contract, metrics=[sum_amount], group_by=[industry], time_bucket=quarter.",
             "parameters": {
                 "type": "object",
                 "properties": {
                     "entity_type": {"type": "string", "enum": ["space", "contact", "contract", "meeting", "task"]},
-                    "metric": {"type": "string", "enum": ["count", "sum_amount", "top_clients_revenue", "top_clients_activity"]},
-                    "time_period": {"type": "string", "enum": ["this_month", "last_month", "this_year", "all_time"]}
+                    "metric": {"type": "string", "enum": ["count", "sum_amount", "avg_amount", "min_amount", "max_amount", "urgent_tasks", "top_clients_revenue", "top_clients_activity"]},
+                    "metrics": {
+                        "type": "array",
+                        "items": {"type": "string", "enum": ["count", "sum_amount", "avg_amount", "min_amount", "max_amount"]},
+                        "description": "Several metrics computed together (amounts: contracts only)"
+                    },
+                    "group_by": {
+                        "type": "array",
+                        "items": {"type": "string", "enum": ["status", "priority", "type", "space", "industry", "size", "position", "assigned_to", "created_by", "contract"]},
+                        "description": "contract: status, space, industry, created_by. task: status, priority, space, industry, assigned_to. meeting: type, space, industry, contract. space: industry, size, type. contact: space, industry, position"
+                    },
+                    "time_bucket": {"type": "string", "enum": ["day", "week", "month", "quarter", "year"]},
+                    "date_field": {
+                        "type": "string",
+                        "enum": ["start_date", "end_date", "due_date", "date", "created_at"],
+                        "description": "Date used by time_period/time_bucket. Defaults: contract start_date, task due_date, meeting date, others created_at"
+                    },
+                    "time_period": {"type": "string", "enum": ["today", "this_week", "this_month", "last_month", "this_year", "all_time"]},
+                    "filters": {"type": "object", "description": "Dimension values, e.g. {\"status\": \"signed\"}"},
+                    "chart_type": {"type": "string", "enum": ["bar", "line", "pie", "area"]}
                 },
-                "required": ["entity_type", "metric"]
+                "required": ["entity_type"]
             }
         }
     },
@@ -1,13 +1,11 @@
 import os
 import json
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
 from datetime import datetime
-try:
-    import google.generativeai as genai
-except ImportError:
-    genai = None
-
-from openai import OpenAI
+from crum import impersonate
 from django.conf import settings
+from django.db import connection
 from .rag import RAGService
 from .tools.crm import CRMTools
 from .tools.tasks import TaskTools
@@ -15,11 +13,21 @@ from .tools.meetings import MeetingTools
 from .tools.analytics import AnalyticsTools
 from .tools.content import ContentTools
 from .tools.email_tools import EmailTools
-from .tools.email_tools import EmailTools
 from .tools.vision import VisionTools
 from .prompt_schemas import TOOLS_SCHEMA
+from core.lazy import LazyImport
+
+# The SDKs are only imported when a completion is requested
+OpenAI = LazyImport('openai', 'OpenAI')
+genai = LazyImport('google.generativeai')
 
 class LLMService:
+    # Tools without side effects: safe to run again when a call times out
+    READ_ONLY_TOOLS = frozenset({
+        'GET_COMPANY_DETAILS', 'LIST_MEETINGS', 'LIST_TASKS', 'ANALYZE_DATA', 'DRAFT_CONTENT',
+        'ASK_USER', 'ANALYZE_IMAGE', 'SEARCH_KNOWLEDGE_BASE',
+    })
+
     def __init__(self):
         self.conf = settings.AI_CONF
         self.provider = self.conf.get('PROVIDER', 'openai')
@@ -53,58 +61,71 @@ class LLMService:
         rag_context, rag_sources = RAGService.get_context(search_terms, user=user)
         
         # 2. Agentic Loop (Max 3 turns)
+        # Every tool call returned by a completion is executed in the same turn
+        # (independent ones in parallel). Results are fed back to the model as
+        # 'tool' messages so it can retry failed calls on the next turn.
         max_turns = 3
         current_turn = 0
-        
+        tool_history = []
+        completed = []
+        failed = []
+
         while current_turn < max_turns:
             current_turn += 1
-            
-            # Detect Intent
-            # Pass messages history if we are in a loop (conceptually), 
-            # but _detect_intent currently doesn't use it.
-            # We rely on updating 'last_user_msg' or 'rag_context' to carry error info.
-            intent = self._detect_intent(last_user_msg, page_context, rag_context, summary)
-            print(f"DEBUG: Turn {current_turn} - Detected Intent: {intent}")
-            
-            tool_name = intent.get('tool')
-            params = intent.get('params', {})
-            
+
+            intent = self._detect_intent(last_user_msg, page_context, rag_context, summary, history=tool_history)
+            calls = intent.get('calls')
+            if calls is None:
+                # Single-tool intents (e.g. mocked or legacy callers)
+                tool_name = intent.get('tool')
+                calls = [] if not tool_name or tool_name == 'SEARCH' else [
+                    {'id': None, 'tool': tool_name, 'params': intent.get('params', {})}
+                ]
+            print(f"DEBUG: Turn {current_turn} - Detected Tool Calls: {[c['tool'] for c in calls]}")
+
             # If no tool or standard SEARCH, break to normal chat
-            if not tool_name or tool_name == 'SEARCH':
+            if not calls:
                 break
-                
-            # Execute Tool
-            result = self._execute_tool(tool_name, params, last_user_msg, user, rag_context)
-            
-            # Handle RAG Search Refinement
-            if isinstance(result, dict) and result.get('type') == 'RAG_SEARCH':
-                 refined_query = result.get('query')
-                 rag_context, rag_sources = RAGService.get_context(refined_query, user=user)
-                 # Break to chat with new context
-                 break 
-            
-            # Handle Standard Tool Output
-            result_str = str(result)
-            
-            # CHECK FOR ERRORS (Self-Healing)
-            if result_str.startswith("Error"):
-                print(f"DEBUG: Tool Error detected: {result_str}")
-                # Inject Error back into context for next turn
-                # We update 'rag_context' to include the error, forcing the LLM to see it.
-                rag_context += f"\n\n[SYSTEM ERROR from {tool_name}]: {result_str}\n(Please analyze the error and TRY AGAIN with corrected parameters.)\n"
-                
-                # We do NOT break, we loop again.
+
+            # Execute Tools (independent calls run concurrently)
+            results = self._execute_tool_calls(calls, last_user_msg, user, rag_context)
+
+            failed = []
+            rag_query = None
+            for call, result in zip(calls, results):
+                # Handle RAG Search Refinement
+                if isinstance(result, dict) and result.get('type') == 'RAG_SEARCH':
+                    rag_query = result.get('query')
+                # CHECK FOR ERRORS (Self-Healing)
+                elif str(result).startswith("Error"):
+                    print(f"DEBUG: Tool Error detected: {result}")
+                    failed.append((call, result))
+                else:
+                    completed.append((call, result))
+
+            if rag_query:
+                rag_context, rag_sources = RAGService.get_context(rag_query, user=user)
+                for call, result in completed:
+                    rag_context += f"\n\n[RESULT from {call['tool']}]: {self._tool_result_text(result)}\n"
+                # Break to chat with new context
+                completed = []
+                break
+
+            if failed:
+                # Feed the calls and their results back so the model can TRY AGAIN
+                # with corrected parameters on the next turn.
+                tool_history.extend(self._tool_messages(intent, calls, results))
                 continue
-            
-            # If Success (no error string), we generally stop and return the result 
-            # OR we could let it chain. For now, let's treat tools as "One Shot or Retry".
-            # If tool returns a dict (e.g. NAVIGATE), return generally.
-            if isinstance(result, dict):
-                return result
-                
-            # If string success, return it wrapped
-            return {"content": result_str}
-            
+
+            return self._merge_tool_results(completed)
+
+        if completed:
+            # Keep what succeeded even if some calls never recovered
+            return self._merge_tool_results(completed + failed)
+
+        for call, result in failed:
+            rag_context += f"\n\n[SYSTEM ERROR from {call['tool']}]: {result}\n"
+
         # 4. Fallback to Chat (Streamable)
         chat_response = self.chat(messages, rag_context, stream=stream)
         return {
@@ -112,14 +133,149 @@ class LLMService:
             "sources": rag_sources
         }
 
+    def _execute_tool_calls(self, calls, raw_text, user=None, rag_context=""):
+        """
+        Executes a list of tool calls and returns their results in the same order.
+        A single call runs inline; several calls are scheduled in dependency
+        batches on a thread pool, each call bounded by AI_CONF['TOOL_TIMEOUT'].
+        A timed-out read-only call is an error the model may retry. A call
+        that writes keeps running and may still commit: it is reported as
+        still running, never as a failure, so the model does not repeat it.
+        """
+        if len(calls) == 1:
+            call = calls[0]
+            return [self._execute_tool(call['tool'], call['params'], raw_text, user, rag_context)]
 
+        timeout = self.conf.get('TOOL_TIMEOUT', 30)
+        max_workers = max(1, self.conf.get('TOOL_WORKERS', 4))
+        results = [None] * len(calls)
 
+        for batch in self._plan_tool_batches(calls):
+            # Chunk by pool size so every call of a chunk starts immediately
+            # and shares the same deadline.
+            for start in range(0, len(batch), max_workers):
+                chunk = batch[start:start + max_workers]
+                executor = ThreadPoolExecutor(max_workers=len(chunk))
+                futures = {
+                    index: executor.submit(self._run_tool_in_thread, calls[index], raw_text, user, rag_context)
+                    for index in chunk
+                }
+                deadline = time.monotonic() + timeout
+                for index, future in futures.items():
+                    try:
+                        results[index] = future.result(timeout=max(0, deadline - time.monotonic()))
+                    except FuturesTimeoutError:
+                        tool = calls[index]['tool']
+                        if tool in self.READ_ONLY_TOOLS:
+                            results[index] = f"Error executing tool {tool}: timed out after {timeout}s"
+                        else:
+                            results[index] = (
+                                f"{tool} est toujours en cours après {timeout}s et sera appliqué une fois terminé. "
+                                "Ne relancez pas cette action."
+                            )
+                    except Exception as e:
+                        results[index] = f"Error executing tool {calls[index]['tool']}: {str(e)}"
+                # Do not block on timed-out calls, they finish in the background
+                executor.shutdown(wait=False)
 
+        return results
 
-    def _detect_intent(self, query, page_context=None, rag_context="", summary=None):
+    def _run_tool_in_thread(self, call, raw_text, user=None, rag_context=""):
+        """
+        Worker wrapper: exposes the request user to signals (django-crum is
+        thread-local) and releases the thread's DB connection when done.
         """
-        Uses OpenAI Native Function Calling to detect which tool to use.
-        Returns a dict: {'tool': 'TOOL_NAME', 'params': {...}} or defaults to SEARCH.
+        try:
+            with impersonate(user):
+                return self._execute_tool(call['tool'], call['params'], raw_text, user, rag_context)
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _plan_tool_batches(calls):
+        """
+        Groups call indexes into batches that can run concurrently.
+        A call depends on an earlier CREATE_* call when one of its parameters
+        mentions the created entity (e.g. CREATE_COMPANY 'Acme' then
+        CREATE_MEETING with space_name 'Acme'), so it runs in a later batch.
+        """
+        levels = []
+        for index, call in enumerate(calls):
+            values = [str(v).lower() for v in call['params'].values() if isinstance(v, str) and v]
+            level = 0
+            for prev_index in range(index):
+                prev = calls[prev_index]
+                if not prev['tool'].startswith('CREATE_'):
+                    continue
+                created = str(prev['params'].get('name') or prev['params'].get('title') or '').lower()
+                if created and any(created in value for value in values):
+                    level = max(level, levels[prev_index] + 1)
+            levels.append(level)
+
+        return [
+            [index for index, level in enumerate(levels) if level == current]
+            for current in range(max(levels) + 1)
+        ] if levels else []
+
+    @staticmethod
+    def _tool_result_text(result):
+        if isinstance(result, dict):
+            return result.get('content') or result.get('message') or json.dumps(result, ensure_ascii=False, default=str)
+        return str(result)
+
+    def _tool_messages(self, intent, calls, results):
+        """
+        Builds the assistant 'tool_calls' message and one 'tool' message per result.
+        """
+        tool_calls = []
+        tool_results = []
+        for index, (call, result) in enumerate(zip(calls, results)):
+            call_id = call.get('id') or f"call_{index}"
+            tool_calls.append({
+                "id": call_id,
+                "type": "function",
+                "function": {
+                    "name": call['tool'],
+                    "arguments": json.dumps(call['params'], ensure_ascii=False)
+                }
+            })
+            tool_results.append({
+                "role": "tool",
+                "tool_call_id": call_id,
+                "content": self._tool_result_text(result)
+            })
+
+        return [{"role": "assistant", "content": intent.get('content') or None, "tool_calls": tool_calls}] + tool_results
+
+    def _merge_tool_results(self, results):
+        """
+        Combines tool outputs into a single agent response.
+        A lone result keeps its original shape; several results are joined into
+        one message carrying the first UI action found.
+        """
+        if len(results) == 1:
+            result = results[0][1]
+            if isinstance(result, dict):
+                return result
+            return {"content": str(result)}
+
+        lines = []
+        action = None
+        for call, result in results:
+            lines.append(self._tool_result_text(result))
+            if action is None and isinstance(result, dict):
+                action = result.get('action')
+                if not action and result.get('type') in ['UI_CHART', 'NAVIGATE', 'CHOICES']:
+                    action = result
+
+        return {"content": "\n".join(lines), "action": action}
+
+    def _detect_intent(self, query, page_context=None, rag_context="", summary=None, history=None):
+        """
+        Uses OpenAI Native Function Calling to detect which tools to use.
+        Returns a dict: {'tool': 'TOOL_NAME', 'params': {...}, 'calls': [...]} or defaults to SEARCH.
+        'calls' lists every tool call of the completion ({'id', 'tool', 'params'}).
+        'history' holds previous assistant tool_calls / tool result messages.
         """
         context_str = ""
         if page_context and page_context.get('path'):
@@ -172,6 +328,7 @@ class LLMService:
         INSTRUCTIONS:
         - Analyze the user request.
         - If a specific tool matches the request, CALL it.
+        - If the request contains several actions (e.g. create a task AND schedule a meeting), CALL every matching tool at once.
         - If the user's request is general or ambiguous, or simply asking for information found in RAG, DO NOT call a tool. Just return a normal message (which means we default to SEARCH/Chat).
         - If information is missing for a tool (e.g. creating a meeting without a date), DO NOT guess. You can ask the user by just responding with text.
         """
@@ -179,7 +336,7 @@ class LLMService:
         messages = [
             {'role': 'system', 'content': system_prompt},
             {'role': 'user', 'content': query}
-        ]
+        ] + (history or [])
         
         # If using OpenAI, we use the tools API
         if self.provider != 'gemini': 
@@ -201,12 +358,21 @@ class LLMService:
                 
                 # Check if tool_calls matches
                 if msg.tool_calls:
-                    tool_call = msg.tool_calls[0]
-                    # Map function name to our internal tool names
+                    # Map function names to our internal tool names
                     # Our schema names match exactly (CREATE_COMPANY etc)
+                    calls = [
+                        {
+                            "id": tool_call.id,
+                            "tool": tool_call.function.name,
+                            "params": json.loads(tool_call.function.arguments or '{}')
+                        }
+                        for tool_call in msg.tool_calls
+                    ]
                     return {
-                        "tool": tool_call.function.name,
-                        "params": json.loads(tool_call.function.arguments)
+                        "tool": calls[0]["tool"],
+                        "params": calls[0]["params"],
+                        "calls": calls,
+                        "content": msg.content
                     }
                 else:
                     # No tool called -> Default to SEARCH (Chat)
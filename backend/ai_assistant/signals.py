@@ -1,14 +1,15 @@
-from django.db.models.signals import post_save, post_delete
-from django.dispatch import receiver
+from types import SimpleNamespace
 from crm.models import Space, Contact, Contract, Meeting
 from tasks.models import Task
+from core import outbox
 from pages.models import Page
 from .vector_store import VectorStore
 from .rag import RAGService
 
-def update_vector_index(instance, type_name, text_content, title, organization_id):
+def update_vector_index(instance, type_name, text_content, title, organization_id, raise_errors=False):
     """
     Helper to update the vector index for a single instance.
+    raise_errors: let the outbox retry instead of only logging.
     """
     try:
         doc_id = f"{type_name}_{instance.id}"
@@ -28,8 +29,9 @@ def update_vector_index(instance, type_name, text_content, title, organization_i
         print(f"RAG Index Updated: {doc_id}")
     except Exception as e:
         print(f"Error updating RAG index for {type_name} {instance.id}: {e}")
+        if raise_errors: raise
 
-def delete_from_vector_index(instance, type_name):
+def delete_from_vector_index(instance, type_name, raise_errors=False):
     """
     Helper to delete from the vector index.
     """
@@ -39,61 +41,80 @@ def delete_from_vector_index(instance, type_name):
         print(f"RAG Index Deleted: {doc_id}")
     except Exception as e:
         print(f"Error deleting from RAG index for {type_name} {instance.id}: {e}")
+        if raise_errors: raise
 
-# --- Space ---
-@receiver(post_save, sender=Space)
-def index_space(sender, instance, **kwargs):
-    if not instance.organization: return
-    text = f"Space: {instance.name}\nIndustry: {instance.industry}\nSize: {instance.size}\nAddress: {instance.address}\nNotes: {instance.notes}"
-    update_vector_index(instance, "space", text, instance.name, instance.organization.id)
+def _space_text(instance):
+    return f"Space: {instance.name}\nIndustry: {instance.industry}\nSize: {instance.size}\nAddress: {instance.address}\nNotes: {instance.notes}"
 
-@receiver(post_delete, sender=Space)
-def delete_space_index(sender, instance, **kwargs):
-    delete_from_vector_index(instance, "space")
+def _contract_text(instance):
+    return f"Contract: {instance.title}\nSpace: {instance.space.name if instance.space else 'N/A'}\nStatus: {instance.status}\nAmount: {instance.amount}\nContent: {instance.extracted_text or ''}"
 
-# --- Contract ---
-@receiver(post_save, sender=Contract)
-def index_contract(sender, instance, **kwargs):
-    if not instance.organization: return
-    text = f"Contract: {instance.title}\nSpace: {instance.space.name if instance.space else 'N/A'}\nStatus: {instance.status}\nAmount: {instance.amount}\nContent: {instance.extracted_text or ''}"
-    update_vector_index(instance, "contract", text, instance.title, instance.organization.id)
+def _meeting_text(instance):
+    clean_notes = RAGService._parse_notes(instance.notes)
+    return f"Meeting: {instance.title}\nDate: {instance.date}\nSpace: {instance.space.name if instance.space else 'N/A'}\nNotes: {clean_notes}"
 
-@receiver(post_delete, sender=Contract)
-def delete_contract_index(sender, instance, **kwargs):
-    delete_from_vector_index(instance, "contract")
+def _task_text(instance):
+    assigned = instance.assigned_to.username if instance.assigned_to else 'Unassigned'
+    return f"Task: {instance.title}\nStatus: {instance.status}\nAssigned: {assigned}\nDescription: {instance.description}"
 
-# --- Meeting ---
-@receiver(post_save, sender=Meeting)
-def index_meeting(sender, instance, **kwargs):
-    if not instance.organization: return
-    clean_notes = RAGService._parse_notes(instance.notes)
-    text = f"Meeting: {instance.title}\nDate: {instance.date}\nSpace: {instance.space.name if instance.space else 'N/A'}\nNotes: {clean_notes}"
-    update_vector_index(instance, "meeting", text, instance.title, instance.organization.id)
+def _page_text(instance):
+    clean_content = RAGService._parse_notes(instance.content)
+    return f"Page: {instance.title}\nType: {instance.page_type}\nContent: {clean_content}"
 
-@receiver(post_delete, sender=Meeting)
-def delete_meeting_index(sender, instance, **kwargs):
-    delete_from_vector_index(instance, "meeting")
+# event model name -> (model, index type, text builder, title field)
+INDEXED_MODELS = {
+    'space': (Space, "space", _space_text, 'name'),
+    'contract': (Contract, "contract", _contract_text, 'title'),
+    'meeting': (Meeting, "meeting", _meeting_text, 'title'),
+    'task': (Task, "task", _task_text, 'title'),
+    'page': (Page, "page", _page_text, 'title'),
+}
 
-# --- Task ---
-@receiver(post_save, sender=Task)
-def index_task(sender, instance, **kwargs):
-    if not instance.organization: return
-    assigned = instance.assigned_to.username if instance.assigned_to else 'Unassigned'
-    text = f"Task: {instance.title}\nStatus: {instance.status}\nAssigned: {assigned}\nDescription: {instance.description}"
-    update_vector_index(instance, "task", text, instance.title, instance.organization.id)
+def index_tasks_bulk(instances, raise_errors=False):
+    """
+    Indexes a batch of tasks with a single embedding/upsert call.
+    """
+    instances = [instance for instance in instances if instance.organization_id]
+    if not instances: return
+    try:
+        texts, metadatas, ids = [], [], []
+        for instance in instances:
+            texts.append(_task_text(instance))
+            metadatas.append({
+                "type": "task",
+                "title": instance.title,
+                "id": str(instance.id),
+                "organization_id": str(instance.organization_id)
+            })
+            ids.append(f"task_{instance.id}")
 
-@receiver(post_delete, sender=Task)
-def delete_task_index(sender, instance, **kwargs):
-    delete_from_vector_index(instance, "task")
+        VectorStore.add_texts(texts=texts, metadatas=metadatas, ids=ids)
+        print(f"RAG Index Updated: {len(ids)} tasks")
+    except Exception as e:
+        print(f"Error updating RAG index for {len(instances)} tasks: {e}")
+        if raise_errors: raise
 
-# --- Page ---
-@receiver(post_save, sender=Page)
-def index_page(sender, instance, **kwargs):
-    if not instance.organization: return
-    clean_content = RAGService._parse_notes(instance.content)
-    text = f"Page: {instance.title}\nType: {instance.page_type}\nContent: {clean_content}"
-    update_vector_index(instance, "page", text, instance.title, instance.organization.id)
+@outbox.handler(
+    'ai.vector_index',
+    *[f"{name}.{action}" for name in INDEXED_MODELS for action in ('created', 'updated', 'deleted')],
+    'task.bulk_created'
+)
+def vector_index(event):
+    """
+    Keeps the RAG index in sync after commit. Upserts and deletes by id are
+    idempotent, so retries are safe.
+    """
+    if event.event_type == 'task.bulk_created':
+        tasks = Task.objects.filter(id__in=event.payload.get('ids', [])).select_related('assigned_to')
+        index_tasks_bulk(list(tasks), raise_errors=True)
+        return
+
+    name, action = event.event_type.split('.')
+    model, type_name, build_text, title_field = INDEXED_MODELS[name]
+    if action == 'deleted':
+        delete_from_vector_index(SimpleNamespace(id=event.payload['id']), type_name, raise_errors=True)
+        return
 
-@receiver(post_delete, sender=Page)
-def delete_page_index(sender, instance, **kwargs):
-    delete_from_vector_index(instance, "page")
+    instance = outbox.load_instance(event, model)
+    if not instance or not instance.organization_id: return
+    update_vector_index(instance, type_name, build_text(instance), getattr(instance, title_field), instance.organization_id, raise_errors=True)
@@ -0,0 +1,78 @@
+from datetime import date
+from decimal import Decimal
+from django.test import TestCase
+from django.contrib.auth import get_user_model
+from core.models import Organization
+from crm.models import Space, Contract
+from tasks.models import Task
+from ai_assistant import analytics_engine
+from ai_assistant.tools.analytics import AnalyticsTools
+
+User = get_user_model()
+
+class AnalyticsEngineTest(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="Org Engine")
+        self.user = User.objects.create_user(username='engine', email='engine@test.com', password='pw', organization=self.org)
+        tech = Space.objects.create(name="Tech Co", industry="Tech", organization=self.org)
+        retail = Space.objects.create(name="Shop", industry="Retail", organization=self.org)
+        for space, start, amount, status in [
+            (tech, date(2026, 1, 10), 100, 'signed'),
+            (tech, date(2026, 2, 10), 200, 'signed'),
+            (tech, date(2026, 4, 10), 50, 'draft'),
+            (retail, date(2026, 5, 1), 400, 'signed'),
+        ]:
+            Contract.objects.create(title="C", space=space, organization=self.org, start_date=start, amount=amount, status=status)
+        Task.objects.create(title="T", organization=self.org, status='done')
+
+        other = Organization.objects.create(name="Other")
+        Contract.objects.create(
+            title="Hidden", space=Space.objects.create(name="X", industry="Tech", organization=other),
+            organization=other, start_date=date(2026, 1, 1), amount=999, status='signed'
+        )
+
+    def test_revenue_by_industry_per_quarter_in_one_query(self):
+        with self.assertNumQueries(1):
+            result = analytics_engine.run_query(
+                self.user, 'contract', metrics=['sum_amount', 'count'], group_by=['industry'], bucket='quarter'
+            )
+        self.assertEqual(result['source'], 'table')
+        self.assertEqual(
+            [(row['period'], row['industry'], row['sum_amount'], row['count']) for row in result['rows']],
+            [('T1 2026', 'Tech', Decimal('300'), 2), ('T2 2026', 'Retail', Decimal('400'), 1), ('T2 2026', 'Tech', Decimal('50'), 1)]
+        )
+
+        chart = analytics_engine.chart_action(result)
+        self.assertEqual(chart['type'], 'UI_CHART')
+        self.assertEqual(chart['series'], ['Tech', 'Retail'])
+        self.assertEqual(chart['data'], [{'name': 'T1 2026', 'Tech': 300.0}, {'name': 'T2 2026', 'Retail': 400.0, 'Tech': 50.0}])
+
+    def test_status_breakdowns_read_the_rollups(self):
+        result = analytics_engine.run_query(self.user, 'contract', metrics=['count', 'sum_amount'], group_by=['status'])
+        self.assertEqual(result['source'], 'rollup')
+        self.assertEqual(
+            [(row['status'], row['count'], row['sum_amount']) for row in result['rows']],
+            [('signed', 3, Decimal('700')), ('draft', 1, Decimal('50'))]
+        )
+        # Dimensions the rollups do not have go to the table
+        self.assertEqual(analytics_engine.run_query(self.user, 'contract', group_by=['industry'])['source'], 'table')
+
+    def test_only_whitelisted_fields(self):
+        result = AnalyticsTools.analyze_data('contract', filters={'created_by__password__startswith': 'p'}, user=self.user)
+        self.assertTrue(result.startswith("Erreur: Filtre inconnu(e)"))
+        result = AnalyticsTools.analyze_data('task', group_by=['organization'], user=self.user)
+        self.assertTrue(result.startswith("Erreur: Dimension inconnu(e)"))
+
+    def test_analyze_data_answers(self):
+        self.assertEqual(
+            AnalyticsTools.analyze_data('contract', metric='sum_amount', filters={'status': 'signed'}, user=self.user),
+            "Montant total des contrats (tout le temps): 700.00 €"
+        )
+        self.assertIn("- Shop: 400.00 €", AnalyticsTools.analyze_data('contract', metric='top_clients_revenue', user=self.user))
+
+        answer = AnalyticsTools.analyze_data(
+            'contract', metrics=['sum_amount'], group_by=['industry'], chart_type='pie', user=self.user
+        )
+        self.assertIn("- Tech : Montant total : 350.00 €", answer['content'])
+        self.assertEqual(answer['action']['chart_type'], 'pie')
+        self.assertEqual(answer['action']['data'], [{'name': 'Retail', 'sum_amount': 400.0}, {'name': 'Tech', 'sum_amount': 350.0}])
@@ -0,0 +1,123 @@
+import time
+import threading
+from unittest.mock import patch
+from django.test import TestCase
+from django.db.models.signals import post_save
+from django.contrib.auth import get_user_model
+from core.models import Organization, Notification, UserFcmToken
+from crm.models import Space, ActivityLog
+from tasks.models import Task
+from tasks.signals import tasks_bulk_created
+from ai_assistant.tools.tasks import TaskTools
+
+User = get_user_model()
+
+
+class ChunkLLMService:
+    """Returns the tasks named in the chunk ('TODO: <title>' lines), slowly."""
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def chat(self, messages, context="", system_override=""):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        prompt = messages[0]['content']
+        titles = [line.split('TODO:', 1)[1].strip() for line in prompt.splitlines() if 'TODO:' in line]
+        return "[" + ",".join(f'{{"title": "{t}", "due_date": "2025-03-01"}}' for t in titles) + "]"
+
+
+class BatchedExtractionTest(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="Org Batch")
+        self.user = User.objects.create_user(username='batch', email='b@test.com', password='pw', organization=self.org)
+        self.space = Space.objects.create(name="Acme", organization=self.org)
+
+    def _long_notes(self, titles):
+        filler = "Discussion générale sur le projet et ses prochaines étapes. " * 30
+        return "\n\n".join(f"{filler}\nTODO: {title}" for title in titles)
+
+    def test_split_text_respects_limit(self):
+        text = self._long_notes(["A", "B", "C"])
+        chunks = TaskTools._split_text(text, 2000)
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(len(c) <= 2000 for c in chunks))
+        self.assertEqual("".join(chunks), text)
+
+    def test_long_notes_are_extracted_in_parallel(self):
+        llm = ChunkLLMService(delay=0.2)
+        text = self._long_notes(["Envoyer le devis", "Relancer Acme", "Préparer la démo"])
+
+        with patch.object(TaskTools, 'EXTRACTION_CHUNK_CHARS', 2000):
+            start = time.monotonic()
+            result = TaskTools.extract_and_create_tasks(text, llm, self.user, space_name="Acme")
+            elapsed = time.monotonic() - start
+
+        self.assertEqual(llm.calls, 3)
+        self.assertLess(elapsed, 0.5)
+        self.assertIn("3 tâches créées", result)
+        self.assertEqual(Task.objects.filter(space=self.space).count(), 3)
+
+    def test_duplicates_across_chunks_are_merged(self):
+        llm = ChunkLLMService()
+        text = self._long_notes(["Relancer Acme", "relancer  ACME", "Relancer Acmé"])
+
+        with patch.object(TaskTools, 'EXTRACTION_CHUNK_CHARS', 2000):
+            result = TaskTools.extract_and_create_tasks(text, llm, self.user)
+
+        self.assertIn("1 tâches créées", result)
+        self.assertEqual(Task.objects.filter(organization=self.org).count(), 1)
+
+    def test_tasks_are_bulk_created_with_one_signal(self):
+        llm = ChunkLLMService()
+        text = "\n".join(f"TODO: Tâche {i}" for i in range(5))
+        post_saves = []
+        batches = []
+
+        def on_post_save(sender, instance, **kwargs):
+            post_saves.append(instance)
+
+        def on_bulk(sender, instances, **kwargs):
+            batches.append(instances)
+
+        post_save.connect(on_post_save, sender=Task)
+        tasks_bulk_created.connect(on_bulk)
+        self.addCleanup(post_save.disconnect, on_post_save, sender=Task)
+        self.addCleanup(tasks_bulk_created.disconnect, on_bulk)
+
+        with patch('ai_assistant.signals.VectorStore.add_texts') as mock_index, \
+             patch('automation.signals.trigger_automation') as mock_automation, \
+             self.settings(OUTBOX_CONF={'MODE': 'sync'}), \
+             self.captureOnCommitCallbacks(execute=True):
+            TaskTools.extract_and_create_tasks(text, llm, self.user, space_name="Acme")
+
+        self.assertEqual(post_saves, [])
+        self.assertEqual(len(batches), 1)
+        self.assertEqual(len(batches[0]), 5)
+        # One indexing call for the whole batch
+        task_calls = [c for c in mock_index.call_args_list if c.kwargs['ids'][0].startswith('task_')]
+        self.assertEqual(len(task_calls), 1)
+        self.assertEqual(len(task_calls[0].kwargs['ids']), 5)
+        self.assertEqual(mock_automation.call_count, 5)
+        self.assertEqual(ActivityLog.objects.filter(space=self.space, action='created', entity_type='Tâche').count(), 5)
+
+    def test_bulk_signal_notifies_assignees(self):
+        other = User.objects.create_user(username='other', email='o@test.com', password='pw', organization=self.org)
+        tasks = [
+            Task(title="Pour other", organization=self.org, assigned_to=other),
+            Task(title="Pour moi", organization=self.org, assigned_to=self.user),
+        ]
+        Task.objects.bulk_create(tasks)
+        UserFcmToken.objects.create(user=other, token='token-other')
+
+        with patch('core.services.fcm.send_multicast', return_value=1) as mock_push, \
+             self.settings(OUTBOX_CONF={'MODE': 'sync'}), \
+             self.captureOnCommitCallbacks(execute=True):
+            tasks_bulk_created.send(sender=Task, instances=tasks, user=self.user)
+
+        self.assertEqual(Notification.objects.filter(recipient=other, type='task_assigned').count(), 1)
+        self.assertFalse(Notification.objects.filter(recipient=self.user).exists())
+        mock_push.assert_called_once()
+        self.assertEqual(mock_push.call_args[0][0], ['token-other'])
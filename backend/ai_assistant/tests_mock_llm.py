@@ -0,0 +1,100 @@
+import threading
+from io import StringIO
+from django.test import TestCase
+from django.core.management import call_command
+from django.contrib.auth import get_user_model
+from openai import OpenAI
+from rest_framework.test import APIClient
+from unittest.mock import patch
+from core.models import Organization
+from tasks.models import Task
+from ai_assistant.mock_llm import MockLLMServer
+from ai_assistant.management.commands.loadtest_chat import percentile
+
+User = get_user_model()
+
+SCRIPT = [
+    {"match": "crée la tâche", "tool_calls": [{"name": "CREATE_TASK", "arguments": {"title": "Relancer Acme"}}]},
+    {"match": "bonjour", "reply": "Bonjour, comment puis-je aider ?"},
+]
+
+
+class MockLLMServerTest(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = MockLLMServer(port=0, reply_tokens=12, embedding_dim=8, script=SCRIPT)
+        cls.server.bind()
+        cls.thread = threading.Thread(target=cls.server.run, daemon=True)
+        cls.thread.start()
+        cls.base_url = f"http://127.0.0.1:{cls.server.port}/v1"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.thread.join(timeout=5)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client_ai = OpenAI(api_key='mock', base_url=self.base_url)
+        self.org = Organization.objects.create(name="Org Mock")
+        self.user = User.objects.create_user(username='mock', email='m@test.com', password='pw', organization=self.org)
+
+    def test_chat_completion_is_deterministic(self):
+        messages = [{'role': 'user', 'content': 'Résume le dossier Acme'}]
+        first = self.client_ai.chat.completions.create(model='mock', messages=messages)
+        second = self.client_ai.chat.completions.create(model='mock', messages=messages)
+        self.assertEqual(first.choices[0].message.content, second.choices[0].message.content)
+        self.assertEqual(len(first.choices[0].message.content.split()), 12)
+
+    def test_streaming_matches_plain_completion(self):
+        messages = [{'role': 'user', 'content': 'bonjour'}]
+        stream = self.client_ai.chat.completions.create(model='mock', messages=messages, stream=True)
+        text = "".join(chunk.choices[0].delta.content or '' for chunk in stream)
+        self.assertEqual(text, "Bonjour, comment puis-je aider ?")
+
+    def test_scripted_tool_call(self):
+        response = self.client_ai.chat.completions.create(
+            model='mock',
+            messages=[{'role': 'user', 'content': 'crée la tâche de relance'}],
+            tools=[{"type": "function", "function": {"name": "CREATE_TASK", "parameters": {"type": "object"}}}],
+        )
+        call = response.choices[0].message.tool_calls[0]
+        self.assertEqual(response.choices[0].finish_reason, 'tool_calls')
+        self.assertEqual(call.function.name, 'CREATE_TASK')
+        self.assertIn('Relancer Acme', call.function.arguments)
+
+    def test_embeddings(self):
+        response = self.client_ai.embeddings.create(model='mock', input=['Acme', 'Acme', 'Globex'])
+        vectors = [d.embedding for d in response.data]
+        self.assertEqual(len(vectors[0]), 8)
+        self.assertEqual(vectors[0], vectors[1])
+        self.assertNotEqual(vectors[0], vectors[2])
+
+    def test_chat_pipeline_against_mock(self):
+        api = APIClient()
+        api.force_authenticate(user=self.user)
+        conf = {'PROVIDER': 'openai', 'API_KEY': 'mock', 'BASE_URL': self.base_url, 'MODEL': 'mock'}
+
+        with self.settings(AI_CONF=conf), \
+             patch('ai_assistant.services.RAGService.get_context', return_value=("", [])):
+            chat = api.post('/api/ai/chat/', {'messages': [{'role': 'user', 'content': 'bonjour'}]}, format='json')
+            streamed = b"".join(chat.streaming_content).decode()
+            tool = api.post('/api/ai/chat/', {'messages': [{'role': 'user', 'content': 'crée la tâche Acme'}]}, format='json')
+
+        self.assertEqual(streamed, "Bonjour, comment puis-je aider ?")
+        self.assertEqual(tool.status_code, 200)
+        self.assertTrue(Task.objects.filter(title='Relancer Acme', organization=self.org).exists())
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 50), 50)
+        self.assertEqual(percentile(values, 99), 99)
+        self.assertEqual(percentile([], 95), 0.0)
+
+    def test_command_prints_the_bound_port(self):
+        out = StringIO()
+        with patch.object(MockLLMServer, 'run', autospec=True, side_effect=lambda server: server.httpd.server_close()):
+            call_command('run_mock_llm', port=0, stdout=out)
+        self.assertNotIn(':0/', out.getvalue())
+        self.assertRegex(out.getvalue(), r"AI_BASE_URL=http://127\.0\.0\.1:[1-9]\d*/v1")
@@ -0,0 +1,139 @@
+import time
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+from django.test import TestCase
+from ai_assistant.services import LLMService
+
+
+def make_tool_call(call_id, name, arguments):
+    return SimpleNamespace(id=call_id, function=SimpleNamespace(name=name, arguments=arguments))
+
+
+class ParallelToolsTest(TestCase):
+    def setUp(self):
+        self.service = LLMService()
+        self.messages = [{'role': 'user', 'content': "crée la tâche X et planifie une réunion avec Acme"}]
+        rag_patch = patch('ai_assistant.services.RAGService.get_context', return_value=("", []))
+        rag_patch.start()
+        self.addCleanup(rag_patch.stop)
+
+    def test_detect_intent_returns_every_tool_call(self):
+        message = SimpleNamespace(content=None, tool_calls=[
+            make_tool_call('call_a', 'CREATE_TASK', '{"title": "X"}'),
+            make_tool_call('call_b', 'CREATE_MEETING', '{"title": "Point", "space_name": "Acme", "date": "2025-01-01"}'),
+        ])
+        client = MagicMock()
+        client.chat.completions.create.return_value = SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+        with patch('ai_assistant.services.OpenAI', return_value=client):
+            intent = self.service._detect_intent(self.messages[0]['content'])
+
+        self.assertEqual(intent['tool'], 'CREATE_TASK')
+        self.assertEqual([c['tool'] for c in intent['calls']], ['CREATE_TASK', 'CREATE_MEETING'])
+        self.assertEqual(intent['calls'][1]['id'], 'call_b')
+
+    def test_compound_request_runs_in_single_turn(self):
+        intent = {'tool': 'CREATE_TASK', 'params': {}, 'calls': [
+            {'id': 'call_a', 'tool': 'CREATE_TASK', 'params': {'title': 'X'}},
+            {'id': 'call_b', 'tool': 'CREATE_MEETING', 'params': {'title': 'Point', 'space_name': 'Acme'}},
+        ]}
+        results = {
+            'CREATE_TASK': {"message": "Tâche 'X' créée avec succès.", "action": {"type": "NAVIGATE", "url": "/tasks"}},
+            'CREATE_MEETING': "Réunion 'Point' planifiée.",
+        }
+
+        with patch.object(self.service, '_detect_intent', return_value=intent) as mock_detect, \
+             patch.object(self.service, '_execute_tool', side_effect=lambda name, *args: results[name]) as mock_execute:
+            output = self.service.run_agent(self.messages)
+
+        self.assertEqual(mock_detect.call_count, 1)
+        self.assertEqual(mock_execute.call_count, 2)
+        self.assertIn("Tâche 'X' créée", output['content'])
+        self.assertIn("Réunion 'Point' planifiée", output['content'])
+        self.assertEqual(output['action']['url'], '/tasks')
+
+    def test_independent_calls_run_concurrently(self):
+        calls = [
+            {'id': 'a', 'tool': 'LIST_TASKS', 'params': {}},
+            {'id': 'b', 'tool': 'LIST_MEETINGS', 'params': {}},
+        ]
+
+        def slow_tool(name, *args):
+            time.sleep(0.3)
+            return name
+
+        with patch.object(self.service, '_execute_tool', side_effect=slow_tool):
+            start = time.monotonic()
+            results = self.service._execute_tool_calls(calls, "raw")
+            elapsed = time.monotonic() - start
+
+        self.assertEqual(results, ['LIST_TASKS', 'LIST_MEETINGS'])
+        self.assertLess(elapsed, 0.55)
+
+    def test_dependent_calls_are_batched_after_creation(self):
+        calls = [
+            {'id': 'a', 'tool': 'CREATE_COMPANY', 'params': {'name': 'Acme'}},
+            {'id': 'b', 'tool': 'CREATE_MEETING', 'params': {'title': 'Kickoff', 'space_name': 'acme'}},
+            {'id': 'c', 'tool': 'CREATE_TASK', 'params': {'title': 'Relancer'}},
+        ]
+        self.assertEqual(LLMService._plan_tool_batches(calls), [[0, 2], [1]])
+
+    def test_tool_timeout_returns_error(self):
+        self.service.conf = dict(self.service.conf, TOOL_TIMEOUT=0.1)
+        calls = [
+            {'id': 'a', 'tool': 'LIST_TASKS', 'params': {}},
+            {'id': 'b', 'tool': 'ANALYZE_DATA', 'params': {}},
+        ]
+
+        def tool(name, *args):
+            if name == 'ANALYZE_DATA':
+                time.sleep(0.5)
+            return "ok"
+
+        with patch.object(self.service, '_execute_tool', side_effect=tool):
+            results = self.service._execute_tool_calls(calls, "raw")
+
+        self.assertEqual(results[0], "ok")
+        self.assertTrue(results[1].startswith("Error executing tool ANALYZE_DATA: timed out"))
+
+    def test_timed_out_write_is_not_reported_as_failure(self):
+        self.service.conf = dict(self.service.conf, TOOL_TIMEOUT=0.1)
+        calls = [
+            {'id': 'a', 'tool': 'LIST_TASKS', 'params': {}},
+            {'id': 'b', 'tool': 'CREATE_TASK', 'params': {'title': 'Relancer'}},
+        ]
+
+        def tool(name, *args):
+            if name == 'CREATE_TASK':
+                time.sleep(0.3) # Still commits after the deadline
+            return "ok"
+
+        with patch.object(self.service, '_execute_tool', side_effect=tool):
+            results = self.service._execute_tool_calls(calls, "raw")
+
+        self.assertFalse(results[1].startswith("Error"))
+        self.assertIn("Ne relancez pas", results[1])
+
+    def test_failed_call_is_fed_back_as_tool_message(self):
+        first = {'tool': 'CREATE_TASK', 'params': {}, 'content': None, 'calls': [
+            {'id': 'call_a', 'tool': 'CREATE_TASK', 'params': {'title': 'X'}},
+            {'id': 'call_b', 'tool': 'CREATE_MEETING', 'params': {'title': 'Point'}},
+        ]}
+        retry = {'tool': 'CREATE_MEETING', 'params': {}, 'calls': [
+            {'id': 'call_c', 'tool': 'CREATE_MEETING', 'params': {'title': 'Point', 'space_name': 'Acme'}},
+        ]}
+
+        def tool(name, params, *args):
+            if name == 'CREATE_TASK':
+                return "Tâche créée."
+            return "Réunion planifiée." if params.get('space_name') else "Error: space_name manquant"
+
+        with patch.object(self.service, '_detect_intent', side_effect=[first, retry]) as mock_detect, \
+             patch.object(self.service, '_execute_tool', side_effect=tool):
+            output = self.service.run_agent(self.messages)
+
+        history = mock_detect.call_args_list[1].kwargs['history']
+        self.assertEqual(history[0]['role'], 'assistant')
+        self.assertEqual([c['id'] for c in history[0]['tool_calls']], ['call_a', 'call_b'])
+        self.assertEqual(history[2], {'role': 'tool', 'tool_call_id': 'call_b', 'content': "Error: space_name manquant"})
+        self.assertEqual(output['content'], "Tâche créée.\nRéunion planifiée.")
@@ -0,0 +1,63 @@
+import io
+import os
+import base64
+import tempfile
+from types import SimpleNamespace
+from unittest.mock import patch, MagicMock
+from django.core.cache import cache
+from django.test import TestCase
+from PIL import Image
+from ai_assistant.tools.vision import VisionTools
+
+
+class VisionPreprocessingTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmpdir.cleanup)
+
+    def _write_image(self, name, size, mode='RGB', format='JPEG'):
+        path = os.path.join(self.tmpdir.name, name)
+        color = (200, 30, 30, 128) if mode == 'RGBA' else (200, 30, 30)
+        Image.new(mode, size, color).save(path, format=format)
+        return path
+
+    def test_large_photo_is_downscaled(self):
+        path = self._write_image('photo.jpg', (4032, 3024))
+        prepared = VisionTools.prepare_image(path)
+
+        self.assertEqual(prepared['mime_type'], 'image/jpeg')
+        self.assertEqual((prepared['width'], prepared['height']), (1024, 768))
+        self.assertLess(len(prepared['data']), os.path.getsize(path))
+        self.assertEqual(Image.open(io.BytesIO(prepared['data'])).size, (1024, 768))
+
+    def test_real_mime_type_is_detected(self):
+        # A PNG with transparency uploaded with a .jpg name stays a PNG
+        path = self._write_image('capture.jpg', (300, 200), mode='RGBA', format='PNG')
+        prepared = VisionTools.prepare_image(path)
+        self.assertEqual(prepared['mime_type'], 'image/png')
+
+    def test_prepared_payload_is_cached_by_hash(self):
+        path = self._write_image('photo.jpg', (2000, 1500))
+        first = VisionTools.prepare_image(path)
+
+        with patch('ai_assistant.tools.vision.Image.open') as mock_open:
+            second = VisionTools.prepare_image(path)
+            mock_open.assert_not_called()
+        self.assertEqual(first, second)
+
+    def test_openai_payload_uses_prepared_image(self):
+        path = self._write_image('photo.png', (3000, 3000), format='PNG')
+        client = MagicMock()
+        client.chat.completions.create.return_value = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="Un carré rouge."))]
+        )
+
+        with patch('ai_assistant.tools.vision.OpenAI', return_value=client):
+            result = VisionTools._analyze_with_openai(path, "Décris l'image", 'key', None)
+
+        self.assertEqual(result, "Un carré rouge.")
+        url = client.chat.completions.create.call_args.kwargs['messages'][0]['content'][1]['image_url']['url']
+        self.assertTrue(url.startswith("data:image/jpeg;base64,"))
+        sent = Image.open(io.BytesIO(base64.b64decode(url.split(',', 1)[1])))
+        self.assertEqual(sent.size, (768, 768))
@@ -1,82 +1,33 @@
-from django.db.models import Count, Sum, Q
-from django.utils import timezone
-from datetime import timedelta
-from crm.models import Space, Contract, Meeting
+from ai_assistant import analytics_engine
+from ai_assistant.utils.periods import range_filter
 from tasks.models import Task
 
 class AnalyticsTools:
     @staticmethod
-    def analyze_data(entity_type, metric='count', time_period=None, filters=None, user=None):
+    def analyze_data(entity_type, metric='count', time_period=None, filters=None, user=None,
+                     metrics=None, group_by=None, time_bucket=None, date_field=None, chart_type=None):
         """
-        Performs analysis on data.
-        entity_type: 'space', 'contract', 'task', 'meeting'
-        metric: 'count', 'sum_amount' (for contracts)
-        time_period: 'this_month', 'last_month', 'this_year', 'all_time'
+        Performs analysis on data (ai_assistant/analytics_engine.py).
+        entity_type: 'space', 'contact', 'contract', 'task', 'meeting'
+        metric / metrics: 'count', 'sum_amount', 'avg_amount', 'min_amount', 'max_amount' (amounts: contracts)
+        group_by: dimensions (e.g. ['industry'], ['status'])
+        time_bucket: 'day', 'week', 'month', 'quarter', 'year'
+        time_period: 'today', 'this_week', 'this_month', 'last_month', 'this_year', 'all_time'
         filters: dict of additional filters (e.g. {'status': 'signed'})
+        Grouped or bucketed results come back with a UI_CHART action.
         """
         if not user or not hasattr(user, 'organization'):
             return "Erreur: Impossible de déterminer l'organisation. Utilisateur non authentifié."
-            
-        queryset = None
-        if entity_type == 'space':
-            queryset = Space.objects.filter(organization=user.organization)
-        elif entity_type == 'contract':
-            queryset = Contract.objects.filter(organization=user.organization)
-        elif entity_type == 'task':
-            queryset = Task.objects.filter(organization=user.organization)
-        elif entity_type == 'meeting':
-            queryset = Meeting.objects.filter(organization=user.organization)
-            
-        if queryset is None:
-            return f"Unknown entity type: {entity_type}"
-
-        # Apply Time Filter
-        now = timezone.now()
-        date_field = 'created_at' # Default
-        
-        if entity_type == 'contract':
-            date_field = 'start_date'
-        elif entity_type == 'meeting':
-            date_field = 'date'
-        elif entity_type == 'task':
-            date_field = 'due_date'
 
-        if time_period == 'this_month':
-            queryset = queryset.filter(**{f"{date_field}__month": now.month, f"{date_field}__year": now.year})
-        elif time_period == 'last_month':
-            last_month = now.replace(day=1) - timedelta(days=1)
-            queryset = queryset.filter(**{f"{date_field}__month": last_month.month, f"{date_field}__year": last_month.year})
-        elif time_period == 'this_year':
-            queryset = queryset.filter(**{f"{date_field}__year": now.year})
-
-        # Apply Custom Filters
-        if filters:
-            # Clean filters
-            clean_filters = {}
-            for k, v in filters.items():
-                if v and v != 'any':
-                    if k == 'space' or k == 'space_name':
-                        # Handle space name or ID
-                        if isinstance(v, int) or (isinstance(v, str) and v.isdigit()):
-                            clean_filters['space__id'] = v
-                        else:
-                            clean_filters['space__name__icontains'] = v
-                    else:
-                        clean_filters[k] = v
-            queryset = queryset.filter(**clean_filters)
-
-        # Calculate Metric
-        if metric == 'count':
-            count = queryset.count()
-            return f"Total {entity_type}s ({time_period or 'tout le temps'}): {count}"
-        
-        elif metric == 'sum_amount' and entity_type == 'contract':
-            total = queryset.aggregate(Sum('amount'))['amount__sum'] or 0
-            return f"Montant total des contrats ({time_period or 'tout le temps'}): {total} €"
-            
-        elif metric == 'urgent_tasks' and entity_type == 'task':
-            # Special metric for "urgent tasks"
-            tasks = queryset.filter(priority='high', status__in=['todo', 'in_progress'])
+        if metric == 'urgent_tasks' and entity_type == 'task':
+            # Special metric for "urgent tasks": the list, not an aggregate
+            tasks = Task.objects.filter(organization=user.organization, priority='high', status__in=['todo', 'in_progress'])
+            if time_period in ('this_month', 'last_month', 'this_year'):
+                tasks = tasks.filter(**range_filter('due_date', time_period))
+            try:
+                tasks = tasks.filter(analytics_engine.build_filters(analytics_engine.ENTITIES['task'], filters))
+            except ValueError as e:
+                return f"Erreur: {e}"
             count = tasks.count()
             
             if count == 0:
@@ -84,34 +35,55 @@ class AnalyticsTools:
                 
             task_list = "\n".join([f"- {t.title} (Échéance : {t.due_date.strftime('%d/%m/%Y') if t.due_date else 'Aucune'})" for t in tasks])
             return f"Vous avez {count} tâches urgentes :\n{task_list}"
-            
-        elif metric == 'top_clients_revenue':
+
+        limit = analytics_engine.MAX_ROWS
+        if metric == 'top_clients_revenue':
             # Top clients by signed contract amount
-            top_spaces = Contract.objects.filter(
-                organization=user.organization, 
-                status='signed'
-            ).values('space__name').annotate(total_revenue=Sum('amount')).order_by('-total_revenue')[:5]
-            
-            if not top_spaces:
+            entity_type, metrics, group_by, limit = 'contract', ['sum_amount'], ['space'], 5
+            filters = {**(filters or {}), 'status': 'signed'}
+        elif metric == 'top_clients_activity':
+            # Top clients by meetings count
+            entity_type, metrics, group_by, limit = 'meeting', ['count'], ['space'], 5
+
+        try:
+            result = analytics_engine.run_query(
+                user, entity_type, metrics=metrics or [metric], group_by=group_by, bucket=time_bucket,
+                date_field=date_field, time_period=time_period, filters=filters, limit=limit
+            )
+        except ValueError as e:
+            return f"Erreur: {e}"
+        return AnalyticsTools._report(result, metric, chart_type)
+
+    @staticmethod
+    def _report(result, metric, chart_type=None):
+        """Text of a result, with a UI_CHART action when it is grouped or bucketed."""
+        rows = result['rows']
+        label = f"{result['time_period'] or 'tout le temps'}"
+        if metric == 'top_clients_revenue':
+            if not rows:
                 return "Aucun revenu trouvé (contrats signés)."
-                
             report = "Top Clients par Revenu (Contrats Signés) :\n"
-            for c in top_spaces:
-                report += f"- {c['space__name']}: {c['total_revenue']} €\n"
+            for row in rows:
+                report += f"- {row['space']}: {analytics_engine.format_value('sum_amount', row['sum_amount'])}\n"
             return report
- 
-        elif metric == 'top_clients_activity':
-            # Top clients by meetings count
-            top_spaces = Meeting.objects.filter(
-                organization=user.organization
-            ).values('space__name').annotate(total_meetings=Count('id')).order_by('-total_meetings')[:5]
-            
-            if not top_spaces:
+
+        if metric == 'top_clients_activity':
+            if not rows:
                 return "Aucune activité de réunion trouvée."
-                
             report = "Top Clients par Activité (Réunions) :\n"
-            for c in top_spaces:
-                report += f"- {c['space__name']}: {c['total_meetings']} réunions\n"
+            for row in rows:
+                report += f"- {row['space']}: {row['count']} réunions\n"
             return report
 
-        return f"Analyse terminée. Résultat : {queryset.count()}"
+        if result['group_by'] or result['bucket']:
+            return {
+                'content': analytics_engine.describe(result),
+                'action': analytics_engine.chart_action(result, chart_type),
+            }
+
+        totals = rows[0]
+        if result['metrics'] == ['count']:
+            return f"Total {result['entity']}s ({label}): {totals['count']}"
+        if result['metrics'] == ['sum_amount']:
+            return f"Montant total des contrats ({label}): {analytics_engine.format_value('sum_amount', totals['sum_amount'])}"
+        return analytics_engine.describe(result)
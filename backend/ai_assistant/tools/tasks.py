@@ -1,7 +1,9 @@
 from tasks.models import Task
 from django.utils import timezone
-from datetime import timedelta
+from ai_assistant.utils.periods import range_filter
+import re
 import json
+import unicodedata
 from django.contrib.auth import get_user_model
 
 User = get_user_model()
@@ -97,12 +99,17 @@ class TaskTools:
             }
         }
 
+    # Long notes are split into chunks of this size and extracted in parallel
+    EXTRACTION_CHUNK_CHARS = 4000
+
     @staticmethod
-    def extract_and_create_tasks(text, llm_service, user=None, space_name=None, dry_run=False, original_query=None):
+    def extract_and_create_tasks(text, llm_service, user=None, space_name=None, dry_run=False, original_query=None, chunked=None):
         """
         Uses LLM to extract tasks from text. 
         If dry_run=True, returns suggested tasks without creating.
         If dry_run=False, creates them.
+        chunked: split the text and extract chunks in parallel (default: only
+        when the text is longer than EXTRACTION_CHUNK_CHARS).
         """
         if not user or not hasattr(user, 'organization'):
             return "Erreur: Impossible de déterminer l'organisation. Utilisateur non authentifié."
@@ -113,7 +120,102 @@ class TaskTools:
             # Try exact match or contains
             space = Space.objects.filter(organization=user.organization, name__icontains=space_name).first()
 
+        if chunked is None:
+            chunked = len(text) > TaskTools.EXTRACTION_CHUNK_CHARS
+        chunks = TaskTools._split_text(text, TaskTools.EXTRACTION_CHUNK_CHARS) if chunked else [text]
+
         now = timezone.localtime()
+        if len(chunks) == 1:
+            responses = [TaskTools._extract_chunk(llm_service, chunks[0], now)]
+        else:
+            # LLM calls only (no ORM access) so they are safe to run on threads
+            from django.conf import settings
+            from concurrent.futures import ThreadPoolExecutor
+            workers = min(len(chunks), settings.AI_CONF.get('TOOL_WORKERS', 4))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                responses = list(executor.map(
+                    lambda item: TaskTools._extract_chunk(llm_service, item[1], now, part=item[0] + 1, total=len(chunks)),
+                    enumerate(chunks)
+                ))
+
+        tasks_data = []
+        for response_text in responses:
+            parsed = TaskTools._parse_tasks_response(response_text)
+            if parsed:
+                tasks_data.extend(parsed)
+
+        if not tasks_data:
+            return f"Échec de l'analyse des tâches. Format invalide. Sortie brute : {responses[0][:100]}..."
+
+        tasks_data = TaskTools._deduplicate_tasks(tasks_data)
+
+        if dry_run:
+            # Return suggestions
+            suggestions = []
+            for t in tasks_data:
+                due = t.get('due_date', 'None')
+                suggestions.append({'label': f"{t.get('title')} ({due})", 'value': f"Create task {t.get('title')} due {due}"})
+            
+            # Format as a nice message + CHOICE actions
+            msg = f"J'ai identifié {len(tasks_data)} tâches potentielles pour {space.name if space else 'inconnu'} :\n"
+            for t in tasks_data:
+                msg += f"- {t.get('title')} (Pour le {t.get('due_date')})\n"
+            
+            msg += "\nVoulez-vous que je les crée toutes ?"
+            
+            # Use original query to reformulate the confirmation command
+            confirm_value = "Confirm create all extracted tasks"
+            if original_query:
+                confirm_value = f"Procéder à la création des tâches (Confirmation) : {original_query}"
+            
+            return {
+                "content": msg,
+                "action": {
+                    "type": "CHOICES",
+                    "label": "Confirmer",
+                    "choices": [
+                        {"label": "Oui, créer tout", "value": confirm_value},
+                        {"label": "Non, annuler", "value": "Annuler l'extraction"}
+                    ]
+                }
+            }
+
+        tasks = []
+        for t in tasks_data:
+            # Handle due_date
+            due_date = t.get('due_date')
+            if due_date == "": due_date = None
+
+            tasks.append(Task(
+                title=t.get('title', 'Untitled Task'),
+                description=t.get('description', ''),
+                priority=t.get('priority', 'medium'),
+                status=t.get('status', 'todo'),
+                due_date=due_date,
+                organization=user.organization,
+                space=space,
+                created_by=user
+            ))
+
+        # One INSERT instead of one save (and one round of post_save receivers) per task.
+        # Side effects (indexing, activity log, notifications, automation) run once
+        # for the whole batch through the tasks_bulk_created signal.
+        from django.db import transaction
+        from tasks.signals import tasks_bulk_created
+        with transaction.atomic():
+            Task.objects.bulk_create(tasks)
+            # In the transaction: the dashboard rollups count the batch with it
+            tasks_bulk_created.send(sender=Task, instances=tasks, user=user)
+
+        return f"Génération réussie : {len(tasks)} tâches créées."
+
+    @staticmethod
+    def _extract_chunk(llm_service, text, now, part=1, total=1):
+        """Asks the LLM for the tasks contained in one chunk of text."""
+        part_hint = ""
+        if total > 1:
+            part_hint = f"\n        Note: The Input Text is part {part} of {total} of a longer document. Only extract tasks found in this part."
+
         prompt = f"""
         You are a Task Generator.
         Current Date: {now.strftime('%Y-%m-%d')}
@@ -124,7 +226,7 @@ class TaskTools:
         - Calculate specific "due_date" (YYYY-MM-DD) for each task based on the Current Date.
         - IMPORTANT: The 'title' and 'description' fields MUST be in the SAME LANGUAGE as the Input Text (default to French if unclear).
         - Status MUST be 'todo' UNLESS the text explicitly states the task is currently 'in progress'. Default to 'todo'.
-        - Priority MUST be 'medium' UNLESS the text explicitly uses words like "Urgent", "Important", "High priority", "ASAP". Default to 'medium'.
+        - Priority MUST be 'medium' UNLESS the text explicitly uses words like "Urgent", "Important", "High priority", "ASAP". Default to 'medium'.{part_hint}
         
         Input Text:
         {text}
@@ -139,10 +241,14 @@ class TaskTools:
         
         messages = [{'role': 'user', 'content': prompt}]
         
-        response_text = llm_service.chat(messages, context="", system_override="You are a task generator. Output valid JSON only.")
-        
-        # Robust JSON extraction
-        import re
+        return llm_service.chat(messages, context="", system_override="You are a task generator. Output valid JSON only.")
+
+    @staticmethod
+    def _parse_tasks_response(response_text):
+        """
+        Robust JSON extraction of the task list returned by the LLM.
+        Returns a list of dicts, or None when nothing could be parsed.
+        """
         tasks_data = None
         
         # 1. Attempt Regex + JSON
@@ -179,62 +285,58 @@ class TaskTools:
                 pass
 
         # Normalize data
-        if tasks_data:
-            if isinstance(tasks_data, dict) and 'tasks' in tasks_data:
-                tasks_data = tasks_data['tasks']
-            if not isinstance(tasks_data, list):
-                tasks_data = [tasks_data]
-        else:
-            return f"Échec de l'analyse des tâches. Format invalide. Sortie brute : {response_text[:100]}..."
+        if not tasks_data:
+            return None
+        if isinstance(tasks_data, dict) and 'tasks' in tasks_data:
+            tasks_data = tasks_data['tasks']
+        if not isinstance(tasks_data, list):
+            tasks_data = [tasks_data]
+        return [t for t in tasks_data if isinstance(t, dict)]
 
-        if dry_run:
-            # Return suggestions
-            suggestions = []
-            for t in tasks_data:
-                due = t.get('due_date', 'None')
-                suggestions.append({'label': f"{t.get('title')} ({due})", 'value': f"Create task {t.get('title')} due {due}"})
-            
-            # Format as a nice message + CHOICE actions
-            msg = f"J'ai identifié {len(tasks_data)} tâches potentielles pour {space.name if space else 'inconnu'} :\n"
-            for t in tasks_data:
-                msg += f"- {t.get('title')} (Pour le {t.get('due_date')})\n"
-            
-            msg += "\nVoulez-vous que je les crée toutes ?"
-            
-            # Use original query to reformulate the confirmation command
-            confirm_value = "Confirm create all extracted tasks"
-            if original_query:
-                confirm_value = f"Procéder à la création des tâches (Confirmation) : {original_query}"
-            
-            return {
-                "content": msg,
-                "action": {
-                    "type": "CHOICES",
-                    "label": "Confirmer",
-                    "choices": [
-                        {"label": "Oui, créer tout", "value": confirm_value},
-                        {"label": "Non, annuler", "value": "Annuler l'extraction"}
-                    ]
-                }
-            }
+    @staticmethod
+    def _split_text(text, max_chars):
+        """
+        Splits text into chunks of at most max_chars, on paragraph then line
+        boundaries so a task description is not cut in half.
+        """
+        if len(text) <= max_chars:
+            return [text]
 
-        created_count = 0
+        chunks = []
+        current = ""
+        for paragraph in re.split(r'(\n\s*\n)', text):
+            pieces = [paragraph]
+            if len(paragraph) > max_chars:
+                lines = paragraph.splitlines(keepends=True)
+                pieces = []
+                for line in lines:
+                    # Hard-wrap single lines that are still too long
+                    pieces.extend(line[i:i + max_chars] for i in range(0, len(line), max_chars))
+            for piece in pieces:
+                if current and len(current) + len(piece) > max_chars:
+                    chunks.append(current)
+                    current = ""
+                current += piece
+        if current.strip():
+            chunks.append(current)
+        return chunks
+
+    @staticmethod
+    def _deduplicate_tasks(tasks_data):
+        """
+        Merges tasks extracted from several chunks: same title (case and
+        accent insensitive) and same due date are kept once.
+        """
+        seen = set()
+        unique = []
         for t in tasks_data:
-            # Handle due_date
-            due_date = t.get('due_date')
-            if due_date == "": due_date = None
-                
-            Task.objects.create(
-                title=t.get('title', 'Untitled Task'),
-                description=t.get('description', ''),
-                priority=t.get('priority', 'medium'),
-                status=t.get('status', 'todo'),
-                due_date=due_date,
-                organization=user.organization,
-                space=space
-            )
-            created_count += 1
-        return f"Génération réussie : {created_count} tâches créées."
+            title = unicodedata.normalize('NFKD', str(t.get('title', ''))).encode('ascii', 'ignore').decode()
+            key = (" ".join(title.lower().split()), str(t.get('due_date') or ''))
+            if key in seen:
+                continue
+            seen.add(key)
+            unique.append(t)
+        return unique
 
     @staticmethod
     def list_tasks(status=None, priority=None, due_date_range=None, limit=5, user=None):
@@ -256,32 +358,11 @@ class TaskTools:
         if priority:
             tasks = tasks.filter(priority=priority)
             
-        now = timezone.now()
-        if due_date_range == 'today':
-            start_day = now.replace(hour=0, minute=0, second=0, microsecond=0)
-            end_day = now.replace(hour=23, minute=59, second=59, microsecond=999999)
-            tasks = tasks.filter(due_date__range=[start_day, end_day])
-        elif due_date_range == 'this_week':
-            start_week = (now - timedelta(days=now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
-            end_week = (start_week + timedelta(days=6)).replace(hour=23, minute=59, second=59, microsecond=999999)
-            tasks = tasks.filter(due_date__range=[start_week, end_week])
-        elif due_date_range == 'this_month':
-            import calendar
-            last_day = calendar.monthrange(now.year, now.month)[1]
-            # Create aware datetimes for start and end of month
-            start_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            end_month = now.replace(day=last_day, hour=23, minute=59, second=59, microsecond=999999)
-            # end_month = now.replace(day=last_day, hour=23, minute=59, second=59, microsecond=999999) # Duplicate line removed
-            tasks = tasks.filter(due_date__range=[start_month, end_month])
-        elif due_date_range == 'last_month':
-            import calendar
-            # Calculate first day of this month, then subtract 1 day to get last month
-            first_of_this_month = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            last_of_last_month = first_of_this_month - timedelta(microseconds=1)
-            first_of_last_month = last_of_last_month.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-            tasks = tasks.filter(due_date__range=[first_of_last_month, last_of_last_month])
-        elif due_date_range == 'overdue':
-            tasks = tasks.filter(due_date__lt=now)
+        if due_date_range == 'overdue':
+            tasks = tasks.filter(due_date__lt=timezone.now())
+        elif due_date_range:
+            # Half-open range on due_date (index (organization, status, due_date))
+            tasks = tasks.filter(**range_filter('due_date', due_date_range))
             
         count = tasks.count()
         if count == 0:
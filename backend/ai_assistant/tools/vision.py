@@ -1,14 +1,24 @@
+import io
 import base64
+import hashlib
+import mimetypes
 import os
 from django.conf import settings
-from openai import OpenAI
+from django.core.cache import cache
+from PIL import Image, ImageOps
+from core.lazy import LazyImport
 
-try:
-    import google.generativeai as genai
-except ImportError:
-    genai = None
+OpenAI = LazyImport('openai', 'OpenAI')
+genai = LazyImport('google.generativeai')
 
 class VisionTools:
+    # Vision models downscale images to fit 2048px then 768px on the short side,
+    # anything above that is bandwidth the model never looks at.
+    MAX_LONG_SIDE = 2048
+    MAX_SHORT_SIDE = 768
+    JPEG_QUALITY = 85
+    CACHE_TIMEOUT = 60 * 60
+
     @staticmethod
     def analyze_image(file_path, prompt, user=None):
         """
@@ -26,13 +36,74 @@ class VisionTools:
         else:
              return VisionTools._analyze_with_openai(file_path, prompt, api_key, conf.get('BASE_URL'))
 
+    @staticmethod
+    def prepare_image(file_path):
+        """
+        Returns the payload sent to vision models for an image file:
+        {'mime_type', 'data' (bytes), 'width', 'height'}.
+        The image is downscaled to the useful model resolution, recompressed
+        and its real MIME type detected. Results are cached by file hash so
+        repeated questions about the same image skip the work.
+        """
+        with open(file_path, "rb") as image_file:
+            raw = image_file.read()
+
+        digest = hashlib.sha256(raw).hexdigest()
+        cache_key = f"vision:prepared:{digest}:{VisionTools.MAX_LONG_SIDE}:{VisionTools.MAX_SHORT_SIDE}:{VisionTools.JPEG_QUALITY}"
+        prepared = cache.get(cache_key)
+        if prepared is None:
+            prepared = VisionTools._prepare_bytes(raw, file_path)
+            cache.set(cache_key, prepared, VisionTools.CACHE_TIMEOUT)
+        return prepared
+
+    @staticmethod
+    def _prepare_bytes(raw, file_path=""):
+        try:
+            img = Image.open(io.BytesIO(raw))
+            img.load()
+        except Exception:
+            # Not something Pillow understands: ship it untouched
+            mime_type = mimetypes.guess_type(file_path)[0] or 'application/octet-stream'
+            return {'mime_type': mime_type, 'data': raw, 'width': None, 'height': None}
+
+        original_format = img.format
+        # Phone photos store rotation in EXIF, apply it before resizing
+        img = ImageOps.exif_transpose(img)
+
+        width, height = img.size
+        scale = min(
+            1.0,
+            VisionTools.MAX_LONG_SIDE / max(width, height),
+            VisionTools.MAX_SHORT_SIDE / min(width, height)
+        )
+        resized = scale < 1.0
+        if resized:
+            img = img.resize((max(1, round(width * scale)), max(1, round(height * scale))), Image.LANCZOS)
+
+        has_alpha = img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info)
+        buffer = io.BytesIO()
+        if has_alpha:
+            img.save(buffer, format='PNG', optimize=True)
+            mime_type = 'image/png'
+        else:
+            img.convert('RGB').save(buffer, format='JPEG', quality=VisionTools.JPEG_QUALITY, optimize=True)
+            mime_type = 'image/jpeg'
+        data = buffer.getvalue()
+
+        # Keep the original when it is already small and in a format models accept
+        if not resized and original_format in ('JPEG', 'PNG', 'WEBP', 'GIF') and len(raw) <= len(data):
+            data = raw
+            mime_type = Image.MIME.get(original_format, mime_type)
+
+        return {'mime_type': mime_type, 'data': data, 'width': img.size[0], 'height': img.size[1]}
+
     @staticmethod
     def _analyze_with_openai(file_path, prompt, api_key, base_url):
         client = OpenAI(api_key=api_key, base_url=base_url)
-        
-        # Encode image
-        with open(file_path, "rb") as image_file:
-            base64_image = base64.b64encode(image_file.read()).decode('utf-8')
+
+        # Downscaled, recompressed and cached payload
+        prepared = VisionTools.prepare_image(file_path)
+        base64_image = base64.b64encode(prepared['data']).decode('utf-8')
 
         try:
             response = client.chat.completions.create(
@@ -45,7 +116,7 @@ class VisionTools:
                             {
                                 "type": "image_url",
                                 "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image}"
+                                    "url": f"data:{prepared['mime_type']};base64,{base64_image}"
                                 },
                             },
                         ],
@@ -61,18 +132,16 @@ class VisionTools:
     def _analyze_with_gemini(file_path, prompt, api_key):
         if not genai:
             return "Error: google-generativeai not installed."
-            
+
         genai.configure(api_key=api_key)
         # Gemini Pro Vision or 1.5 Flash
-        model = genai.GenerativeModel('gemini-1.5-flash') 
-        
+        model = genai.GenerativeModel('gemini-1.5-flash')
+
         try:
-            # Uploading file to Gemini API or passing bytes?
-            # GenAI python SDK supports PIL images or bytes
-            import PIL.Image
-            img = PIL.Image.open(file_path)
-            
-            response = model.generate_content([prompt, img])
+            # GenAI python SDK accepts inline blobs, reuse the prepared payload
+            prepared = VisionTools.prepare_image(file_path)
+
+            response = model.generate_content([prompt, {'mime_type': prepared['mime_type'], 'data': prepared['data']}])
             return response.text
         except Exception as e:
             return f"Error analyzing image with Gemini: {str(e)}"
@@ -0,0 +1,48 @@
+from datetime import datetime, time, timedelta
+from django.utils import timezone
+
+PERIODS = ('today', 'this_week', 'this_month', 'last_month', 'this_year')
+
+
+def _month_start(day):
+    return day.replace(day=1)
+
+
+def period_range(period, now=None):
+    """
+    Half-open [start, end) bounds of a period as aware datetimes of the current
+    time zone, or None for an unknown period ('all_time').
+    """
+    today = timezone.localtime(now or timezone.now()).date()
+    if period == 'today':
+        start, end = today, today + timedelta(days=1)
+    elif period == 'this_week':
+        start = today - timedelta(days=today.weekday())
+        end = start + timedelta(days=7)
+    elif period == 'this_month':
+        start = _month_start(today)
+        end = _month_start(start + timedelta(days=32))
+    elif period == 'last_month':
+        end = _month_start(today)
+        start = _month_start(end - timedelta(days=1))
+    elif period == 'this_year':
+        start, end = today.replace(month=1, day=1), today.replace(year=today.year + 1, month=1, day=1)
+    else:
+        return None
+    tz = timezone.get_current_timezone()
+    return timezone.make_aware(datetime.combine(start, time.min), tz), timezone.make_aware(datetime.combine(end, time.min), tz)
+
+
+def range_filter(field, period, date_only=False, now=None):
+    """
+    {field__gte: start, field__lt: end} for the period: a range on the column,
+    which an index on it can serve (unlike __month/__year, which wrap the
+    column in EXTRACT()). date_only for DateFields.
+    """
+    bounds = period_range(period, now)
+    if bounds is None:
+        return {}
+    start, end = bounds
+    if date_only:
+        start, end = start.date(), end.date()
+    return {f"{field}__gte": start, f"{field}__lt": end}
@@ -1,7 +1,10 @@
 import json
 from django.conf import settings
 from django.db import connections
-from chromadb.utils import embedding_functions
+from core.lazy import LazyImport
+
+# chromadb takes most of the startup time, only needed once texts are embedded
+embedding_functions = LazyImport('chromadb.utils.embedding_functions')
 
 class VectorStore:
     _embedding_function = None
@@ -18,7 +21,8 @@ class VectorStore:
                 try:
                      cls._embedding_function = embedding_functions.OpenAIEmbeddingFunction(
                         api_key=openai_key,
-                        model_name="text-embedding-3-small"
+                        model_name="text-embedding-3-small",
+                        api_base=settings.AI_CONF.get('EMBEDDING_BASE_URL')
                     )
                 except Exception as e:
                     print(f"Error initializing OpenAI Embedding Function: {e}")
@@ -2,6 +2,7 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.http import StreamingHttpResponse
+from core.pagination import KeysetPagination
 from .services import LLMService
 import types
 
@@ -180,9 +181,13 @@ class UploadFileView(APIView):
 
 class HistoryView(APIView):
     permission_classes = [IsAuthenticated]
+    keyset_ordering = ('-updated_at', '-id')
 
     def get(self, request):
-        conversations = Conversation.objects.filter(user=request.user).order_by('-updated_at')
+        paginator = KeysetPagination()
+        conversations = paginator.paginate_queryset(
+            Conversation.objects.filter(user=request.user).only('id', 'title', 'created_at', 'updated_at'), request, view=self
+        )
         data = []
         for c in conversations:
             data.append({
@@ -191,10 +196,15 @@ class HistoryView(APIView):
                 'created_at': c.created_at,
                 'updated_at': c.updated_at
             })
-        return Response(data)
+        return paginator.get_paginated_response(data)
 
 class ConversationDetailView(APIView):
+    """
+    Messages of a conversation, latest page first: 'next' leads to older
+    messages. Each page is in chronological order.
+    """
     permission_classes = [IsAuthenticated]
+    keyset_ordering = ('-created_at', '-id')
 
     def get(self, request, conversation_id):
         try:
@@ -202,9 +212,10 @@ class ConversationDetailView(APIView):
         except Conversation.DoesNotExist:
             return Response({'error': 'Conversation not found'}, status=404)
         
-        messages = conversation.messages.all()
+        paginator = KeysetPagination()
+        messages = paginator.paginate_queryset(conversation.messages.all(), request, view=self)
         data = []
-        for m in messages:
+        for m in reversed(messages):
             data.append({
                 'role': m.role,
                 'content': m.content,
@@ -212,7 +223,7 @@ class ConversationDetailView(APIView):
                 'sources': m.sources,
                 'created_at': m.created_at
             })
-        return Response(data)
+        return paginator.get_paginated_response(data)
 
     def delete(self, request, conversation_id):
         try:
@@ -0,0 +1,324 @@
+"""
+Compiled automation rules.
+
+Active rules are compiled once per (organization, model, event) into plain
+Python predicates and pre-parsed templates, then kept in memory. The plan is
+rebuilt when a rule of the organization changes: saving or deleting a rule
+replaces a version token in the default cache. With a shared cache every
+process notices at once; with a per-process cache (the default LocMemCache)
+the other processes (web workers, run_outbox) only rebuild once their plan
+is AUTOMATION_PLAN_MAX_AGE seconds old.
+
+Rules see the field-level diff of the save ({field: [old, new]}, see
+core.models.ChangeTrackingMixin). Conditions can test current values
+(equals, neq, contains, gt, lt) or the transition itself (changed,
+changed_to, changed_from). Saves made by actions never trigger automation
+again.
+"""
+import time
+import uuid
+import logging
+import threading
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.core.mail import send_mail
+from django.core.exceptions import FieldDoesNotExist
+from django.template import Template, Context
+from django.contrib.auth import get_user_model
+from core import outbox
+
+logger = logging.getLogger(__name__)
+
+PLAN_MAX_AGE = getattr(settings, 'AUTOMATION_PLAN_MAX_AGE', 30)
+
+_plans = {} # (organization_id, model, event) -> (version token, compiled at, [CompiledRule])
+_lock = threading.Lock()
+_local = threading.local()
+
+CHANGE_OPERATORS = ('changed', 'changed_to', 'changed_from')
+
+
+# --- Conditions ---
+
+class CompiledCondition:
+    def __init__(self, field, operator, value, change_key=None):
+        self.field = field
+        # Changes are keyed by field name: 'assigned_to_id' is found under 'assigned_to'
+        self.change_key = change_key or field
+        self.operator = operator
+        self.value = value
+        self.str_value = str(value) if value is not None else ''
+        self.lower_value = self.str_value.lower()
+        try:
+            self.float_value = float(value)
+        except (TypeError, ValueError):
+            self.float_value = None
+
+    def _same(self, value):
+        """Flexible comparison of a raw value with the rule value."""
+        str_val = str(value) if value is not None else ''
+        if str_val == self.str_value or str_val.lower() == self.lower_value:
+            return True
+        try:
+            return self.float_value is not None and float(value) == self.float_value
+        except (TypeError, ValueError):
+            return False
+
+    def test(self, instance, changes=None):
+        if self.operator in CHANGE_OPERATORS:
+            change = (changes or {}).get(self.change_key)
+            if change is None:
+                return False
+            if self.operator == 'changed_to':
+                return self._same(change[1])
+            if self.operator == 'changed_from':
+                return self._same(change[0])
+            return True
+
+        instance_value = getattr(instance, self.field, None)
+        str_inst_val = str(instance_value) if instance_value is not None else ''
+
+        if self.operator == 'equals':
+            # Flexible comparison: Exact or Case-insensitive
+            return str_inst_val == self.str_value or str_inst_val.lower() == self.lower_value
+        if self.operator == 'contains':
+            return self.lower_value in str_inst_val.lower()
+        if self.operator == 'neq':
+            return str_inst_val != self.str_value
+        if self.operator in ('gt', 'lt'):
+            try:
+                number = float(instance_value)
+            except (TypeError, ValueError):
+                return False
+            if self.float_value is None:
+                return False
+            return number > self.float_value if self.operator == 'gt' else number < self.float_value
+        # Unknown operators never block a rule (same as before)
+        return True
+
+
+# --- Actions ---
+
+class CompiledAction:
+    def __init__(self, action):
+        self.type = action.get('type')
+        self.config = action.get('config', {}) or {}
+        self.error = None
+        self.template = None
+        try:
+            if self.type == 'send_email':
+                self.template = Template(self.config.get('subject', 'Automation: {{ instance }}'))
+            elif self.type == 'create_task':
+                self.template = Template(self.config.get('title', 'Task for {{ instance }}'))
+        except Exception as e:
+            # Reported as a failed execution instead of breaking the whole plan
+            self.error = e
+
+    def run(self, rule, instance, actor, get_context):
+        if self.error:
+            raise self.error
+
+        if self.type == 'send_email':
+            recipient = self._resolve_user(self.config.get('recipient_id'), actor)
+            if recipient and recipient.email:
+                send_mail(
+                    self.template.render(get_context()),
+                    f"Notification from Automation Rule: {rule.name}\n\nTriggered by: {instance}\nAction performed by: {actor}",
+                    'noreply@crm.com',
+                    [recipient.email],
+                    fail_silently=True
+                )
+
+        elif self.type == 'create_task':
+            from tasks.models import Task
+            Task.objects.create(
+                title=self.template.render(get_context()),
+                organization=instance.organization,
+                assigned_to=self._resolve_user(self.config.get('assigned_to_id'), actor),
+                space=getattr(instance, 'space', None),
+                created_by=actor # Keep chain of ownership
+            )
+
+        elif self.type == 'update_field':
+            field_name = self.config.get('field')
+            if not field_name or not hasattr(instance, field_name):
+                logger.warning(f"Automation '{rule.name}': field {field_name} not found on {instance._meta.model_name}")
+                return
+            # Assuming string compatible fields (Status, Choices, etc.)
+            setattr(instance, field_name, self.config.get('value'))
+            instance.save(update_fields=[field_name])
+
+    @staticmethod
+    def _resolve_user(user_id, actor):
+        if user_id == '__actor__':
+            return actor
+        if not user_id:
+            return None
+        try:
+            return get_user_model().objects.get(id=user_id)
+        except Exception:
+            logger.warning(f"Automation: user {user_id} not found")
+            return None
+
+
+# --- Rules ---
+
+def _field_name(model, field):
+    """Name of a model field given by name or attname ('assigned_to_id' -> 'assigned_to')."""
+    if model is None:
+        return field
+    try:
+        return model._meta.get_field(field).name
+    except FieldDoesNotExist:
+        return field
+
+
+class CompiledRule:
+    def __init__(self, rule):
+        from .signals import TRIGGER_MODELS
+        model = TRIGGER_MODELS.get(rule.trigger_model)
+        self.id = rule.id
+        self.name = rule.name
+        self.conditions = [
+            CompiledCondition(cond['field'], cond.get('operator', 'equals'), cond.get('value'), _field_name(model, cond['field']))
+            for cond in (rule.conditions if isinstance(rule.conditions, list) else [])
+            if isinstance(cond, dict) and cond.get('field')
+        ]
+        self.actions = [CompiledAction(action) for action in (rule.actions if isinstance(rule.actions, list) else [])]
+        self.fields = {cond.change_key for cond in self.conditions}
+
+    def is_relevant(self, changes):
+        """
+        On updates, a rule with conditions only needs evaluating when one of
+        its condition fields changed.
+        """
+        if not self.fields:
+            return True
+        return not self.fields.isdisjoint(changes)
+
+    def matches(self, instance, changes=None):
+        # AND logic
+        return all(condition.test(instance, changes) for condition in self.conditions)
+
+    def execute(self, instance):
+        actor = getattr(instance, 'created_by', None)
+        context = []
+
+        def get_context():
+            # Built once, and only for rules that render templates
+            if not context:
+                context.append(build_context(instance, actor))
+            return context[0]
+
+        for action in self.actions:
+            action.run(self, instance, actor, get_context)
+
+
+def build_context(instance, actor):
+    current_ctx = {'instance': instance}
+    if actor:
+        current_ctx['actor'] = actor
+    # Add scalar fields safely
+    for field in instance._meta.fields:
+        try:
+            val = getattr(instance, field.name)
+            if val is not None:
+                current_ctx[field.name] = str(val)
+        except Exception:
+            pass
+    return Context(current_ctx)
+
+
+# --- Plan cache ---
+
+def _version_key(organization_id):
+    return f"automation:rules:{organization_id}"
+
+def _current_version(organization_id):
+    key = _version_key(organization_id)
+    version = cache.get(key)
+    if version is None:
+        # Unknown (first use or evicted): start a new version so no stale plan is reused
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+def invalidate(organization_id):
+    """Drops the compiled plans of an organization (other processes: see the module docstring)."""
+    cache.set(_version_key(organization_id), uuid.uuid4().hex, None)
+    with _lock:
+        for key in [key for key in _plans if key[0] == str(organization_id)]:
+            del _plans[key]
+
+def get_plan(organization_id, model_name, event_type):
+    """Compiled active rules for (organization, model, 'create'/'update')."""
+    from .models import AutomationRule
+
+    version = _current_version(organization_id)
+    key = (str(organization_id), model_name, event_type)
+    cached = _plans.get(key)
+    if cached and cached[0] == version and time.monotonic() - cached[1] < PLAN_MAX_AGE:
+        return cached[2]
+
+    rules = AutomationRule.objects.filter(
+        organization_id=organization_id,
+        trigger_model=model_name,
+        trigger_event=event_type,
+        is_active=True
+    ).order_by('created_at')
+    plan = [CompiledRule(rule) for rule in rules]
+    with _lock:
+        _plans[key] = (version, time.monotonic(), plan)
+    return plan
+
+def creation_changes(instance):
+    """On creation every field changes from nothing to its initial value."""
+    return {field.name: [None, getattr(instance, field.attname)] for field in instance._meta.concrete_fields}
+
+def run(instance, created, changes=None):
+    """
+    Evaluates the plan for a saved instance and executes matching rules.
+    changes: {field: [old, new]} of the update (None = unknown, every rule
+    is evaluated). Returns [(CompiledRule, error or None)] for the rules that fired.
+    """
+    if getattr(_local, 'running', False):
+        # Re-entrancy guard: an action's own saves never cascade into rules
+        return []
+
+    model_name = instance._meta.model_name
+    event_type = 'create' if created else 'update'
+    plan = get_plan(instance.organization_id, model_name, event_type)
+    if created:
+        changes = creation_changes(instance)
+    elif changes is not None:
+        if not changes:
+            return []
+        plan = [rule for rule in plan if rule.is_relevant(changes)]
+
+    return fire(plan, instance, changes)
+
+def fire(plan, instance, changes=None):
+    """
+    Executes the rules of the plan whose conditions match the instance.
+    Returns [(CompiledRule, error or None)] for the rules that fired.
+    """
+    fired = []
+    _local.running = True
+    try:
+        # Saves made by actions are still indexed/logged, but not sent back to automation
+        with outbox.suppressed('automation.trigger'):
+            for rule in plan:
+                if not rule.matches(instance, changes):
+                    continue
+                logger.debug(f"Automation rule {rule.name} matched {instance._meta.model_name} {instance.pk}")
+                try:
+                    with transaction.atomic():
+                        rule.execute(instance)
+                    fired.append((rule, None))
+                except Exception as e:
+                    logger.warning(f"Automation rule {rule.name} failed on {instance._meta.model_name} {instance.pk}: {e}")
+                    fired.append((rule, e))
+    finally:
+        _local.running = False
+    return fired
@@ -0,0 +1,54 @@
+"""
+Buffered AutomationLog writer.
+
+Inside `with buffered():` log entries are collected and written with a
+single bulk_create when the block exits (or every FLUSH_SIZE entries), so a
+job that fires rules for many objects costs one INSERT instead of one per
+rule and object. Outside a buffer, record() writes immediately.
+"""
+import threading
+from contextlib import contextmanager
+from .models import AutomationLog
+
+FLUSH_SIZE = 500
+
+_local = threading.local()
+
+
+def record(rule_id, target_model, target_id, status, details=''):
+    entry = AutomationLog(
+        rule_id=rule_id,
+        target_model=target_model,
+        target_id=str(target_id),
+        status=status,
+        details=details
+    )
+    buffer = getattr(_local, 'buffer', None)
+    if buffer is None:
+        entry.save()
+        return
+    buffer.append(entry)
+    if len(buffer) >= FLUSH_SIZE:
+        flush()
+
+
+def flush():
+    buffer = getattr(_local, 'buffer', None)
+    if buffer:
+        AutomationLog.objects.bulk_create(buffer)
+        buffer.clear()
+
+
+@contextmanager
+def buffered():
+    """Collects the log entries of a request or job. Nested blocks share the outer buffer."""
+    if getattr(_local, 'buffer', None) is not None:
+        yield
+        return
+
+    _local.buffer = []
+    try:
+        yield
+        flush()
+    finally:
+        _local.buffer = None
@@ -0,0 +1,73 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from automation.models import AutomationLog, AutomationLogDaily
+
+class Command(BaseCommand):
+    help = 'Aggregates automation logs older than the retention period into per-rule daily counters and deletes the raw rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Raw logs kept for this many days')
+        parser.add_argument('--batch', type=int, default=5000, help='Rows compacted per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would be compacted')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        old_logs = AutomationLog.objects.filter(created_at__lt=cutoff)
+
+        if options['dry_run']:
+            self.stdout.write(f"{old_logs.count()} logs older than {cutoff:%Y-%m-%d} would be compacted.")
+            return
+
+        total = 0
+        while True:
+            with transaction.atomic():
+                ids = list(old_logs.order_by('id').values_list('id', flat=True)[:options['batch']])
+                if not ids:
+                    break
+                self._compact(ids)
+                total += len(ids)
+            self.stdout.write(f"Compacted {total} logs...")
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {total} logs compacted into daily counters."))
+
+    def _compact(self, ids):
+        counts = {}
+        rows = (
+            AutomationLog.objects.filter(id__in=ids)
+            .annotate(day=TruncDate('created_at'))
+            .values('rule_id', 'day', 'status')
+            .annotate(total=Count('id'))
+            .order_by()
+        )
+        for row in rows:
+            key = (row['rule_id'], row['day'])
+            counts.setdefault(key, {'success': 0, 'failed': 0, 'partial': 0})
+            if row['status'] in counts[key]:
+                counts[key][row['status']] += row['total']
+
+        # Add to the counters of days compacted by an earlier batch/run
+        existing = {
+            (daily.rule_id, daily.date): daily
+            for daily in AutomationLogDaily.objects.select_for_update().filter(
+                rule_id__in={rule_id for rule_id, _ in counts},
+                date__in={day for _, day in counts}
+            )
+        }
+        to_create, to_update = [], []
+        for (rule_id, day), values in counts.items():
+            daily = existing.get((rule_id, day))
+            if daily is None:
+                to_create.append(AutomationLogDaily(rule_id=rule_id, date=day, **values))
+                continue
+            daily.success += values['success']
+            daily.failed += values['failed']
+            daily.partial += values['partial']
+            to_update.append(daily)
+
+        AutomationLogDaily.objects.bulk_create(to_create)
+        AutomationLogDaily.objects.bulk_update(to_update, ['success', 'failed', 'partial'])
+        AutomationLog.objects.filter(id__in=ids).delete()
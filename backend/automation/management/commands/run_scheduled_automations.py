@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from automation.scheduler import run_scheduled_rules
+
+class Command(BaseCommand):
+    help = 'Evaluates time-based automation rules (task due dates, contract end dates). Safe to run every minute.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rule', help='Only run this rule (id)')
+        parser.add_argument('--batch', type=int, default=500, help='Rows fetched per query while scanning')
+
+    def handle(self, *args, **options):
+        summary = run_scheduled_rules(rule_id=options['rule'], batch_size=options['batch'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{summary['rules']} scheduled rules run: {summary['scanned']} newly due objects, {summary['fired']} executions."
+        ))
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.26 on 2026-10-19 17:21
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automation', '0002_remove_automationrule_action_config_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AutomationLogDaily',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('success', models.PositiveIntegerField(default=0)),
+                ('failed', models.PositiveIntegerField(default=0)),
+                ('partial', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-date'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='automationlog',
+            index=models.Index(fields=['created_at'], name='automationlog_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='automationlogdaily',
+            name='rule',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_stats', to='automation.automationrule'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='automationlogdaily',
+            unique_together={('rule', 'date')},
+        ),
+    ]
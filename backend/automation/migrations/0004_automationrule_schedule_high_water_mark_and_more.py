@@ -0,0 +1,28 @@
+# Generated by Django 4.2.26 on 2026-10-19 17:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('automation', '0003_automationlogdaily'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='automationrule',
+            name='schedule_high_water_mark',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='automationrule',
+            name='schedule_offset_days',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='automationrule',
+            name='trigger_event',
+            field=models.CharField(choices=[('create', 'Created'), ('update', 'Updated'), ('scheduled', 'Date Reached')], max_length=50),
+        ),
+    ]
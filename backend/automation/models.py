@@ -10,6 +10,7 @@ class AutomationRule(models.Model):
     TRIGGER_EVENTS = (
         ('create', 'Created'),
         ('update', 'Updated'),
+        ('scheduled', 'Date Reached'), # Evaluated by run_scheduled_automations
     )
     ACTION_TYPES = (
         ('send_email', 'Send Email'),
@@ -23,6 +24,13 @@ class AutomationRule(models.Model):
     # Trigger
     trigger_model = models.CharField(max_length=50, choices=TRIGGER_MODELS)
     trigger_event = models.CharField(max_length=50, choices=TRIGGER_EVENTS)
+
+    # Scheduled triggers: fire when the task due date / contract end date is
+    # less than schedule_offset_days away (0 = overdue, 30 = "ends in 30 days",
+    # -3 = "overdue for 3 days").
+    schedule_offset_days = models.IntegerField(default=0)
+    # Everything with a date up to this point has already been processed
+    schedule_high_water_mark = models.DateTimeField(null=True, blank=True)
     
     # Advanced Conditions (JSON List): [{ "field": "status", "operator": "equals", "value": "done" }]
     conditions = models.JSONField(default=list, blank=True, help_text="List of conditions (AND logic)")
@@ -54,3 +62,25 @@ class AutomationLog(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Retention scans (compact_automation_logs) walk old rows by date
+            models.Index(fields=['created_at'], name='automationlog_created_idx'),
+        ]
+
+class AutomationLogDaily(models.Model):
+    """
+    Per-rule daily counters that replace raw AutomationLog rows once they are
+    older than the retention period (see compact_automation_logs).
+    """
+    rule = models.ForeignKey(AutomationRule, on_delete=models.CASCADE, related_name='daily_stats')
+    date = models.DateField()
+    success = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    partial = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-date']
+        unique_together = ('rule', 'date')
+
+    def __str__(self):
+        return f"{self.rule.name} {self.date}: {self.success}/{self.failed}/{self.partial}"
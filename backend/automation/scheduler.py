@@ -0,0 +1,132 @@
+"""
+Time-based ('scheduled') automation rules.
+
+A scheduled rule fires once for each task whose due date, or contract whose
+end date, comes within schedule_offset_days. Each run only scans the window
+between the rule's high-water mark and the new threshold, with a range
+condition on the indexed (organization, date) columns. Rows are never
+re-read, and each run touches only what became due since the last one.
+
+Rows that land behind the mark (a task created already overdue, a due date
+moved back past it) are out of every later window: fire_late() runs the
+rule for them when they are saved (automation.signals).
+"""
+from datetime import timedelta
+from django.db import transaction
+from django.db.models import DateTimeField
+from django.utils import timezone
+from tasks.models import Task
+from crm.models import Contract
+from .models import AutomationRule
+from . import engine, logs
+
+# trigger_model -> (model, date field scanned)
+SCHEDULE_DATE_FIELDS = {
+    'task': (Task, 'due_date'),
+    'contract': (Contract, 'end_date'),
+}
+
+
+def run_scheduled_rules(now=None, rule_id=None, batch_size=500):
+    """Runs every active scheduled rule. Returns {'rules', 'scanned', 'fired'}."""
+    now = now or timezone.now()
+    rules = AutomationRule.objects.filter(
+        trigger_event='scheduled', is_active=True, trigger_model__in=list(SCHEDULE_DATE_FIELDS)
+    )
+    if rule_id:
+        rules = rules.filter(pk=rule_id)
+
+    summary = {'rules': 0, 'scanned': 0, 'fired': 0}
+    for pk in rules.values_list('id', flat=True):
+        scanned, fired = run_rule(pk, now, batch_size)
+        summary['rules'] += 1
+        summary['scanned'] += scanned
+        summary['fired'] += fired
+    return summary
+
+
+def rule_window(rule, now):
+    """(start, end] datetimes of the dates a run of the rule must process."""
+    offset = timedelta(days=rule.schedule_offset_days)
+    # A new rule starts from its creation: it does not replay the whole history
+    start = rule.schedule_high_water_mark or (rule.created_at + offset)
+    return start, now + offset
+
+
+def run_rule(rule_id, now, batch_size=500):
+    with transaction.atomic():
+        # Lock the rule: overlapping runs (cron every minute) skip it instead of firing twice
+        rule = AutomationRule.objects.select_for_update(skip_locked=True).filter(pk=rule_id, is_active=True).first()
+        if rule is None:
+            return 0, 0
+
+        model, date_field = SCHEDULE_DATE_FIELDS[rule.trigger_model]
+        start, end = rule_window(rule, now)
+        if end <= start:
+            return 0, 0
+
+        if not isinstance(model._meta.get_field(date_field), DateTimeField):
+            # Date-only column: compare calendar days
+            start, end = timezone.localdate(start), timezone.localdate(end)
+
+        queryset = model.objects.filter(**{
+            'organization_id': rule.organization_id,
+            f'{date_field}__gt': start,
+            f'{date_field}__lte': end,
+        }).order_by(date_field, 'pk')
+
+        plan = [engine.CompiledRule(rule)]
+        scanned = fired = 0
+        with logs.buffered():
+            for instance in queryset.iterator(chunk_size=batch_size):
+                scanned += 1
+                for compiled, error in engine.fire(plan, instance):
+                    fired += 1
+                    logs.record(
+                        compiled.id,
+                        rule.trigger_model,
+                        instance.pk,
+                        'failed' if error else 'success',
+                        str(error) if error else 'All actions executed successfully'
+                    )
+
+        # update() rather than save(): moving the mark is not a rule change, cached plans stay valid
+        AutomationRule.objects.filter(pk=rule.pk).update(schedule_high_water_mark=now + timedelta(days=rule.schedule_offset_days))
+        return scanned, fired
+
+
+def fire_late(instance, created, changes=None):
+    """
+    Runs the scheduled rules whose high-water mark the instance's date is
+    already behind, when it was just created with that date or moved there
+    from ahead of the mark (a row that was behind it already fired).
+    Returns [(CompiledRule, error or None)] for the rules that fired.
+    """
+    entry = SCHEDULE_DATE_FIELDS.get(instance._meta.model_name)
+    if entry is None:
+        return []
+    model, date_field = entry
+    value = getattr(instance, date_field)
+    if value is None or not (created or (changes and date_field in changes)):
+        return []
+
+    field = model._meta.get_field(date_field)
+    previous = None if created else field.to_python(changes[date_field][0])
+    now = timezone.now()
+    fired = []
+    with transaction.atomic():
+        # Waits for a run in progress: its new mark decides whether the row is late
+        rules = AutomationRule.objects.select_for_update().filter(
+            organization_id=instance.organization_id, trigger_model=instance._meta.model_name,
+            trigger_event='scheduled', is_active=True,
+        )
+        for rule in rules:
+            mark, _ = rule_window(rule, now)
+            # Like the runs, dates from before the rule are not replayed
+            since = rule.created_at + timedelta(days=rule.schedule_offset_days)
+            if not isinstance(field, DateTimeField):
+                mark, since = timezone.localdate(mark), timezone.localdate(since)
+            if not since < value <= mark or (previous is not None and previous <= mark):
+                continue
+            fired.extend(engine.fire([engine.CompiledRule(rule)], instance))
+    return fired
@@ -5,7 +5,7 @@ class AutomationRuleSerializer(serializers.ModelSerializer):
     class Meta:
         model = AutomationRule
         fields = '__all__'
-        read_only_fields = ('organization',)
+        read_only_fields = ('organization', 'schedule_high_water_mark')
 
 class AutomationLogSerializer(serializers.ModelSerializer):
     rule_name = serializers.CharField(source='rule.name', read_only=True)
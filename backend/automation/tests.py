@@ -0,0 +1,312 @@
+import time
+from io import StringIO
+from unittest.mock import patch
+from django.test import TestCase
+from crum import impersonate
+from core.models import OutboxEvent
+from django.contrib.auth import get_user_model
+from core.models import Organization
+from tasks.models import Task
+from automation import engine
+from automation.models import AutomationRule, AutomationLog
+from automation.signals import trigger_automation
+
+User = get_user_model()
+
+
+class AutomationEngineTest(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="Org Automation")
+        self.user = User.objects.create_user(username='auto', email='auto@test.com', password='pw', organization=self.org)
+        self.task = Task.objects.create(title="Livrer", status='done', organization=self.org, created_by=self.user)
+
+    def _rule(self, **kwargs):
+        defaults = dict(
+            name="Suivi", organization=self.org, trigger_model='task', trigger_event='update',
+            conditions=[{'field': 'status', 'operator': 'equals', 'value': 'DONE'}],
+            actions=[{'type': 'create_task', 'config': {'title': 'Suivi de {{ title }}', 'assigned_to_id': '__actor__'}}]
+        )
+        defaults.update(kwargs)
+        return AutomationRule.objects.create(**defaults)
+
+    def test_matching_rule_executes_compiled_actions(self):
+        rule = self._rule()
+        trigger_automation(sender=Task, instance=self.task, created=False)
+
+        follow_up = Task.objects.get(title="Suivi de Livrer")
+        self.assertEqual(follow_up.assigned_to, self.user)
+        self.assertEqual(AutomationLog.objects.get(rule=rule).status, 'success')
+
+    def test_plan_is_compiled_once_and_cached(self):
+        self._rule(actions=[{'type': 'update_field', 'config': {'field': 'priority', 'value': 'high'}}])
+        engine.get_plan(self.org.id, 'task', 'update')
+
+        with patch('automation.engine.Template') as mock_template, self.assertNumQueries(0):
+            plan = engine.get_plan(self.org.id, 'task', 'update')
+        mock_template.assert_not_called()
+        self.assertEqual(len(plan), 1)
+
+    def test_rule_change_invalidates_plan(self):
+        rule = self._rule()
+        self.assertEqual(len(engine.get_plan(self.org.id, 'task', 'update')), 1)
+
+        rule.is_active = False
+        rule.save()
+        self.assertEqual(engine.get_plan(self.org.id, 'task', 'update'), [])
+
+        self._rule(name="Autre")
+        self.assertEqual([r.name for r in engine.get_plan(self.org.id, 'task', 'update')], ["Autre"])
+
+    def test_plan_of_another_process_expires(self):
+        rule = self._rule()
+        self.assertEqual(len(engine.get_plan(self.org.id, 'task', 'update')), 1)
+        # Deactivated in another process: the version token of this one did not change
+        AutomationRule.objects.filter(pk=rule.pk).update(is_active=False)
+        self.assertEqual(len(engine.get_plan(self.org.id, 'task', 'update')), 1)
+
+        with patch('automation.engine.time.monotonic', return_value=time.monotonic() + engine.PLAN_MAX_AGE):
+            self.assertEqual(engine.get_plan(self.org.id, 'task', 'update'), [])
+
+    def test_condition_on_attname_sees_the_change(self):
+        self._rule(conditions=[{'field': 'assigned_to_id', 'operator': 'changed_to', 'value': str(self.user.id)}])
+        Task.objects.filter(pk=self.task.pk).update(assigned_to=self.user)
+        self.task.refresh_from_db()
+        # Change keys are field names (ChangeTrackingMixin)
+        trigger_automation(sender=Task, instance=self.task, created=False, changes={'assigned_to': [None, self.user.id]})
+        self.assertTrue(Task.objects.filter(title="Suivi de Livrer").exists())
+
+    def test_rules_are_scoped_to_model_and_event(self):
+        self._rule(trigger_event='create')
+        self._rule(trigger_model='contract')
+        self.assertEqual(engine.get_plan(self.org.id, 'task', 'update'), [])
+
+    def test_only_rules_on_written_fields_are_evaluated(self):
+        self._rule()
+        with patch.object(engine.CompiledCondition, 'test', return_value=True) as mock_test:
+            trigger_automation(sender=Task, instance=self.task, created=False, changes={'title': ['A', 'B']})
+            mock_test.assert_not_called()
+            trigger_automation(sender=Task, instance=self.task, created=False, changes={'status': ['todo', 'done']})
+            mock_test.assert_called_once()
+
+    def test_operators(self):
+        cases = [
+            ('equals', 'DONE', True), ('neq', 'done', False), ('contains', 'ON', True),
+            ('gt', '1', False), ('lt', 'x', False),
+        ]
+        for operator, value, expected in cases:
+            with self.subTest(operator=operator):
+                self.assertEqual(engine.CompiledCondition('status', operator, value).test(self.task), expected)
+
+    def test_failed_action_is_logged(self):
+        rule = self._rule(actions=[{'type': 'create_task', 'config': {'title': '{% if %}'}}])
+        trigger_automation(sender=Task, instance=self.task, created=False)
+        self.assertEqual(AutomationLog.objects.get(rule=rule).status, 'failed')
+
+
+class ChangeAwareTriggerTest(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="Org Changes")
+        self.user = User.objects.create_user(username='changes', email='changes@test.com', password='pw', organization=self.org)
+        self.task = Task.objects.create(title="Livrer", status='todo', organization=self.org, created_by=self.user)
+        self.task = Task.objects.get(pk=self.task.pk)
+        vector_patch = patch('ai_assistant.signals.VectorStore')
+        vector_patch.start()
+        self.addCleanup(vector_patch.stop)
+        self.rule = AutomationRule.objects.create(
+            name="Terminée", organization=self.org, trigger_model='task', trigger_event='update',
+            conditions=[{'field': 'status', 'operator': 'changed_to', 'value': 'done'}],
+            actions=[{'type': 'update_field', 'config': {'field': 'priority', 'value': 'high'}}]
+        )
+
+    def _save(self, **fields):
+        for name, value in fields.items():
+            setattr(self.task, name, value)
+        with impersonate(self.user), self.settings(OUTBOX_CONF={'MODE': 'sync'}), \
+             self.captureOnCommitCallbacks(execute=True):
+            self.task.save()
+
+    def test_loaded_values_give_the_diff_without_query(self):
+        self.task.status = 'done'
+        with self.assertNumQueries(0):
+            changes = self.task.get_changes()
+        self.assertEqual(changes, {'status': ('todo', 'done')})
+
+        self.task.save()
+        self.assertEqual(self.task.get_changes(), {})
+
+    def test_noop_save_publishes_nothing(self):
+        before = OutboxEvent.objects.count()
+        self.task.save()
+        self.assertEqual(OutboxEvent.objects.count(), before)
+
+    def test_changed_to_fires_on_transition_only(self):
+        self._save(title="Livrer v2")
+        self.assertFalse(AutomationLog.objects.filter(rule=self.rule).exists())
+
+        self._save(status='done')
+        self.assertEqual(AutomationLog.objects.filter(rule=self.rule, status='success').count(), 1)
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.priority, 'high')
+
+        # Still 'done', an unrelated edit does not fire again
+        self._save(title="Livrer v3")
+        self.assertEqual(AutomationLog.objects.filter(rule=self.rule).count(), 1)
+
+    def test_changed_and_changed_from(self):
+        changes = {'status': ['in_progress', 'done']}
+        self.assertTrue(engine.CompiledCondition('status', 'changed', None).test(self.task, changes))
+        self.assertTrue(engine.CompiledCondition('status', 'changed_from', 'IN_PROGRESS').test(self.task, changes))
+        self.assertFalse(engine.CompiledCondition('status', 'changed_from', 'todo').test(self.task, changes))
+        self.assertFalse(engine.CompiledCondition('priority', 'changed', None).test(self.task, changes))
+
+    def test_actions_do_not_cascade(self):
+        # A second rule that would loop if the action's save re-entered automation
+        AutomationRule.objects.create(
+            name="Boucle", organization=self.org, trigger_model='task', trigger_event='update',
+            conditions=[{'field': 'priority', 'operator': 'changed'}],
+            actions=[{'type': 'update_field', 'config': {'field': 'status', 'value': 'todo'}}]
+        )
+        self._save(status='done')
+
+        self.assertEqual(AutomationLog.objects.filter(rule__name="Boucle").count(), 0)
+        self.assertEqual(AutomationLog.objects.filter(rule=self.rule).count(), 1)
+        # The action's save is still indexed/logged, only automation is skipped
+        priority_events = OutboxEvent.objects.filter(event_type='task.updated', payload__changes__has_key='priority')
+        self.assertTrue(priority_events.exists())
+        self.assertFalse(priority_events.filter(handler='automation.trigger').exists())
+
+
+class AutomationLogStorageTest(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="Org Logs")
+        self.user = User.objects.create_user(username='logs', email='logs@test.com', password='pw', organization=self.org)
+        self.rule = AutomationRule.objects.create(
+            name="Import", organization=self.org, trigger_model='task', trigger_event='create',
+            actions=[{'type': 'update_field', 'config': {'field': 'priority', 'value': 'high'}}]
+        )
+
+    def test_bulk_import_writes_logs_in_one_insert(self):
+        from automation.signals import run_automation
+        tasks = [Task(title=f"Import {i}", organization=self.org) for i in range(5)]
+        Task.objects.bulk_create(tasks)
+        event = OutboxEvent(event_type='task.bulk_created', handler='automation.trigger', payload={'ids': [str(t.id) for t in tasks]})
+
+        with patch('automation.logs.AutomationLog.objects.bulk_create', wraps=AutomationLog.objects.bulk_create) as mock_bulk, \
+             patch.object(AutomationLog, 'save') as mock_save:
+            run_automation(event)
+
+        mock_save.assert_not_called()
+        mock_bulk.assert_called_once()
+        self.assertEqual(AutomationLog.objects.filter(rule=self.rule, status='success').count(), 5)
+
+    def test_compaction_aggregates_old_logs_into_daily_counters(self):
+        from datetime import timedelta
+        from django.core.management import call_command
+        from django.utils import timezone
+        from automation.models import AutomationLogDaily
+
+        old = timezone.now() - timedelta(days=40)
+        statuses = ['success', 'success', 'failed', 'partial']
+        AutomationLog.objects.bulk_create([
+            AutomationLog(rule=self.rule, target_model='task', target_id=str(i), status=status)
+            for i, status in enumerate(statuses)
+        ])
+        AutomationLog.objects.update(created_at=old)
+        recent = AutomationLog.objects.create(rule=self.rule, target_model='task', target_id='recent', status='success')
+
+        call_command('compact_automation_logs', days=30, batch=3, stdout=StringIO())
+
+        self.assertEqual(list(AutomationLog.objects.values_list('id', flat=True)), [recent.id])
+        daily = AutomationLogDaily.objects.get(rule=self.rule)
+        self.assertEqual(daily.date, timezone.localdate(old))
+        self.assertEqual((daily.success, daily.failed, daily.partial), (2, 1, 1))
+
+        # Running again adds to the same counters
+        AutomationLog.objects.create(rule=self.rule, target_model='task', target_id='x', status='failed')
+        AutomationLog.objects.filter(target_id='x').update(created_at=old)
+        call_command('compact_automation_logs', days=30, stdout=StringIO())
+        daily.refresh_from_db()
+        self.assertEqual(daily.failed, 2)
+
+
+class ScheduledRuleTest(TestCase):
+    def setUp(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        self.org = Organization.objects.create(name="Org Schedule")
+        self.user = User.objects.create_user(username='sched', email='sched@test.com', password='pw', organization=self.org)
+        self.start = timezone.now()
+        self.hours = lambda n: self.start + timedelta(hours=n)
+        self.rule = AutomationRule.objects.create(
+            name="En retard", organization=self.org, trigger_model='task', trigger_event='scheduled',
+            conditions=[{'field': 'status', 'operator': 'neq', 'value': 'done'}],
+            actions=[{'type': 'update_field', 'config': {'field': 'priority', 'value': 'high'}}]
+        )
+
+    def test_only_newly_due_rows_fire_once(self):
+        from automation.scheduler import run_scheduled_rules
+        soon = Task.objects.create(title="Bientôt", organization=self.org, due_date=self.hours(1))
+        done = Task.objects.create(title="Fini", status='done', organization=self.org, due_date=self.hours(1))
+        later = Task.objects.create(title="Plus tard", organization=self.org, due_date=self.hours(3))
+
+        self.assertEqual(run_scheduled_rules(now=self.hours(2))['fired'], 1)
+        self.assertEqual(run_scheduled_rules(now=self.hours(2))['scanned'], 0)
+        soon.refresh_from_db()
+        later.refresh_from_db()
+        self.assertEqual((soon.priority, later.priority), ('high', 'medium'))
+        self.assertEqual(Task.objects.get(pk=done.pk).priority, 'medium')
+
+        summary = run_scheduled_rules(now=self.hours(4))
+        self.assertEqual((summary['scanned'], summary['fired']), (1, 1))
+        self.assertEqual(AutomationLog.objects.filter(rule=self.rule, status='success').count(), 2)
+
+    def test_rows_behind_the_mark_fire_when_saved(self):
+        from automation.scheduler import run_scheduled_rules
+        run_scheduled_rules(now=self.hours(2))
+
+        def save(task):
+            with impersonate(self.user), self.settings(OUTBOX_CONF={'MODE': 'sync'}), \
+                 patch('ai_assistant.signals.VectorStore'), self.captureOnCommitCallbacks(execute=True):
+                task.save()
+            return Task.objects.get(pk=task.pk)
+
+        # Created already overdue: no later run scans its date
+        overdue = save(Task(title="En retard", organization=self.org, due_date=self.hours(1)))
+        self.assertEqual(overdue.priority, 'high')
+
+        # Due date moved back past the mark
+        moved = save(Task(title="Avancée", organization=self.org, due_date=self.hours(5)))
+        self.assertEqual(moved.priority, 'medium')
+        moved.due_date = self.hours(1)
+        self.assertEqual(save(moved).priority, 'high')
+
+        # Already fired: later edits do not fire again
+        overdue.due_date = self.hours(-1)
+        save(overdue)
+        self.assertEqual(AutomationLog.objects.filter(rule=self.rule).count(), 2)
+        self.assertEqual(run_scheduled_rules(now=self.hours(6))['fired'], 0)
+
+    def test_offset_on_contract_end_date(self):
+        from datetime import timedelta
+        from django.core.management import call_command
+        from django.utils import timezone
+        from crm.models import Space, Contract
+        space = Space.objects.create(name="Client", organization=self.org)
+        rule = AutomationRule.objects.create(
+            name="Renouvellement", organization=self.org, trigger_model='contract', trigger_event='scheduled',
+            schedule_offset_days=30,
+            actions=[{'type': 'update_field', 'config': {'field': 'status', 'value': 'active'}}]
+        )
+        next_day = self.start + timedelta(days=1)
+        contract = Contract.objects.create(
+            title="Maintenance", space=space, organization=self.org,
+            end_date=timezone.localdate(next_day + timedelta(days=30))
+        )
+
+        with patch('automation.scheduler.timezone.now', return_value=next_day):
+            call_command('run_scheduled_automations', rule=str(rule.id), stdout=StringIO())
+
+        contract.refresh_from_db()
+        rule.refresh_from_db()
+        self.assertEqual(contract.status, 'active')
+        self.assertEqual(rule.schedule_high_water_mark, next_day + timedelta(days=30))
@@ -2,6 +2,8 @@
 ASGI config for config project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+HTTP goes to Django, WebSockets on /ws/notifications/ to core.websocket
+(run with uvicorn: `uvicorn config.asgi:application`).
 
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
@@ -13,4 +15,21 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'config.settings')
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+from core.websocket import notifications_socket  # noqa: E402 (needs the apps loaded)
+
+WEBSOCKET_ROUTES = {
+    '/ws/notifications/': notifications_socket,
+}
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        socket = WEBSOCKET_ROUTES.get(scope['path'])
+        if socket is None:
+            await receive()
+            await send({'type': 'websocket.close', 'code': 4404})
+            return
+        return await socket(scope, receive, send)
+    return await django_application(scope, receive, send)
@@ -188,6 +188,8 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
     ),
+    # Page numbers for the bounded lists; the time-ordered ones (activity log,
+    # notifications, tasks, AI history) use core.pagination.KeysetPagination
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 100,
 }
@@ -221,7 +223,63 @@ AI_CONF = {
     'PROVIDER': os.getenv('AI_PROVIDER', 'openai'), # 'openai', 'gemini', 'custom'
     'API_KEY': os.getenv('AI_API_KEY', ''),
     'BASE_URL': os.getenv('AI_BASE_URL', None), # For custom providers like DeepSeek/Kimi/Ollama
+    'EMBEDDING_BASE_URL': os.getenv('AI_EMBEDDING_BASE_URL', None), # e.g. the local mock (manage.py run_mock_llm)
     'MODEL': os.getenv('AI_MODEL', 'gpt-3.5-turbo'),
+    'TOOL_TIMEOUT': int(os.getenv('AI_TOOL_TIMEOUT', '30')), # Seconds allowed per tool call in the agent loop
+    'TOOL_WORKERS': int(os.getenv('AI_TOOL_WORKERS', '4')), # Max tool calls executed concurrently
+}
+
+# Transactional outbox (core/outbox.py): side effects of saves run after commit
+OUTBOX_CONF = {
+    'MODE': os.getenv('OUTBOX_MODE', 'thread'), # 'thread', 'sync' or 'worker' (manage.py run_outbox)
+    'MAX_ATTEMPTS': int(os.getenv('OUTBOX_MAX_ATTEMPTS', '5')),
+    'RETRY_DELAY': int(os.getenv('OUTBOX_RETRY_DELAY', '30')), # Seconds, doubled after each failure
+    # Delivered rows are deleted after this many days by `run_outbox --once --purge-done` (daily cron)
+    'RETENTION_DAYS': int(os.getenv('OUTBOX_RETENTION_DAYS', '7')),
+}
+
+# Notifications of the same type for the same recipient within this many
+# seconds are folded into one digest; pushes: the first one, then one digest
+# push of the rest when the window closes (0 = never coalesce)
+NOTIFICATION_DIGEST_WINDOWS = {
+    'task_assigned': int(os.getenv('DIGEST_WINDOW_TASK_ASSIGNED', '300')),
+    'contract_signed': int(os.getenv('DIGEST_WINDOW_CONTRACT_SIGNED', '600')),
+}
+
+# Seconds the dashboard sections stay cached (core/dashboard.py). Saves expire
+# them through generation counters kept in the default cache: with several
+# workers configure a shared cache (e.g. Redis), otherwise another worker's
+# sections can stay stale for up to this long.
+DASHBOARD_CACHE_TIMEOUT = int(os.getenv('DASHBOARD_CACHE_TIMEOUT', '300'))
+
+# Seconds a compiled automation plan is reused (automation/engine.py). Rule
+# changes reach the other processes through the default cache: with several
+# workers and a per-process cache, an edited or deactivated rule keeps its old
+# behaviour there for up to this long.
+AUTOMATION_PLAN_MAX_AGE = int(os.getenv('AUTOMATION_PLAN_MAX_AGE', '30'))
+
+# Seconds the space roles of a user stay cached across requests for the
+# permission checks (core/memberships.py); 0 = loaded once per request only.
+# Changes of SpaceMember rows drop them in the default cache: only enable it
+# with a shared cache (e.g. Redis), a per-process one would let other workers
+# honour a revoked role for up to this long.
+SPACE_ROLES_CACHE_TIMEOUT = int(os.getenv('SPACE_ROLES_CACHE_TIMEOUT', '0'))
+
+# Entries of the in-memory @mention indexes each worker keeps (core/mentions.py),
+# under 1 KB each (manage.py benchmark_mentions). The organizations used least
+# recently are dropped first.
+MENTION_INDEX_MAX_ENTRIES = int(os.getenv('MENTION_INDEX_MAX_ENTRIES', '500000'))
+# Seconds after which a worker rebuilds an index. Changes made by other workers
+# reach it through the default cache: with a per-process cache, deleted or
+# renamed entries can still be suggested for up to this long.
+MENTION_INDEX_MAX_AGE = int(os.getenv('MENTION_INDEX_MAX_AGE', '300'))
+
+# Real-time notifications over WebSockets (core/realtime.py). With several
+# workers use 'core.realtime.PostgresBackend' (LISTEN/NOTIFY) so every
+# worker receives the messages.
+REALTIME_CONF = {
+    'BACKEND': os.getenv('REALTIME_BACKEND', 'core.realtime.LocalBackend'),
+    'OPTIONS': {'DATABASE': os.getenv('REALTIME_DATABASE', 'vector_db')}, # PostgresBackend only
 }
 
 # Gemini Integration
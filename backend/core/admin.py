@@ -1,6 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import User, Organization
+from .models import User, Organization, OutboxEvent
+from . import outbox
 
 # Register your models here.
 @admin.register(User)
@@ -15,3 +16,16 @@ class CustomUserAdmin(UserAdmin):
 
 admin.site.register(Organization)
 
+
+@admin.register(OutboxEvent)
+class OutboxEventAdmin(admin.ModelAdmin):
+    list_display = ('event_type', 'handler', 'status', 'attempts', 'created_at', 'processed_at')
+    list_filter = ('status', 'handler', 'event_type')
+    search_fields = ('last_error',)
+    readonly_fields = ('created_at', 'processed_at', 'locked_at')
+    actions = ['requeue_events']
+
+    @admin.action(description="Remettre en file d'attente")
+    def requeue_events(self, request, queryset):
+        count = outbox.requeue(queryset)
+        self.message_user(request, f"{count} événement(s) remis en file d'attente.")
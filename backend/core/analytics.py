@@ -0,0 +1,182 @@
+"""
+Pre-aggregated dashboard analytics.
+
+AnalyticsRollup holds, per organization, creation month and status, the
+number of contracts/tasks and the sum of their amounts. The rows are kept
+up to date from the save/delete of the tracked models, in the transaction
+of the change (the diff comes from ChangeTrackingMixin):
+
+    analytics.track(Contract, 'contract', amount_field='amount')
+
+so the dashboard charts read a few rows per month whatever the number of
+contracts and tasks. QuerySet.update() skips signals: callers that change
+status or amount in bulk must rebuild (rebuild_analytics_rollups).
+"""
+from collections import defaultdict
+from decimal import Decimal
+from django.db import transaction, IntegrityError
+from django.db.models import F, Sum, Count
+from django.db.models.functions import TruncMonth, Coalesce
+from django.db.models.signals import post_save, post_delete
+from django.utils import timezone
+from core.models import AnalyticsRollup
+
+_tracked = {} # model -> (kind, amount attname or None)
+
+KEY_FIELDS = ('organization_id', 'created_at', 'status')
+
+
+def month_of(value):
+    """First day of the month of a datetime, in the current time zone (as TruncMonth)."""
+    if timezone.is_aware(value):
+        value = timezone.localtime(value)
+    return value.date().replace(day=1)
+
+
+def track(model, kind, amount_field=None):
+    _tracked[model] = (kind, amount_field)
+    uid = f"analytics-{model._meta.label}"
+    post_save.connect(_rollup_saved, sender=model, dispatch_uid=uid)
+    post_delete.connect(_rollup_deleted, sender=model, dispatch_uid=uid)
+
+
+def _row(model, values, sign):
+    """(key, (count, amount)) of one instance's values."""
+    kind, amount_field = _tracked[model]
+    key = (values['organization_id'], kind, month_of(values['created_at']), values['status'])
+    amount = (values.get(amount_field) or Decimal(0)) if amount_field else Decimal(0)
+    return key, (sign, sign * amount)
+
+
+def _attnames(model):
+    _, amount_field = _tracked[model]
+    return KEY_FIELDS + ((amount_field,) if amount_field else ())
+
+
+def _stored_values(instance):
+    """The values of the row in the database: the loaded ones when known."""
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    return {name: loaded.get(name, getattr(instance, name)) for name in _attnames(type(instance))}
+
+
+def _rollup_saved(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        record_created(sender, [instance])
+        return
+
+    attnames = _attnames(sender)
+    changed = {}
+    for name, (_, new) in instance.get_changes(update_fields).items():
+        attname = sender._meta.get_field(name).attname
+        if attname in attnames:
+            changed[attname] = new
+    if not changed:
+        return
+    # Moves the instance from the row of its loaded values to the row of the saved ones
+    old = _stored_values(instance)
+    apply([_row(sender, old, -1), _row(sender, {**old, **changed}, 1)])
+
+
+def _rollup_deleted(sender, instance, **kwargs):
+    # The organization may be being deleted (cascade): never create rows here
+    apply([_row(sender, _stored_values(instance), -1)], create_missing=False)
+
+
+def record_created(model, instances):
+    """Counts created instances (post_save does it, call it after bulk_create())."""
+    apply([_row(model, {name: getattr(instance, name) for name in _attnames(model)}, 1) for instance in instances])
+
+
+def apply(rows, create_missing=True):
+    """Adds [(key, (count, amount))] to the rollups, key = (organization_id, kind, month, status)."""
+    deltas = defaultdict(lambda: [0, Decimal(0)])
+    for key, (count, amount) in rows:
+        deltas[key][0] += count
+        deltas[key][1] += amount
+
+    # Always the same lock order between concurrent transactions
+    for key in sorted(deltas, key=lambda key: (str(key[0]), key[1], key[2], key[3])):
+        count, amount = deltas[key]
+        if not count and not amount:
+            continue
+        organization_id, kind, month, status = key
+        rollup = AnalyticsRollup.objects.filter(organization_id=organization_id, kind=kind, month=month, status=status)
+        if rollup.update(count=F('count') + count, amount=F('amount') + amount) or not create_missing:
+            continue
+        try:
+            with transaction.atomic():
+                AnalyticsRollup.objects.create(
+                    organization_id=organization_id, kind=kind, month=month, status=status, count=count, amount=amount
+                )
+        except IntegrityError:
+            # Created concurrently
+            rollup.update(count=F('count') + count, amount=F('amount') + amount)
+
+
+def rollup_rows(queryset, kind, amount_field=None):
+    """Aggregates a queryset of a tracked model into AnalyticsRollup field values."""
+    amount = Coalesce(Sum(amount_field), Decimal(0)) if amount_field else None
+    rows = (
+        queryset.annotate(month=TruncMonth('created_at'))
+        .values('organization_id', 'month', 'status')
+        .annotate(count=Count('pk'), **({'amount': amount} if amount else {}))
+        .order_by()
+    )
+    return [
+        {
+            'organization_id': row['organization_id'],
+            'kind': kind,
+            'month': month_of(row['month']),
+            'status': row['status'],
+            'count': row['count'],
+            'amount': row.get('amount') or Decimal(0),
+        }
+        for row in rows
+    ]
+
+
+def rebuild(organization_ids=None):
+    """Recomputes the rollups from scratch. Returns the number of rows written."""
+    written = 0
+    with transaction.atomic():
+        existing = AnalyticsRollup.objects.all()
+        if organization_ids is not None:
+            existing = existing.filter(organization_id__in=organization_ids)
+        # Concurrent changes wait for the rebuild instead of adjusting rows it replaces
+        list(existing.select_for_update().values_list('pk', flat=True))
+        existing.delete()
+
+        for model, (kind, amount_field) in _tracked.items():
+            queryset = model._base_manager.all()
+            if organization_ids is not None:
+                queryset = queryset.filter(organization_id__in=organization_ids)
+            rows = [AnalyticsRollup(**values) for values in rollup_rows(queryset, kind, amount_field)]
+            AnalyticsRollup.objects.bulk_create(rows, batch_size=1000)
+            written += len(rows)
+    return written
+
+
+# --- Reads ---
+
+def add_months(month, delta):
+    index = month.year * 12 + month.month - 1 + delta
+    return month.replace(year=index // 12, month=index % 12 + 1, day=1)
+
+
+def monthly_amounts(organization_id, kind, status, months):
+    """[(month, amount)] of the last `months` months (current one included) having rows."""
+    since = add_months(month_of(timezone.now()), 1 - months)
+    return list(
+        AnalyticsRollup.objects.filter(
+            organization_id=organization_id, kind=kind, status=status, month__gte=since, count__gt=0
+        ).order_by('month').values_list('month', 'amount')
+    )
+
+
+def status_counts(organization_id, kind):
+    """{status: count} over all months."""
+    rows = (
+        AnalyticsRollup.objects.filter(organization_id=organization_id, kind=kind)
+        .values('status').annotate(total=Sum('count')).order_by()
+    )
+    return {row['status']: row['total'] for row in rows if row['total']}
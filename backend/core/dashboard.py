@@ -0,0 +1,93 @@
+"""
+Cache of the dashboard sections (core.views.DashboardView).
+
+Each section is cached under the generation of what it depends on:
+- organization-wide sections: dashboard:<section>:org:<id>:<org generation>:<month>
+- per-user sections ("my tasks"): dashboard:<section>:user:<id>:<user generation>:<month>
+
+Saves of pages, tasks, contracts and spaces bump the generation of their
+organization (and of the assignees of a task) after commit, so stale
+entries are never read again and simply expire. The generations also make
+the ETag of the response: a client sending it back in If-None-Match gets a
+304 after a single cache read.
+
+The current month is part of the ETag and of the keys as well: the charts
+cover the last months, a window that moves at a month boundary without any
+save.
+"""
+import time
+import hashlib
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+SECTION_TIMEOUT = getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300)
+GENERATION_TIMEOUT = None # Never expire: a restarted counter could meet old entries
+
+
+def _org_key(organization_id):
+    return f"dashboard:gen:org:{organization_id}"
+
+def _user_key(user_id):
+    return f"dashboard:gen:user:{user_id}"
+
+
+def get_generations(user):
+    """(organization generation, user generation), created on first use."""
+    keys = [_org_key(user.organization_id), _user_key(user.pk)]
+    found = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        # A new counter starts from the clock, never from a value used before an eviction
+        for key, value in missing.items():
+            cache.add(key, value, GENERATION_TIMEOUT)
+        found.update(cache.get_many(list(missing)))
+    return found.get(keys[0], 0), found.get(keys[1], 0)
+
+
+def _bump(keys):
+    for key in keys:
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Not created yet (or evicted): the next read starts a new one
+            pass
+
+
+def invalidate(organization_ids=(), user_ids=()):
+    """Bumps generations after commit, readers only then see the change."""
+    keys = [_org_key(organization_id) for organization_id in set(organization_ids) if organization_id]
+    keys += [_user_key(user_id) for user_id in set(user_ids) if user_id]
+    if keys:
+        transaction.on_commit(lambda: _bump(keys))
+
+
+def _month():
+    return timezone.localdate().strftime('%Y-%m')
+
+
+def etag(user, generations):
+    digest = hashlib.md5(f"{user.pk}:{generations[0]}:{generations[1]}:{_month()}".encode()).hexdigest()
+    return f'"{digest}"'
+
+
+def get_sections(user, generations, org_sections, user_sections):
+    """
+    {name: data} of the sections, computed by the callables of
+    org_sections/user_sections ({name: func}) only when not cached.
+    """
+    month = _month()
+    keys = {name: f"dashboard:{name}:org:{user.organization_id}:{generations[0]}:{month}" for name in org_sections}
+    keys.update({name: f"dashboard:{name}:user:{user.pk}:{generations[1]}:{month}" for name in user_sections})
+
+    cached = cache.get_many(list(keys.values()))
+    data, to_cache = {}, {}
+    for name, func in {**org_sections, **user_sections}.items():
+        if keys[name] in cached:
+            data[name] = cached[keys[name]]
+        else:
+            data[name] = to_cache[keys[name]] = func()
+    if to_cache:
+        cache.set_many(to_cache, SECTION_TIMEOUT)
+    return data
@@ -0,0 +1,53 @@
+"""
+Deferred imports for heavy SDKs (openai, google.generativeai, firebase_admin,
+chromadb...).
+
+Signal modules are imported when Django starts, so everything they import is
+paid by every process: gunicorn workers, management commands, tests. A
+LazyImport stands in for the module or attribute and imports it the first
+time it is used:
+
+    OpenAI = LazyImport('openai', 'OpenAI')
+    genai = LazyImport('google.generativeai')  # falsy when not installed
+
+Use `manage.py importtime` to measure the startup cost.
+"""
+import importlib
+import threading
+
+
+class LazyImport:
+    def __init__(self, module, name=None):
+        object.__setattr__(self, '_module', module)
+        object.__setattr__(self, '_name', name)
+        object.__setattr__(self, '_target', None)
+        object.__setattr__(self, '_lock', threading.Lock())
+
+    def _resolve(self):
+        target = self._target
+        if target is None:
+            with self._lock:
+                if self._target is None:
+                    module = importlib.import_module(self._module)
+                    object.__setattr__(self, '_target', getattr(module, self._name) if self._name else module)
+                target = self._target
+        return target
+
+    def __getattr__(self, attr):
+        return getattr(self._resolve(), attr)
+
+    def __call__(self, *args, **kwargs):
+        return self._resolve()(*args, **kwargs)
+
+    def __bool__(self):
+        # Optional dependencies: `if not genai:` still means "not installed"
+        try:
+            self._resolve()
+        except ImportError:
+            return False
+        return True
+
+    def __repr__(self):
+        target = f"{self._module}.{self._name}" if self._name else self._module
+        state = 'loaded' if self._target is not None else 'not loaded'
+        return f"<LazyImport {target} ({state})>"
@@ -0,0 +1,40 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from core.models import Notification, ArchivedNotification
+
+ARCHIVED_FIELDS = ('id', 'recipient_id', 'actor_id', 'type', 'title', 'message', 'link', 'created_at')
+
+class Command(BaseCommand):
+    help = 'Moves read notifications older than the retention period to the archive table'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=90, help='Read notifications kept for this many days')
+        parser.add_argument('--batch', type=int, default=5000, help='Rows archived per transaction')
+        parser.add_argument('--dry-run', action='store_true', help='Only count the rows that would be archived')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        # Unread notifications are never archived: the counters stay exact
+        old_notifications = Notification.objects.filter(is_read=True, created_at__lt=cutoff)
+
+        if options['dry_run']:
+            self.stdout.write(f"{old_notifications.count()} read notifications older than {cutoff:%Y-%m-%d} would be archived.")
+            return
+
+        total = 0
+        while True:
+            with transaction.atomic():
+                rows = list(old_notifications.order_by('created_at').values(*ARCHIVED_FIELDS)[:options['batch']])
+                if not rows:
+                    break
+                ArchivedNotification.objects.bulk_create(
+                    [ArchivedNotification(**row) for row in rows],
+                    ignore_conflicts=True # Already copied by an interrupted run
+                )
+                Notification.objects.filter(id__in=[row['id'] for row in rows]).delete()
+                total += len(rows)
+            self.stdout.write(f"Archived {total} notifications...")
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {total} notifications archived."))
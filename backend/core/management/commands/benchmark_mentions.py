@@ -0,0 +1,83 @@
+import gc
+import time
+import random
+import statistics
+import tracemalloc
+from django.core.management.base import BaseCommand
+from core import search
+from core.mentions import TYPES, PrefixIndex
+
+WORDS = [
+    'projet', 'contrat', 'reunion', 'client', 'facture', 'budget', 'rapport', 'relance', 'devis', 'planning',
+    'marketing', 'juridique', 'achat', 'vente', 'support', 'produit', 'equipe', 'strategie', 'audit', 'recrutement',
+]
+NAMES = ['martin', 'bernard', 'dubois', 'thomas', 'robert', 'richard', 'petit', 'durand', 'leroy', 'moreau']
+SYLLABLES = ['ba', 'cor', 'di', 'fa', 'gen', 'lu', 'ma', 'nor', 'pi', 'ro', 'sa', 'ter', 'va', 'zo']
+
+
+class Command(BaseCommand):
+    help = 'Measures the in-memory @mention index (core/mentions.py) of one organization with synthetic entries'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entities', type=int, default=200000, help='Entries of the organization')
+        parser.add_argument('--lookups', type=int, default=2000, help='Keystrokes measured')
+        parser.add_argument('--vocabulary', type=int, default=2000, help='Distinct words of the titles (fewer: more entries per word)')
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        vocabulary = list(WORDS)
+        while len(vocabulary) < options['vocabulary']:
+            vocabulary.append(''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+        rows = []
+        for number in range(options['entities']):
+            entity_type = TYPES[number % len(TYPES)]
+            if entity_type == 'contact':
+                title = f"{rng.choice(NAMES).title()} {rng.choice(NAMES).title()}{number}"
+            else:
+                title = f"{' '.join(rng.sample(vocabulary, 3)).capitalize()} {number}"
+            rows.append((entity_type, str(number), title, f'/{entity_type}s/{number}', search.fold(title), ' '.join(search.tokenize(title))))
+
+        start = time.perf_counter()
+        index = PrefixIndex.build(rows)
+        build = time.perf_counter() - start
+
+        del index
+        gc.collect()
+        tracemalloc.start()
+        index = PrefixIndex.build(rows)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        self.stdout.write(
+            f"Build: {len(index)} entries, {len(index.words)} words in {build * 1000:.0f} ms, "
+            f"{memory / 2 ** 20:.1f} MiB ({memory / len(index):.0f} bytes per entry)"
+        )
+
+        # Keystrokes of someone typing a title or a name, one to a few characters at a time
+        queries = []
+        while len(queries) < options['lookups']:
+            target = rng.choice(rng.choice([WORDS, NAMES, vocabulary]))
+            queries.extend(target[:length] for length in range(1, len(target) + 1))
+            if rng.random() < 0.3:
+                second = rng.choice(vocabulary)
+                queries.extend(f"{target} {second[:length]}" for length in range(1, 4))
+        queries = queries[:options['lookups']]
+
+        durations = {}
+        for query in queries:
+            start = time.perf_counter()
+            index.search(query)
+            durations.setdefault(min(len(query), 4), []).append(time.perf_counter() - start)
+        for length, values in sorted(durations.items()):
+            values.sort()
+            self.stdout.write(
+                f"{'>=' if length == 4 else '  '}{length} chars: median {statistics.median(values) * 1000:.2f} ms, "
+                f"p99 {values[int(len(values) * 0.99)] * 1000:.2f} ms over {len(values)} lookups"
+            )
+
+        start = time.perf_counter()
+        for number in range(1000):
+            index.add('task', f"new-{number}", f"Nouvelle tache {number}", '/tasks', f"nouvelle tache {number}", f"nouvelle tache {number}")
+        for number in range(1000):
+            index.remove('task', f"new-{number}")
+        self.stdout.write(f"Updates: {(time.perf_counter() - start) / 2000 * 1000:.2f} ms per add or remove")
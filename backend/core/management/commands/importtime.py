@@ -0,0 +1,44 @@
+import sys
+import time
+import statistics
+import subprocess
+from django.core.management.base import BaseCommand
+
+class Command(BaseCommand):
+    help = 'Measures the cold start of a process (django.setup() and optional modules) with python -X importtime'
+
+    def add_arguments(self, parser):
+        parser.add_argument('modules', nargs='*', help='Modules imported after django.setup() (e.g. config.wsgi ai_assistant.services)')
+        parser.add_argument('--top', type=int, default=15, help='Slowest modules shown (cumulative time)')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs measured, the median is reported')
+
+    def handle(self, *args, **options):
+        code = '; '.join(['import django', 'django.setup()'] + [f"import {module}" for module in options['modules']])
+
+        durations = []
+        report = ''
+        for _ in range(max(options['repeat'], 1)):
+            start = time.perf_counter()
+            result = subprocess.run(
+                [sys.executable, '-X', 'importtime', '-c', code],
+                capture_output=True, text=True
+            )
+            durations.append(time.perf_counter() - start)
+            if result.returncode != 0:
+                self.stderr.write(result.stderr.splitlines()[-1] if result.stderr else 'Import failed')
+                return
+            report = result.stderr
+
+        modules = []
+        for line in report.splitlines():
+            # "import time: self [us] | cumulative | imported package"
+            if not line.startswith('import time:') or 'cumulative' in line:
+                continue
+            _, cumulative, name = line[len('import time:'):].split('|')
+            # Only top-level entries of an import chain are reported, not their children
+            modules.append((int(cumulative), name.rstrip(), len(name) - len(name.lstrip())))
+
+        total = sum(cumulative for cumulative, _, depth in modules if depth == 1)
+        self.stdout.write(f"Startup ({code}): {statistics.median(durations) * 1000:.0f} ms median over {len(durations)} runs, imports {total / 1000:.0f} ms")
+        for cumulative, name, _ in sorted(modules, reverse=True)[:options['top']]:
+            self.stdout.write(f"{cumulative / 1000:9.1f} ms  {name.strip()}")
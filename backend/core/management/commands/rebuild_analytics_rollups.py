@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from core import analytics, dashboard
+from core.models import Organization
+
+class Command(BaseCommand):
+    help = 'Recomputes the dashboard analytics rollups from the contracts and tasks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organization', action='append', dest='organizations', help='Organization id (repeatable), all by default')
+
+    def handle(self, *args, **options):
+        organization_ids = options['organizations'] or list(Organization.objects.order_by('pk').values_list('pk', flat=True))
+
+        total = 0
+        # One transaction per organization: concurrent changes are never blocked for long
+        for organization_id in organization_ids:
+            total += analytics.rebuild([organization_id])
+        dashboard.invalidate(organization_ids=organization_ids)
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {total} rollup rows for {len(organization_ids)} organizations."))
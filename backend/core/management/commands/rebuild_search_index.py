@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from core import search
+from core.models import Organization
+
+class Command(BaseCommand):
+    help = 'Rebuilds the global search index from pages, databases, spaces, contacts and tasks'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--organization', action='append', dest='organizations', help='Organization id (repeatable), all by default')
+
+    def handle(self, *args, **options):
+        if options['organizations']:
+            organization_ids = options['organizations']
+        else:
+            organization_ids = list(Organization.objects.order_by('pk').values_list('pk', flat=True))
+
+        total = 0
+        # One transaction per organization and model
+        for organization_id in organization_ids:
+            total += search.rebuild(organization_id)
+
+        self.stdout.write(self.style.SUCCESS(f"Done: {total} objects indexed for {len(organization_ids)} organizations."))
@@ -0,0 +1,42 @@
+import time
+from django.core.management.base import BaseCommand
+from core import outbox
+from core.models import OutboxEvent
+
+class Command(BaseCommand):
+    help = 'Delivers pending outbox events (retries, backlog, or all deliveries when OUTBOX_MODE=worker)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Deliver what is due then exit')
+        parser.add_argument('--handler', help='Only deliver events of this handler')
+        parser.add_argument('--interval', type=float, default=1.0, help='Seconds between polls when idle')
+        parser.add_argument('--batch', type=int, default=None, help='Events claimed per poll')
+        parser.add_argument('--requeue-dead', action='store_true', help='Send dead letters back to the queue first')
+        parser.add_argument('--purge-done', action='store_true', help='Delete delivered events older than --days first')
+        parser.add_argument('--days', type=int, default=None, help="Retention of delivered events (default OUTBOX_CONF['RETENTION_DAYS'])")
+
+    def handle(self, *args, **options):
+        if options['requeue_dead']:
+            dead = OutboxEvent.objects.filter(status='dead')
+            if options['handler']:
+                dead = dead.filter(handler=options['handler'])
+            self.stdout.write(f"Requeued {outbox.requeue(dead)} dead events.")
+
+        if options['purge_done']:
+            self.stdout.write(f"Purged {outbox.purge(days=options['days'])} delivered events.")
+
+        total = 0
+        try:
+            while True:
+                processed = outbox.dispatch(handler=options['handler'], limit=options['batch'])
+                total += processed
+                if options['once']:
+                    if processed:
+                        continue
+                    break
+                if not processed:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+
+        self.stdout.write(self.style.SUCCESS(f"Delivered {total} outbox events."))
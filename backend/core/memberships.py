@@ -0,0 +1,70 @@
+"""
+Space roles of a user, for the permission checks (core.permissions.SpaceRolePermission).
+
+roles(request) loads every SpaceMember row of the user once per request
+({space id: role}), then every check of the request reads the map: a list
+of 50 contracts costs no query per object.
+
+With SPACE_ROLES_CACHE_TIMEOUT > 0 the map is also kept in the default cache
+per user across requests; saves and deletes of SpaceMember rows drop it
+after commit. Only enable it with a shared cache: a per-process cache is
+not invalidated in the other workers, which would keep honouring a revoked
+role until the timeout.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from crum import get_current_request
+
+CACHE_TIMEOUT = getattr(settings, 'SPACE_ROLES_CACHE_TIMEOUT', 0)
+REQUEST_ATTRIBUTE = '_space_roles'
+
+
+def _key(user_id):
+    return f"space_roles:user:{user_id}"
+
+
+def _http_request(request):
+    # DRF's Request wraps the HttpRequest, which crum and the middlewares see
+    return getattr(request, '_request', request)
+
+
+def load(user):
+    """{space id (str): role} of the user, from the cache (when enabled) or one query."""
+    if not user or not user.is_authenticated:
+        return {}
+    key = _key(user.pk)
+    roles = cache.get(key) if CACHE_TIMEOUT else None
+    if roles is None:
+        from crm.models import SpaceMember
+        roles = {str(space_id): role for space_id, role in SpaceMember.objects.filter(user=user).values_list('space_id', 'role')}
+        if CACHE_TIMEOUT:
+            cache.set(key, roles, CACHE_TIMEOUT)
+    return roles
+
+
+def roles(request):
+    """load(request.user), once per request."""
+    http_request = _http_request(request)
+    cached = getattr(http_request, REQUEST_ATTRIBUTE, None)
+    if cached is None or cached[0] != request.user.pk:
+        cached = (request.user.pk, load(request.user))
+        setattr(http_request, REQUEST_ATTRIBUTE, cached)
+    return cached[1]
+
+
+def role(request, space_id):
+    """Role of the user in the space, None when not a member."""
+    if not space_id:
+        return None
+    return roles(request).get(str(space_id))
+
+
+def invalidate(user_ids):
+    """The next checks reload the roles of these users (their current request at once, others after commit)."""
+    user_ids = {user_id for user_id in user_ids if user_id}
+    request = get_current_request()
+    if request is not None and hasattr(request, REQUEST_ATTRIBUTE):
+        delattr(request, REQUEST_ATTRIBUTE)
+    if user_ids and CACHE_TIMEOUT:
+        transaction.on_commit(lambda: cache.delete_many([_key(user_id) for user_id in user_ids]))
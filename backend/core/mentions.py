@@ -0,0 +1,275 @@
+"""
+In-memory autocomplete of @mentions (core.views.MentionSearchView).
+
+Each worker keeps, per organization, the words of its search entries
+(core/search.py: pages, spaces, contacts and tasks) in two parallel sorted
+lists. Every word starting with a prefix sits in one contiguous slice found
+by bisection, so a keystroke is answered without touching the database:
+
+    words:   ['acme', 'ana', 'budget', 'cafe', 'cafe', 'contrat', ...]
+    entries: [   7,     3,      12,      4,      9,       4,      ...]
+
+An organization's index is built on its first lookup with one query on
+SearchEntry. Changes to the entries are applied incrementally after commit.
+The index also stores the generation counter it was built at. That counter
+lives in the default cache and changes are numbered by it. A worker that
+missed a change (made by another worker) sees a newer generation and
+rebuilds the index on its next lookup. That needs a shared cache: with a
+per-process cache (the default LocMemCache) other workers only notice when
+their index is MENTION_INDEX_MAX_AGE seconds old, and rebuild it then.
+
+Memory is bounded by MENTION_INDEX_MAX_ENTRIES entries per worker: the
+organizations used least recently are dropped first.
+"""
+import time
+import heapq
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from core import search
+from core.models import SearchEntry
+
+TYPES = ('page', 'space', 'contact', 'task')
+MAX_ENTRIES = getattr(settings, 'MENTION_INDEX_MAX_ENTRIES', 500000)
+MAX_AGE = getattr(settings, 'MENTION_INDEX_MAX_AGE', 300)
+GENERATION_TIMEOUT = None
+
+_lock = threading.Lock()
+_indexes = OrderedDict() # organization id -> PrefixIndex, least recently used first
+_size = 0 # Entries held by _indexes
+
+
+def _generation_key(organization_id):
+    return f"mentions:gen:{organization_id}"
+
+
+class PrefixIndex:
+    """Words -> entries of one organization."""
+
+    def __init__(self, generation=None):
+        self.generation = generation
+        self.built_at = time.monotonic()
+        self.words = [] # Sorted
+        self.keys = [] # Entry key of each word
+        self.titles = [] # Sorted folded titles, for the entries whose title starts with the query
+        self.title_keys = []
+        self.entries = {} # key -> (type, id, title, url, words)
+        self.ranks = {} # key -> (-boost, folded title), compared without Python code when sorting
+        self.key_of = {} # (type, id) -> key
+        self._next_key = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    @classmethod
+    def build(cls, rows, generation=None):
+        """rows: (type, id, title, url, folded title, words)."""
+        index = cls(generation)
+        words, titles = [], []
+        for row in rows:
+            key = index._store(*row)
+            words.extend((word, key) for word in index.entries[key][4])
+            titles.append((index.ranks[key][1], key))
+        words.sort()
+        titles.sort()
+        index.words = [word for word, _ in words]
+        index.keys = [key for _, key in words]
+        index.titles = [title for title, _ in titles]
+        index.title_keys = [key for _, key in titles]
+        return index
+
+    def _store(self, entity_type, entity_id, title, url, folded, words):
+        key = self._next_key
+        self._next_key += 1
+        self.entries[key] = (entity_type, entity_id, title, url, tuple(dict.fromkeys(words.split())))
+        self.ranks[key] = (-search.BOOSTS.get(entity_type, 0), folded)
+        self.key_of[(entity_type, entity_id)] = key
+        return key
+
+    @staticmethod
+    def _insert(values, keys, value, key):
+        position = bisect_right(values, value)
+        values.insert(position, value)
+        keys.insert(position, key)
+
+    @staticmethod
+    def _delete(values, keys, value, key):
+        position = keys.index(key, bisect_left(values, value), bisect_right(values, value))
+        del values[position]
+        del keys[position]
+
+    def add(self, entity_type, entity_id, title, url, folded, words):
+        """Adds or replaces an entry."""
+        self.remove(entity_type, entity_id)
+        key = self._store(entity_type, entity_id, title, url, folded, words)
+        for word in self.entries[key][4]:
+            self._insert(self.words, self.keys, word, key)
+        self._insert(self.titles, self.title_keys, folded, key)
+
+    def remove(self, entity_type, entity_id):
+        key = self.key_of.pop((entity_type, entity_id), None)
+        if key is None:
+            return
+        for word in self.entries.pop(key)[4]:
+            self._delete(self.words, self.keys, word, key)
+        self._delete(self.titles, self.title_keys, self.ranks.pop(key)[1], key)
+
+    @staticmethod
+    def _prefix_range(values, prefix):
+        start = bisect_left(values, prefix)
+        # Folded text sorts below '\uffff' (words are [a-z0-9] only, titles may contain anything)
+        return start, bisect_left(values, prefix + '\uffff', start)
+
+    def search(self, query, limit=20):
+        """Same matching and ranking as search.search(): entries with a word starting with each term."""
+        terms = search.tokenize(query)[:search.MAX_TERMS]
+        if not terms:
+            return []
+
+        # Narrowest term first, the others filter its entries
+        ranges = sorted((self._prefix_range(self.words, term) for term in terms), key=lambda bounds: bounds[1] - bounds[0])
+        candidates = set(self.keys[ranges[0][0]:ranges[0][1]])
+        for start, end in ranges[1:]:
+            if not candidates:
+                return []
+            candidates.intersection_update(self.keys[start:end])
+
+        # Titles starting with the query first, then by type boost and title
+        start, end = self._prefix_range(self.titles, search.fold(query))
+        starts = candidates.intersection(self.title_keys[start:end])
+        best = heapq.nsmallest(limit, starts, key=self.ranks.__getitem__)
+        if len(best) < limit:
+            best += heapq.nsmallest(limit - len(best), candidates - starts, key=self.ranks.__getitem__)
+        return [
+            {'type': entity_type, 'id': entity_id, 'title': title, 'url': url}
+            for entity_type, entity_id, title, url, _ in map(self.entries.__getitem__, best)
+        ]
+
+
+def _current_generation(organization_id):
+    key = _generation_key(organization_id)
+    generation = cache.get(key)
+    if generation is None:
+        # Starts from the clock, never from a value used before an eviction
+        cache.add(key, time.time_ns(), GENERATION_TIMEOUT)
+        generation = cache.get(key)
+    return generation
+
+
+def _load(organization_id, generation):
+    rows = (
+        SearchEntry.objects.filter(organization_id=organization_id, entity_type__in=TYPES)
+        .values_list('entity_type', 'entity_id', 'title', 'url', 'folded', 'tokens')
+        .iterator(chunk_size=5000)
+    )
+    return PrefixIndex.build(rows, generation)
+
+
+def _store(organization_id, index):
+    global _size
+    with _lock:
+        previous = _indexes.pop(organization_id, None)
+        if previous is not None:
+            _size -= len(previous)
+        _indexes[organization_id] = index
+        _size += len(index)
+        _evict()
+
+
+def _evict():
+    """Drops the least recently used organizations over the budget, never the last one used (with _lock)."""
+    global _size
+    while _size > MAX_ENTRIES and len(_indexes) > 1:
+        _, evicted = _indexes.popitem(last=False)
+        _size -= len(evicted)
+
+
+def get_index(organization_id):
+    generation = _current_generation(organization_id)
+    with _lock:
+        index = _indexes.get(organization_id)
+        if index is not None and index.generation == generation and time.monotonic() - index.built_at < MAX_AGE:
+            _indexes.move_to_end(organization_id)
+            return index
+    index = _load(organization_id, generation)
+    _store(organization_id, index)
+    return index
+
+
+def lookup(organization_id, query, limit=20):
+    """[{'type', 'id', 'title', 'url'}] of the pages, spaces, contacts and tasks matching the query."""
+    if not search.tokenize(query):
+        return []
+    index = get_index(organization_id)
+    # Changes applied after commit by other threads mutate the lists
+    with _lock:
+        return index.search(query, limit)
+
+
+def _apply(organization_id, saved, removed):
+    global _size
+    try:
+        generation = cache.incr(_generation_key(organization_id))
+    except ValueError:
+        generation = None # No counter: nobody built an index of the organization since it expired
+    with _lock:
+        index = _indexes.get(organization_id)
+        if index is None:
+            return
+        if generation is None or index.generation != generation - 1:
+            # Another change was not seen here, rebuilt on the next lookup
+            _indexes.pop(organization_id)
+            _size -= len(index)
+            return
+        before = len(index)
+        for entity_type, entity_id in removed:
+            index.remove(entity_type, entity_id)
+        for row in saved:
+            index.add(*row)
+        index.generation = generation
+        _size += len(index) - before
+        _evict()
+
+
+def entries_changed(saved=(), removed=()):
+    """
+    Called by core/search.py in the transaction of a change. saved:
+    SearchEntry instances, removed: (organization id, type, id).
+    Applied to the indexes after commit.
+    """
+    changes = {}
+    for entry in saved:
+        if entry.entity_type in TYPES:
+            changes.setdefault(entry.organization_id, ([], []))[0].append(
+                (entry.entity_type, entry.entity_id, entry.title, entry.url, entry.folded, entry.tokens)
+            )
+    for organization_id, entity_type, entity_id in removed:
+        if entity_type in TYPES:
+            changes.setdefault(organization_id, ([], []))[1].append((entity_type, entity_id))
+    for organization_id, (saved_rows, removed_keys) in changes.items():
+        transaction.on_commit(
+            lambda organization_id=organization_id, saved_rows=saved_rows, removed_keys=removed_keys:
+                _apply(organization_id, saved_rows, removed_keys)
+        )
+
+
+def invalidate(organization_ids):
+    """Makes every worker rebuild the indexes of these organizations (after commit)."""
+    def bump():
+        for organization_id in organization_ids:
+            try:
+                cache.incr(_generation_key(organization_id))
+            except ValueError:
+                pass
+    transaction.on_commit(bump)
+
+
+def clear():
+    """Drops the indexes of this worker (tests)."""
+    global _size
+    with _lock:
+        _indexes.clear()
+        _size = 0
@@ -0,0 +1,62 @@
+# Generated by Django 4.2.26 on 2026-10-19 17:43
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce, TruncMonth
+from django.utils import timezone
+import django.db.models.deletion
+
+
+def build_rollups(apps, schema_editor):
+    # Self-contained: later changes to core/analytics.py must not change this migration
+    AnalyticsRollup = apps.get_model('core', 'AnalyticsRollup')
+    sources = [
+        (apps.get_model('crm', 'Contract'), 'contract', 'amount'),
+        (apps.get_model('tasks', 'Task'), 'task', None),
+    ]
+    for model, kind, amount_field in sources:
+        extra = {'amount': Coalesce(Sum(amount_field), Decimal(0))} if amount_field else {}
+        rows = (
+            model.objects.annotate(month=TruncMonth('created_at'))
+            .values('organization_id', 'month', 'status')
+            .annotate(count=Count('pk'), **extra)
+            .order_by()
+        )
+        AnalyticsRollup.objects.bulk_create([
+            AnalyticsRollup(
+                organization_id=row['organization_id'], kind=kind,
+                month=(timezone.localtime(row['month']) if timezone.is_aware(row['month']) else row['month']).date().replace(day=1),
+                status=row['status'], count=row['count'], amount=row.get('amount') or Decimal(0),
+            )
+            for row in rows
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_notification_digest'),
+        ('crm', '0022_contract_contract_org_end_date_idx'),
+        ('tasks', '0010_task_task_org_due_date_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AnalyticsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('contract', 'Contract'), ('task', 'Task')], max_length=20)),
+                ('month', models.DateField()),
+                ('status', models.CharField(max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('organization', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='analytics_rollups', to='core.organization')),
+            ],
+            options={
+                'ordering': ['month'],
+                'unique_together': {('organization', 'kind', 'month', 'status')},
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
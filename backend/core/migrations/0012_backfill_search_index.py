@@ -0,0 +1,93 @@
+import re
+import unicodedata
+from django.db import migrations
+
+# Frozen copy of the indexing rules of core/search.py and of the @search.indexed
+# functions at the time of this migration: later changes to them must not
+# change what this migration writes. `manage.py rebuild_search_index` applies
+# the current rules.
+TOKEN_LENGTH = 64
+MAX_TOKENS = 50
+BATCH_SIZE = 1000
+
+
+def fold(text):
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.lower().split())
+
+
+def tokenize(text):
+    tokens = re.findall(r'[a-z0-9]+', fold(text))
+    return list(dict.fromkeys(token[:TOKEN_LENGTH] for token in tokens))
+
+
+def documents(apps):
+    """(entity type, queryset, instance -> (organization id, title, subtitle, url, text))."""
+    return [
+        ('page', apps.get_model('pages', 'Page').objects.all(),
+         lambda page: (page.organization_id, page.title, 'Page', f'/pages/{page.id}', '')),
+        ('space', apps.get_model('crm', 'Space').objects.all(),
+         lambda space: (space.organization_id, space.name, 'Space', f'/crm/spaces/{space.id}', '')),
+        ('contact', apps.get_model('crm', 'Contact').objects.all(),
+         lambda contact: (
+             contact.organization_id, f"{contact.first_name} {contact.last_name}", contact.position or 'Contact',
+             f'/crm/contacts/{contact.id}', contact.email or ''
+         )),
+        ('task', apps.get_model('tasks', 'Task').objects.all(),
+         lambda task: (task.organization_id, task.title, f"Task ({task.status})", '/tasks', '')),
+        ('database', apps.get_model('databases', 'Database').objects.select_related('page'),
+         lambda database: (
+             database.page.organization_id if database.page_id else None, database.title, 'Database',
+             f'/databases/{database.id}', ''
+         )),
+    ]
+
+
+def backfill(apps, schema_editor):
+    """Indexes the objects created before the search index (entries already there are kept)."""
+    SearchEntry = apps.get_model('core', 'SearchEntry')
+    SearchToken = apps.get_model('core', 'SearchToken')
+
+    def flush(entries):
+        SearchEntry.objects.bulk_create(entries)
+        created = SearchEntry.objects.filter(
+            entity_type=entries[0].entity_type, entity_id__in=[entry.entity_id for entry in entries]
+        )
+        SearchToken.objects.bulk_create([
+            SearchToken(entry_id=entry.pk, organization_id=entry.organization_id, token=token)
+            for entry in created for token in entry.tokens.split()
+        ], batch_size=BATCH_SIZE)
+
+    for entity_type, queryset, document in documents(apps):
+        indexed = set(SearchEntry.objects.filter(entity_type=entity_type).values_list('entity_id', flat=True))
+        batch = []
+        for instance in queryset.order_by('pk').iterator(chunk_size=BATCH_SIZE):
+            organization_id, title, subtitle, url, text = document(instance)
+            if organization_id is None or str(instance.pk) in indexed:
+                continue
+            batch.append(SearchEntry(
+                entity_type=entity_type, entity_id=str(instance.pk), organization_id=organization_id,
+                title=(title or '')[:255], subtitle=(subtitle or '')[:255], url=url[:255], folded=fold(title)[:255],
+                tokens=' '.join(tokenize(f"{title} {text}")[:MAX_TOKENS]),
+            ))
+            if len(batch) >= BATCH_SIZE:
+                flush(batch)
+                batch = []
+        if batch:
+            flush(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_notification_keyset_index'),
+        ('crm', '0024_activitylog_keyset_index'),
+        ('databases', '0003_alter_property_type'),
+        ('pages', '0008_query_indexes'),
+        ('tasks', '0011_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -20,3 +20,21 @@ class OrganizationScopeMixin:
             raise PermissionDenied("User does not belong to an organization.")
             
         serializer.save(organization=self.request.user.organization)
+
+from rest_framework.permissions import SAFE_METHODS
+
+class SparseFieldsMixin:
+    """
+    Reads only what the response sends (core.serializers.DynamicFieldsMixin):
+    the large columns left out by ?fields=, ?omit= or the list mode are
+    deferred and the ?expand= relations joined. Put it first in the bases.
+    """
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.request.method not in SAFE_METHODS:
+            return queryset
+        serializer = self.get_serializer(many=self.action == 'list')
+        serializer = getattr(serializer, 'child', serializer)
+        if hasattr(serializer, 'optimize_queryset'):
+            queryset = serializer.optimize_queryset(queryset)
+        return queryset
@@ -1,7 +1,64 @@
 from django.contrib.auth.models import AbstractUser
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils import timezone
+from core.realtime import BroadcastQuerySet
+import copy
 import uuid
 
+class ChangeTrackingMixin:
+    """
+    Remembers the values loaded from the database so a save can tell which
+    fields actually changed, without re-querying the row in pre_save.
+    Put it before models.Model in the bases.
+    """
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # field_names are attnames; copy mutable values (JSONField) so in-place edits show up
+        instance._loaded_values = {name: copy.deepcopy(value) for name, value in zip(field_names, values)}
+        return instance
+
+    def get_changes(self, update_fields=None):
+        """
+        {field name: (old, new)} for the fields that differ from the loaded
+        values (foreign keys compare ids). auto_now fields are ignored.
+        """
+        loaded = getattr(self, '_loaded_values', None)
+        if not loaded:
+            return {}
+
+        changes = {}
+        for field in self._meta.concrete_fields:
+            if field.attname not in loaded or getattr(field, 'auto_now', False):
+                continue
+            if update_fields is not None and field.name not in update_fields and field.attname not in update_fields:
+                continue
+            old, new = loaded[field.attname], getattr(self, field.attname)
+            if old != new:
+                changes[field.name] = (old, new)
+        return changes
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # post_save receivers have seen the diff, the saved values become the new baseline
+        update_fields = kwargs.get('update_fields')
+        loaded = getattr(self, '_loaded_values', None) or {}
+        for field in self._meta.concrete_fields:
+            if update_fields is None or field.name in update_fields or field.attname in update_fields:
+                loaded[field.attname] = copy.deepcopy(getattr(self, field.attname))
+        self._loaded_values = loaded
+
+    def refresh_from_db(self, using=None, fields=None, **kwargs):
+        super().refresh_from_db(using=using, fields=fields, **kwargs)
+        loaded = getattr(self, '_loaded_values', None) or {}
+        for field in self._meta.concrete_fields:
+            if fields is None or field.name in fields or field.attname in fields:
+                loaded[field.attname] = copy.deepcopy(getattr(self, field.attname))
+        self._loaded_values = loaded
+
 class Organization(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     name = models.CharField(max_length=255)
@@ -28,6 +85,32 @@ class User(AbstractUser):
     def __str__(self):
         return self.email
 
+class NotificationQuerySet(BroadcastQuerySet):
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        deltas = {}
+        for notification in objs:
+            if not notification.is_read:
+                deltas[notification.recipient_id] = deltas.get(notification.recipient_id, 0) + 1
+        NotificationCounter.adjust(deltas)
+        return objs
+
+    def mark_read(self, user, ids=None, before=None):
+        """
+        Marks the user's unread notifications as read in one UPDATE: the given
+        ids, those created at or before `before`, or all of them.
+        Returns the number of notifications that changed.
+        """
+        queryset = self.filter(recipient=user, is_read=False)
+        if ids is not None:
+            queryset = queryset.filter(id__in=ids)
+        if before is not None:
+            queryset = queryset.filter(created_at__lte=before)
+        # Rows already read by a concurrent request do not match anymore, the counter stays exact
+        updated = queryset.update(is_read=True)
+        NotificationCounter.adjust({user.pk: -updated})
+        return updated
+
 class Notification(models.Model):
     TYPE_CHOICES = (
         ('task_assigned', 'Task Assigned'),
@@ -46,12 +129,142 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    # Digest of several events (core/notifications.py): later events of the
+    # window are folded into this row, items keeps what each one said
+    item_count = models.PositiveIntegerField(default=1)
+    items = models.JSONField(default=list, blank=True)
+    digest_until = models.DateTimeField(null=True, blank=True)
+
+    # Pushed to the recipient's WebSocket, bulk_create included (core/realtime.py)
+    objects = NotificationQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Unread badge, list of a user and read-state updates
+            models.Index(fields=['recipient', 'is_read', 'created_at'], name='notif_recipient_read_idx'),
+            # Keyset pages of the list (core/pagination.py)
+            models.Index(fields=['recipient', 'created_at', 'id'], name='notif_recipient_created_idx'),
+        ]
 
     def __str__(self):
         return f"To {self.recipient}: {self.title}"
 
+class NotificationCounter(models.Model):
+    """
+    Unread notifications of a user, maintained on create and read so the
+    badge is a primary-key lookup instead of a COUNT.
+    """
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='notification_counter')
+    # Signed: MySQL refuses UNSIGNED arithmetic that goes below 0, even inside GREATEST()
+    unread = models.IntegerField(default=0)
+
+    @classmethod
+    def adjust(cls, deltas, create_missing=True):
+        """Atomically adds {user_id: delta} to the counters."""
+        for user_id, delta in deltas.items():
+            if not delta:
+                continue
+            updated = cls.objects.filter(user_id=user_id).update(unread=Greatest(F('unread') + delta, 0))
+            if not updated and create_missing:
+                # First use: start from the actual count, which already includes this change
+                cls.initialize(user_id)
+
+    @classmethod
+    def initialize(cls, user_id):
+        unread = Notification.objects.filter(recipient_id=user_id, is_read=False).count()
+        try:
+            with transaction.atomic():
+                return cls.objects.create(user_id=user_id, unread=unread).unread
+        except IntegrityError:
+            # Created concurrently, it counted the same rows
+            return cls.objects.get(user_id=user_id).unread
+
+    @classmethod
+    def get_unread(cls, user_id):
+        unread = cls.objects.filter(user_id=user_id).values_list('unread', flat=True).first()
+        return cls.initialize(user_id) if unread is None else unread
+
+class ArchivedNotification(models.Model):
+    """Read notifications moved out of the hot table by `manage.py archive_notifications`."""
+    id = models.UUIDField(primary_key=True, editable=False)
+    recipient = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_notifications')
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    type = models.CharField(max_length=50)
+    title = models.CharField(max_length=255)
+    message = models.TextField(blank=True)
+    link = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient', 'created_at'], name='archived_notif_recipient_idx'),
+        ]
+
+    def __str__(self):
+        return f"To {self.recipient}: {self.title} (archived)"
+
+class AnalyticsRollup(models.Model):
+    """
+    Contracts or tasks of an organization created in a month, per status,
+    maintained on save/delete (core/analytics.py) so the dashboard charts
+    read a few rows per month instead of aggregating every row.
+    `manage.py rebuild_analytics_rollups` recomputes them from scratch.
+    """
+    KIND_CHOICES = (
+        ('contract', 'Contract'),
+        ('task', 'Task'),
+    )
+
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='analytics_rollups')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    month = models.DateField() # First day of the creation month
+    status = models.CharField(max_length=20)
+    count = models.IntegerField(default=0)
+    amount = models.DecimalField(max_digits=16, decimal_places=2, default=0) # Sum of the amounts (contracts)
+
+    class Meta:
+        ordering = ['month']
+        unique_together = ('organization', 'kind', 'month', 'status')
+
+    def __str__(self):
+        return f"{self.organization_id} {self.kind} {self.month:%Y-%m} {self.status}: {self.count}"
+
+class SearchEntry(models.Model):
+    """
+    One searchable object (page, space, contact, task...), denormalized so
+    the global search is one indexed query (see core/search.py).
+    """
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='search_entries')
+    entity_type = models.CharField(max_length=20)
+    entity_id = models.CharField(max_length=64)
+    title = models.CharField(max_length=255)
+    subtitle = models.CharField(max_length=255, blank=True)
+    url = models.CharField(max_length=255)
+    folded = models.CharField(max_length=255) # Title lowercased, without accents
+    tokens = models.TextField(blank=True) # Normalized words, space separated
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('entity_type', 'entity_id')
+
+    def __str__(self):
+        return f"{self.entity_type}: {self.title}"
+
+class SearchToken(models.Model):
+    """A normalized word of a SearchEntry, looked up by prefix range."""
+    entry = models.ForeignKey(SearchEntry, on_delete=models.CASCADE, related_name='token_rows')
+    organization = models.ForeignKey(Organization, on_delete=models.CASCADE, related_name='+', db_index=False)
+    token = models.CharField(max_length=64)
+
+    class Meta:
+        indexes = [
+            # Covers the search: prefix range per organization, entry read from the index
+            models.Index(fields=['organization', 'token', 'entry'], name='search_token_org_token_idx'),
+        ]
+
 class UserFcmToken(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='fcm_tokens')
@@ -65,3 +278,39 @@ class UserFcmToken(models.Model):
 
     def __str__(self):
         return f"Token for {self.user.email} (Device: {self.device_type})"
+
+class OutboxEvent(models.Model):
+    """
+    One delivery of a domain event to one handler (see core/outbox.py).
+    Rows are written in the same transaction as the change that produced them
+    and delivered after commit.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('dead', 'Dead letter'),
+    )
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    event_type = models.CharField(max_length=100) # e.g. 'meeting.created'
+    handler = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    actor = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    available_at = models.DateTimeField(default=timezone.now) # Next attempt (retry backoff)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='outbox_status_available_idx'),
+            models.Index(fields=['handler', 'status'], name='outbox_handler_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event_type} -> {self.handler} ({self.status})"
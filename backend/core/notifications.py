@@ -0,0 +1,205 @@
+"""
+Coalescing of high-churn notifications.
+
+notify() creates notifications the way Notification.objects.bulk_create()
+would, except that notifications of the same recipient and type are folded
+into one digest row:
+- within the call (reassigning 100 tasks to someone creates one row)
+- into the recipient's unread digest of that type while its window is open
+  (settings.NOTIFICATION_DIGEST_WINDOWS, seconds per type)
+
+dispatch_pushes() applies the same grouping to FCM pushes: one push per
+recipient and type when a window opens, and the events of the rest of the
+window in one trailing digest push, sent by the outbox when it closes. Rows
+and pushes therefore scale with the number of recipients, not the number of
+events. The items of a digest are
+listed by GET /notifications/<id>/items/.
+"""
+import time
+from datetime import timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from core import outbox, realtime
+from core.models import Notification, OutboxEvent
+from core.services.fcm import PushDispatcher
+
+MAX_ITEMS = 50 # Items kept on a digest, item_count keeps counting
+DIGEST_PUSH_HANDLER = 'core.digest_push' # Outbox handler of the trailing pushes (core/signals.py)
+
+DIGEST_TITLES = {
+    'task_assigned': "{count} tâches vous ont été assignées",
+    'contract_signed': "{count} contrats ont été signés",
+}
+
+
+def get_window(notification_type):
+    return getattr(settings, 'NOTIFICATION_DIGEST_WINDOWS', {}).get(notification_type, 0)
+
+
+def _label(title):
+    # Titles read "<what happened>: <name>", a digest lists the names
+    return title.split(': ', 1)[-1]
+
+
+def digest_text(notification_type, labels, count):
+    """(title, message) of a digest of `count` items, named by their labels."""
+    title = DIGEST_TITLES.get(notification_type, "{count} nouvelles notifications").format(count=count)
+    shown = labels[:3]
+    message = ", ".join(shown)
+    if count > len(shown):
+        message += f" et {count - len(shown)} autre{'s' if count - len(shown) > 1 else ''}"
+    return title, message
+
+
+def _item(notification):
+    return {
+        # Set digest_label on the instance when the title does not end with the name
+        'label': getattr(notification, 'digest_label', None) or _label(notification.title),
+        'title': notification.title,
+        'message': notification.message,
+        'link': notification.link,
+        'actor': str(notification.actor_id) if notification.actor_id else None,
+        'created_at': (notification.created_at or timezone.now()).isoformat(),
+    }
+
+
+def _fold(digest, group):
+    """Adds the notifications of group to digest (in memory)."""
+    items = digest.items or [_item(digest)]
+    items.extend(_item(notification) for notification in group)
+    digest.item_count += len(group)
+    digest.items = items[-MAX_ITEMS:]
+    digest.title, digest.message = digest_text(
+        digest.type, [item.get('label') or _label(item['title']) for item in reversed(digest.items)], digest.item_count
+    )
+    links = {item['link'] for item in digest.items}
+    digest.link = links.pop() if len(links) == 1 else digest.link
+    digest.actor = group[-1].actor
+
+
+def _group(entries, key):
+    groups = {}
+    for entry in entries:
+        groups.setdefault(key(entry), []).append(entry)
+    return groups
+
+
+def notify(notifications):
+    """
+    Saves unsaved Notification instances, coalesced per (recipient, type).
+    Returns the notifications created or updated.
+    """
+    now = timezone.now()
+    groups = _group(notifications, lambda n: (n.recipient_id, n.type))
+    to_create, to_update = [], []
+
+    with transaction.atomic():
+        coalesced = {key: group for key, group in groups.items() if get_window(key[1])}
+        open_digests = {}
+        if coalesced:
+            # One query for every recipient: their unread digests still open
+            for digest in Notification.objects.select_for_update().filter(
+                recipient_id__in={recipient_id for recipient_id, _ in coalesced},
+                type__in={notification_type for _, notification_type in coalesced},
+                is_read=False,
+                digest_until__gt=now,
+            ).order_by('created_at'):
+                open_digests[(digest.recipient_id, digest.type)] = digest
+
+        for key, group in groups.items():
+            if key not in coalesced:
+                to_create.extend(group)
+                continue
+            digest = open_digests.get(key)
+            if digest is not None:
+                _fold(digest, group)
+                to_update.append(digest)
+                continue
+            digest, rest = group[0], group[1:]
+            digest.digest_until = now + timedelta(seconds=get_window(key[1]))
+            digest.items = [_item(digest)] # Keeps the label of the first event for later folds
+            if rest:
+                _fold(digest, rest)
+            to_create.append(digest)
+
+        Notification.objects.bulk_create(to_create)
+        Notification.objects.bulk_update(to_update, ['title', 'message', 'link', 'actor', 'item_count', 'items'])
+        if to_update:
+            transaction.on_commit(lambda: _publish_updated(to_update))
+    return to_create + to_update
+
+
+def _publish_updated(digests):
+    from core.serializers import NotificationSerializer
+    for digest, data in zip(digests, NotificationSerializer(digests, many=True).data):
+        realtime.publish(realtime.user_channel(digest.recipient_id), {'type': 'notification.updated', 'notification': data})
+
+
+def _entry_label(entry):
+    return entry[5] if len(entry) > 5 else _label(entry[2])
+
+
+def _push_text(notification_type, title, body, labels, count):
+    """(title, body) of a push of `count` events, the first one's own text when alone."""
+    if count == 1:
+        return title, body
+    return digest_text(notification_type, labels, count)
+
+
+def dispatch_pushes(entries):
+    """
+    entries: [(recipient_id, type, title, body, data[, label])] of one event,
+    label naming the event in a digest (default: the end of the title, see
+    _label). Sends one push per recipient and type: a digest push when an event has
+    several entries for the same recipient. While the window of a push sent
+    to the recipient is open, the entries are folded into the trailing
+    digest push instead (see send_digest_push).
+    Returns the number of devices reached.
+    """
+    push = PushDispatcher()
+    for (recipient_id, notification_type), group in _group(entries, lambda entry: (entry[0], entry[1])).items():
+        window = get_window(notification_type)
+        if window:
+            key = f"notifications:push:{recipient_id}:{notification_type}"
+            closes_at = time.time() + window
+            if not cache.add(key, closes_at, window):
+                _defer_push(recipient_id, notification_type, group, cache.get(key) or closes_at)
+                continue
+        _, _, title, body, data = group[0][:5]
+        labels = [_entry_label(entry) for entry in group]
+        push.add(recipient_id, *_push_text(notification_type, title, body, labels, len(group)), data)
+    return push.send()
+
+
+def _defer_push(recipient_id, notification_type, group, closes_at):
+    """Adds the entries to the recipient's trailing push, recorded for when the window closes."""
+    labels = [_entry_label(entry) for entry in group]
+    with transaction.atomic():
+        pending = OutboxEvent.objects.select_for_update().filter(
+            handler=DIGEST_PUSH_HANDLER, status='pending',
+            payload__recipient_id=str(recipient_id), payload__type=notification_type,
+        ).first()
+        if pending is None:
+            _, _, title, body, data = group[0][:5]
+            outbox.publish('notification.digest_push', {
+                'recipient_id': str(recipient_id), 'type': notification_type, 'title': title, 'body': body,
+                'data': data, 'labels': labels[:3], 'count': len(group),
+            }, delay=max(closes_at - time.time(), 0))
+            return
+        # Only the first labels are shown (digest_text)
+        pending.payload['labels'] = (pending.payload['labels'] + labels)[:3]
+        pending.payload['count'] += len(group)
+        pending.save(update_fields=['payload'])
+
+
+def send_digest_push(payload):
+    """The trailing push of a window (payload recorded by _defer_push). Returns the number of devices reached."""
+    push = PushDispatcher()
+    push.add(
+        payload['recipient_id'],
+        *_push_text(payload['type'], payload['title'], payload['body'], payload['labels'], payload['count']),
+        payload['data']
+    )
+    return push.send()
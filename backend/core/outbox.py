@@ -0,0 +1,268 @@
+"""
+Transactional outbox for domain events.
+
+post_save receivers only call publish(): it writes one OutboxEvent row per
+subscribed handler in the same transaction as the change. Once the
+transaction commits, the rows are delivered by one worker per handler
+(in-process threads, or the run_outbox command), with retries, exponential
+backoff and a dead-letter state. Slow providers (Google, Firebase, OpenAI)
+therefore never run inside the request.
+
+Handlers receive the OutboxEvent, run inside impersonate(event.actor) so
+get_current_user() keeps working, and must be idempotent: a delivery can be
+retried after a failure. Database writes made by a handler are committed
+together with the 'done' status, so they happen exactly once.
+
+OUTBOX_CONF['MODE']:
+- 'thread': deliver after commit on per-handler background threads (default)
+- 'sync': deliver after commit in the calling thread (tests, debugging)
+- 'worker': only deliver from `manage.py run_outbox`
+
+publish(..., delay=seconds) records an event that is only delivered once
+the delay has passed (e.g. a digest sent when its window closes).
+
+Delivered rows are kept OUTBOX_CONF['RETENTION_DAYS'] days for debugging,
+then deleted by `manage.py run_outbox --once --purge-done` (daily cron).
+Dead letters are never purged.
+"""
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction, connection
+from django.db.models import Q
+from django.utils import timezone
+from crum import get_current_user, impersonate
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONF = {
+    'MODE': 'thread',
+    'MAX_ATTEMPTS': 5,
+    'RETRY_DELAY': 30, # Seconds, doubled after each failure
+    'BATCH_SIZE': 100,
+    'LEASE': 300, # Seconds after which a 'processing' row is considered abandoned
+    'RETENTION_DAYS': 7, # 'done' rows older than this are deleted by purge()
+}
+
+# handler name -> {'func': callable(event), 'events': set of event types}
+_handlers = {}
+
+# One single-thread executor per handler: a slow provider only delays its own queue
+_executors = {}
+_scheduled = set()
+_lock = threading.Lock()
+
+# Handlers that must not receive events published by the current thread
+_local = threading.local()
+
+
+def get_conf():
+    return {**DEFAULT_CONF, **getattr(settings, 'OUTBOX_CONF', {})}
+
+
+def handler(name, *event_types):
+    """
+    Registers an outbox handler for the given event types:
+
+        @outbox.handler('crm.google_calendar', 'meeting.created')
+        def sync_meeting_to_google(event): ...
+    """
+    def decorator(func):
+        _handlers[name] = {'func': func, 'events': set(event_types)}
+        return func
+    return decorator
+
+
+def subscribers(event_type):
+    suppressed = getattr(_local, 'suppressed', ())
+    return [name for name, entry in _handlers.items() if event_type in entry['events'] and name not in suppressed]
+
+
+@contextmanager
+def suppressed(*names):
+    """
+    Events published inside the block are not recorded for these handlers.
+    Used as a re-entrancy guard, e.g. saves made by automation actions do
+    not trigger automation again.
+    """
+    previous = getattr(_local, 'suppressed', frozenset())
+    _local.suppressed = previous | set(names)
+    try:
+        yield
+    finally:
+        _local.suppressed = previous
+
+
+def publish(event_type, payload=None, actor=None, delay=0):
+    """
+    Records an event for every handler subscribed to event_type, due in
+    `delay` seconds. Must be called inside the transaction that changes the data.
+    """
+    from core.models import OutboxEvent
+
+    names = subscribers(event_type)
+    if not names:
+        return []
+
+    if actor is None:
+        actor = get_current_user()
+    if actor is not None and not getattr(actor, 'is_authenticated', False):
+        actor = None
+
+    # Compact, JSON-safe payload (UUIDs, dates and decimals become strings)
+    payload = json.loads(json.dumps(payload or {}, cls=DjangoJSONEncoder))
+    available_at = timezone.now() + timedelta(seconds=delay)
+    events = OutboxEvent.objects.bulk_create([
+        OutboxEvent(event_type=event_type, handler=name, payload=payload, actor=actor, available_at=available_at)
+        for name in names
+    ])
+    transaction.on_commit(lambda: _deliver_after_commit(names, delay))
+    return events
+
+
+def publish_instance(instance, action, **payload):
+    """publish() for a model instance: event type '<model_name>.<action>'."""
+    payload = {
+        'id': str(instance.pk),
+        'organization_id': str(instance.organization_id) if getattr(instance, 'organization_id', None) else None,
+        **payload
+    }
+    return publish(f"{instance._meta.model_name}.{action}", payload)
+
+
+def load_instance(event, model):
+    """The instance an event refers to, or None if it was deleted since."""
+    return model.objects.filter(pk=event.payload.get('id')).first()
+
+
+# --- Delivery ---
+
+def _deliver_after_commit(names, delay=0):
+    mode = get_conf()['MODE']
+    for name in names:
+        if mode == 'sync':
+            dispatch(handler=name)
+        elif mode == 'thread' and delay:
+            _schedule_later(delay, name)
+        elif mode == 'thread':
+            _schedule(name)
+
+
+def _schedule_later(delay, name):
+    timer = threading.Timer(delay, _schedule, args=[name])
+    timer.daemon = True
+    timer.start()
+
+
+def _schedule(name):
+    with _lock:
+        if name in _scheduled:
+            # A run for this handler is already queued, it will see the new rows
+            return
+        _scheduled.add(name)
+        executor = _executors.get(name)
+        if executor is None:
+            executor = _executors[name] = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"outbox-{name}")
+    executor.submit(_run_worker, name)
+
+
+def _run_worker(name):
+    with _lock:
+        _scheduled.discard(name)
+    try:
+        dispatch(handler=name)
+    except Exception as e:
+        logger.exception(f"Outbox worker {name} crashed: {e}")
+    finally:
+        # Worker threads own their DB connection
+        connection.close()
+
+
+def _due_filter(now, lease):
+    return Q(status='pending', available_at__lte=now) | Q(status='processing', locked_at__lt=now - timedelta(seconds=lease))
+
+
+def dispatch(handler=None, limit=None):
+    """
+    Delivers the events that are due (optionally for a single handler).
+    Returns the number of events processed.
+    """
+    from core.models import OutboxEvent
+
+    conf = get_conf()
+    now = timezone.now()
+    queryset = OutboxEvent.objects.filter(_due_filter(now, conf['LEASE']))
+    if handler:
+        queryset = queryset.filter(handler=handler)
+    event_ids = list(queryset.order_by('created_at').values_list('id', flat=True)[:limit or conf['BATCH_SIZE']])
+
+    processed = 0
+    for event_id in event_ids:
+        # Claim the row: only one worker wins the conditional update
+        claimed = OutboxEvent.objects.filter(_due_filter(timezone.now(), conf['LEASE']), pk=event_id).update(
+            status='processing', locked_at=timezone.now()
+        )
+        if not claimed:
+            continue
+        deliver(OutboxEvent.objects.select_related('actor').get(pk=event_id), conf)
+        processed += 1
+    return processed
+
+
+def deliver(event, conf=None):
+    conf = conf or get_conf()
+    entry = _handlers.get(event.handler)
+    event.attempts += 1
+    try:
+        if entry is None:
+            raise LookupError(f"No outbox handler named '{event.handler}'")
+        with transaction.atomic():
+            with impersonate(event.actor):
+                entry['func'](event)
+            event.status = 'done'
+            event.processed_at = timezone.now()
+            event.last_error = ''
+            event.save(update_fields=['status', 'attempts', 'processed_at', 'last_error'])
+        return True
+    except Exception as e:
+        event.last_error = f"{type(e).__name__}: {e}"
+        if event.attempts >= conf['MAX_ATTEMPTS']:
+            event.status = 'dead'
+            logger.error(f"Outbox event {event.id} ({event.event_type} -> {event.handler}) moved to dead letter: {e}")
+        else:
+            delay = conf['RETRY_DELAY'] * 2 ** (event.attempts - 1)
+            event.status = 'pending'
+            event.available_at = timezone.now() + timedelta(seconds=delay)
+            logger.warning(f"Outbox event {event.id} ({event.handler}) failed, retry in {delay}s: {e}")
+            if conf['MODE'] == 'thread':
+                _schedule_later(delay, event.handler)
+        event.locked_at = None
+        event.save(update_fields=['status', 'attempts', 'last_error', 'available_at', 'locked_at'])
+        return False
+
+
+def purge(days=None, batch_size=5000):
+    """Deletes the events delivered more than `days` ago, in batches. Returns the number of rows deleted."""
+    from core.models import OutboxEvent
+
+    if days is None:
+        days = get_conf()['RETENTION_DAYS']
+    cutoff = timezone.now() - timedelta(days=days)
+    delivered = OutboxEvent.objects.filter(status='done', processed_at__lt=cutoff)
+    total = 0
+    while True:
+        # Short transactions: a large backlog never locks the table for long
+        ids = list(delivered.values_list('id', flat=True)[:batch_size])
+        if not ids:
+            return total
+        total += OutboxEvent.objects.filter(id__in=ids).delete()[0]
+
+
+def requeue(queryset):
+    """Sends dead letters (or any events) back to the queue."""
+    return queryset.update(status='pending', attempts=0, available_at=timezone.now(), locked_at=None, last_error='')
@@ -0,0 +1,149 @@
+"""
+Keyset pagination for the long, time-ordered lists (activity log,
+notifications, tasks, AI conversations).
+
+A page is "the page_size rows after this one" in the view's keyset_ordering
+(a timestamp and the primary key to break ties):
+
+    WHERE created_at < %s OR (created_at = %s AND id < %s)
+    ORDER BY created_at DESC, id DESC LIMIT page_size + 1
+
+Served by an index on the ordering columns, so the 1000th page costs the
+same as the first: no COUNT(*) and no OFFSET. The cursor in the next and
+previous links is opaque (base64 JSON of the boundary row and the
+direction); new rows at the head of the list do not shift the pages.
+"""
+import json
+import base64
+import datetime
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = api_settings.PAGE_SIZE or 100
+    max_page_size = 500
+    ordering = ('-created_at', '-id')
+    invalid_cursor_message = 'Invalid cursor'
+
+    def get_ordering(self, view):
+        return tuple(getattr(view, 'keyset_ordering', self.ordering))
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        """(boundary values, reverse) of the cursor, (None, False) on the first page."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            values, reverse = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')))
+        except (TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(values, list) or len(values) != len(self.ordering_fields):
+            raise NotFound(self.invalid_cursor_message)
+        return values, bool(reverse)
+
+    def clean_values(self, model, values):
+        """Cursor values as Python values of the ordering fields; a tampered cursor is a 404, not a 500."""
+        try:
+            values = [
+                model._meta.pk.to_python(value) if name in ('id', 'pk') else model._meta.get_field(name).to_python(value)
+                for name, value in zip(self.ordering_fields, values)
+            ]
+        except (ValidationError, TypeError, ValueError):
+            raise NotFound(self.invalid_cursor_message)
+        if None in values:
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def encode_cursor(self, obj, reverse):
+        values = []
+        for name in self.ordering_fields:
+            value = getattr(obj, 'pk' if name in ('id', 'pk') else name)
+            if isinstance(value, (datetime.date, datetime.time)):
+                value = value.isoformat() # Microseconds kept (DjangoJSONEncoder drops them), parsed back by the filter
+            elif not isinstance(value, (int, float)):
+                value = str(value) # UUID
+            values.append(value)
+        encoded = base64.urlsafe_b64encode(json.dumps([values, reverse]).encode()).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _after(self, ordering, values):
+        """Rows strictly after the boundary in this ordering."""
+        condition = Q()
+        for position, field in enumerate(ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            step = Q(**{f'{name}__{lookup}': values[position]})
+            for previous, value in zip(ordering[:position], values):
+                step &= Q(**{previous.lstrip('-'): value})
+            condition |= step
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        ordering = self.get_ordering(view)
+        self.ordering_fields = [field.lstrip('-') for field in ordering]
+        self.page_size = self.get_page_size(request)
+        self.base_url = request.build_absolute_uri()
+        values, reverse = self.decode_cursor(request)
+        if values is not None:
+            values = self.clean_values(queryset.model, values)
+
+        if reverse:
+            # Previous page: walk back from the boundary, then restore the order
+            ordering = tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
+        queryset = queryset.order_by(*ordering)
+        if values is not None:
+            queryset = queryset.filter(self._after(ordering, values))
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.rows = rows
+        self.has_next = (values is not None) if reverse else has_more
+        self.has_previous = has_more if reverse else (values is not None)
+        return rows
+
+    def get_next_link(self):
+        if not self.rows or not self.has_next:
+            return None
+        return self.encode_cursor(self.rows[-1], False)
+
+    def get_previous_link(self):
+        if not self.rows or not self.has_previous:
+            return None
+        return self.encode_cursor(self.rows[0], True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
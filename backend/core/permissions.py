@@ -34,34 +34,38 @@ class SpaceRolePermission(permissions.BasePermission):
             space_id = request.data.get('space')
             if not space_id: return True # Could be global object
             
-            from crm.models import SpaceMember
-            member = SpaceMember.objects.filter(space_id=space_id, user=request.user).first()
+            from core import memberships
+            role = memberships.role(request, space_id)
             
-            if not member:
+            if not role:
                 return False
                 
             # Spectators cannot create
-            if member.role == 'spectator':
+            if role == 'spectator':
                 return False
                 
         return True
 
     def has_object_permission(self, request, view, obj):
-        from crm.models import Space, SpaceMember
+        from crm.models import Space
+        from core import memberships
         
-        # Determine the space associated with the object
-        space = None
+        # Determine the space associated with the object, without loading it
+        space_id = None
         if isinstance(obj, Space):
-            space = obj
+            space_id = obj.pk
+        elif hasattr(obj, 'space_id'):
+            space_id = obj.space_id
         elif hasattr(obj, 'space'):
-            space = obj.space
+            space_id = getattr(obj.space, 'pk', None)
             
-        if not space:
+        if not space_id:
             return True # Not a space-scoped object
             
-        member = SpaceMember.objects.filter(space=space, user=request.user).first()
+        # Roles of the user are loaded once per request (core/memberships.py)
+        role = memberships.role(request, space_id)
         
-        if not member:
+        if not role:
             return False # Not a member of this space
             
         # Safe methods (GET, HEAD, OPTIONS) are allowed for any member (Spectator, Editor, Admin)
@@ -70,10 +74,10 @@ class SpaceRolePermission(permissions.BasePermission):
             
         # DELETE operations are usually restricted to Admin
         if request.method == 'DELETE':
-            return member.role == 'admin'
+            return role == 'admin'
             
         # PUT/PATCH are allowed for Editor and Admin, NOT Spectator
         if request.method in ['PUT', 'PATCH']:
-            return member.role in ['admin', 'editor']
+            return role in ['admin', 'editor']
             
         return False
@@ -0,0 +1,248 @@
+"""
+Real-time messages to connected clients (see core/websocket.py).
+
+Each WebSocket subscribes to its user's channel on the process-wide Hub:
+messages are addressed to the users allowed to see them. publish() can be
+called from any thread (views, outbox workers). The message goes through
+the configured backend, which hands it back to the Hub of every process
+that holds sockets:
+
+- LocalBackend: in-process only (single worker, development, tests)
+- PostgresBackend: LISTEN/NOTIFY on a PostgreSQL database, for fan-out
+  across uvicorn workers and to sockets of other machines
+
+REALTIME_CONF = {'BACKEND': 'core.realtime.PostgresBackend', 'OPTIONS': {'DATABASE': 'vector_db'}}
+
+Models declare what is pushed when rows are created with @broadcaster. The
+messages are published after commit, for save() and for bulk_create() (use
+BroadcastQuerySet as the model manager).
+"""
+import json
+import time
+import select
+import asyncio
+import logging
+import threading
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models, transaction, connections
+from django.db.models.signals import post_save
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONF = {
+    'BACKEND': 'core.realtime.LocalBackend',
+    'OPTIONS': {},
+    'QUEUE_SIZE': 100, # Messages buffered per socket, the oldest are dropped
+    'HEARTBEAT': 30, # Seconds of silence before the server pings the client
+}
+
+_hub = None
+_hub_lock = threading.Lock()
+
+
+def get_conf():
+    return {**DEFAULT_CONF, **getattr(settings, 'REALTIME_CONF', {})}
+
+
+def user_channel(user_id):
+    return f"user:{user_id}"
+
+
+# --- Backends ---
+
+class LocalBackend:
+    """Messages only reach the sockets of the publishing process."""
+
+    def __init__(self, hub, **options):
+        self.hub = hub
+
+    def start(self):
+        pass
+
+    def publish(self, channel, message):
+        self.hub.deliver(channel, message)
+
+
+class PostgresBackend:
+    """
+    Fan-out through PostgreSQL NOTIFY: every process listening on the
+    database receives every message, including the publisher.
+    """
+    MAX_PAYLOAD = 7900 # NOTIFY payloads are limited to 8000 bytes
+
+    def __init__(self, hub, DATABASE='default', CHANNEL='realtime', **options):
+        self.hub = hub
+        self.alias = DATABASE
+        self.channel = CHANNEL
+        self._thread = None
+
+    def publish(self, channel, message):
+        payload = json.dumps({'channel': channel, 'message': message}, cls=DjangoJSONEncoder)
+        if len(payload.encode()) > self.MAX_PAYLOAD:
+            # Clients refetch what they missed
+            payload = json.dumps({'channel': channel, 'message': {'type': message.get('type'), 'truncated': True}})
+        with connections[self.alias].cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [self.channel, payload])
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._listen_forever, name='realtime-listener', daemon=True)
+            self._thread.start()
+
+    def _listen_forever(self):
+        while True:
+            try:
+                self._listen()
+            except Exception as e:
+                logger.warning(f"Realtime listener disconnected, reconnecting: {e}")
+                time.sleep(2)
+
+    def _listen(self):
+        wrapper = connections[self.alias]
+        # A dedicated connection, never shared with the ORM
+        connection = wrapper.get_new_connection(wrapper.get_connection_params())
+        connection.autocommit = True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(f'LISTEN "{self.channel}"')
+            while True:
+                if select.select([connection], [], [], 30) == ([], [], []):
+                    continue
+                connection.poll()
+                while connection.notifies:
+                    notify = connection.notifies.pop(0)
+                    data = json.loads(notify.payload)
+                    self.hub.deliver(data['channel'], data['message'])
+        finally:
+            connection.close()
+
+
+# --- Hub ---
+
+class Subscription:
+    def __init__(self, channels, loop, maxsize):
+        self.channels = set(channels)
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+
+    def push(self, message):
+        # Runs in the socket's event loop
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self):
+        return await self.queue.get()
+
+
+class Hub:
+    def __init__(self, conf):
+        self.conf = conf
+        self.backend = import_string(conf['BACKEND'])(self, **conf['OPTIONS'])
+        self._subscriptions = {} # channel -> set of Subscription
+        self._lock = threading.Lock()
+        self._started = False
+
+    def subscribe(self, channels):
+        """Called from the event loop of a socket."""
+        subscription = Subscription(channels, asyncio.get_running_loop(), self.conf['QUEUE_SIZE'])
+        with self._lock:
+            for channel in subscription.channels:
+                self._subscriptions.setdefault(channel, set()).add(subscription)
+            if not self._started:
+                # Only processes holding sockets listen to the backend
+                self._started = True
+                self.backend.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for channel in subscription.channels:
+                subscribers = self._subscriptions.get(channel)
+                if subscribers:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscriptions[channel]
+
+    def deliver(self, channel, message):
+        """Hands a message to the local sockets of the channel (any thread)."""
+        with self._lock:
+            subscribers = list(self._subscriptions.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.push, message)
+            except RuntimeError:
+                # Event loop closed: the socket is gone
+                self.unsubscribe(subscription)
+
+    def publish(self, channel, message):
+        self.backend.publish(channel, message)
+
+
+def get_hub():
+    global _hub
+    if _hub is None:
+        with _hub_lock:
+            if _hub is None:
+                _hub = Hub(get_conf())
+    return _hub
+
+
+def publish(channel, message):
+    """Sends a message to the sockets of a channel. Never raises."""
+    try:
+        # JSON-safe (UUIDs and dates become strings)
+        get_hub().publish(channel, json.loads(json.dumps(message, cls=DjangoJSONEncoder)))
+    except Exception as e:
+        logger.warning(f"Realtime publish to {channel} failed: {e}")
+
+
+# --- Model broadcasts ---
+
+_broadcasters = {} # model -> callable([instances]) -> [(channel, message)]
+
+
+def broadcaster(model):
+    """
+    Declares the messages sent when rows of the model are created:
+
+        @realtime.broadcaster(Notification)
+        def notification_messages(notifications):
+            return [(user_channel(n.recipient_id), {...}) for n in notifications]
+    """
+    def decorator(func):
+        _broadcasters[model] = func
+        post_save.connect(_broadcast_saved, sender=model, dispatch_uid=f"realtime-{model._meta.label}")
+        return func
+    return decorator
+
+
+def _broadcast_saved(sender, instance, created, **kwargs):
+    if created:
+        broadcast_created(sender, [instance])
+
+
+def broadcast_created(model, instances):
+    func = _broadcasters.get(model)
+    if func is None or not instances:
+        return
+
+    def send():
+        try:
+            for channel, message in func(instances):
+                publish(channel, message)
+        except Exception as e:
+            logger.warning(f"Realtime broadcast of {model._meta.label} failed: {e}")
+
+    transaction.on_commit(send)
+
+
+class BroadcastQuerySet(models.QuerySet):
+    """bulk_create() skips post_save: the created rows are broadcast explicitly."""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = super().bulk_create(objs, *args, **kwargs)
+        broadcast_created(self.model, objs)
+        return objs
@@ -0,0 +1,218 @@
+"""
+Cross-entity search (GlobalSearchView, MentionSearchView).
+
+SearchEntry holds one row per searchable object (title, subtitle, url and
+accent-folded text) and SearchToken its normalized words. Models declare
+their entry with @indexed, saves and deletes keep the rows in sync in the
+transaction of the change:
+
+    @search.indexed(Page, 'page')
+    def page_entry(page):
+        return search.Entry(page.organization_id, page.title, 'Page', f'/pages/{page.id}')
+
+A search is a single statement on the (organization, token) index: every
+term of the query is a prefix range (token >= 'con' AND token < 'coo'), the
+entries matching all the terms are grouped and ranked (title starting with
+the query first, then BOOSTS per type). `manage.py rebuild_search_index`
+fills the index from scratch.
+"""
+import re
+import unicodedata
+from collections import namedtuple
+from django.db import transaction
+from django.db.models import F, Q, Case, When, Value, Count, IntegerField, Window
+from django.db.models.functions import RowNumber
+from django.db.models.signals import post_save, post_delete
+from core.models import SearchEntry, SearchToken
+
+Entry = namedtuple('Entry', 'organization_id title subtitle url text', defaults=('',))
+
+BOOSTS = {'space': 5, 'contact': 4, 'page': 3, 'database': 2, 'task': 1}
+TOKEN_LENGTH = 64 # SearchToken.token max_length
+MAX_TOKENS = 50 # Per entry
+MAX_TERMS = 8 # Per query
+ALPHABET = '0123456789abcdefghijklmnopqrstuvwxyz' # Sorted the same way by binary and accent/case-insensitive collations
+
+_indexed = {} # model -> (entity_type, func, organization lookup)
+
+
+def fold(text):
+    """Lowercase, without accents, single spaces."""
+    text = unicodedata.normalize('NFKD', text or '')
+    text = ''.join(char for char in text if not unicodedata.combining(char))
+    return ' '.join(text.lower().split())
+
+
+def tokenize(text):
+    tokens = re.findall(r'[a-z0-9]+', fold(text))
+    return list(dict.fromkeys(token[:TOKEN_LENGTH] for token in tokens))
+
+
+def _after_prefix(prefix):
+    """Smallest string greater than every string starting with prefix (None: no bound)."""
+    while prefix:
+        position = ALPHABET.find(prefix[-1])
+        if 0 <= position < len(ALPHABET) - 1:
+            return prefix[:-1] + ALPHABET[position + 1]
+        prefix = prefix[:-1]
+    return None
+
+
+def indexed(model, entity_type, organization_lookup='organization'):
+    """
+    Declares the SearchEntry of a model: func(instance) returns an Entry,
+    or None when the instance must not be searchable.
+    """
+    def decorator(func):
+        _indexed[model] = (entity_type, func, organization_lookup)
+        uid = f"search-{model._meta.label}"
+        post_save.connect(_index_saved, sender=model, dispatch_uid=uid)
+        post_delete.connect(_index_deleted, sender=model, dispatch_uid=uid)
+        return func
+    return decorator
+
+
+def _index_saved(sender, instance, **kwargs):
+    update_entries(sender, [instance])
+
+
+def _index_deleted(sender, instance, **kwargs):
+    from core import mentions
+    entity_type = _indexed[sender][0]
+    entries = SearchEntry.objects.filter(entity_type=entity_type, entity_id=str(instance.pk))
+    removed = [(organization_id, entity_type, str(instance.pk)) for organization_id in entries.values_list('organization_id', flat=True)]
+    entries.delete()
+    mentions.entries_changed(removed=removed)
+
+
+def update_entries(model, instances):
+    """Creates, updates or deletes the entries of instances (call it after bulk_create())."""
+    from core import mentions
+    entity_type, func, _ = _indexed[model]
+    documents = {str(instance.pk): func(instance) for instance in instances}
+    if not documents:
+        return
+
+    with transaction.atomic():
+        existing = {
+            entry.entity_id: entry
+            for entry in SearchEntry.objects.filter(entity_type=entity_type, entity_id__in=list(documents))
+        }
+        stale = [
+            existing[entity_id].pk for entity_id, document in documents.items()
+            if entity_id in existing and (document is None or document.organization_id is None)
+        ]
+        # Entries leaving an organization (or the index)
+        removed = [
+            (existing[entity_id].organization_id, entity_type, entity_id) for entity_id, document in documents.items()
+            if entity_id in existing and (document is None or document.organization_id != existing[entity_id].organization_id)
+        ]
+        to_create, to_update = [], []
+        for entity_id, document in documents.items():
+            if document is None or document.organization_id is None:
+                continue
+            values = {
+                'organization_id': document.organization_id,
+                'title': (document.title or '')[:255],
+                'subtitle': (document.subtitle or '')[:255],
+                'url': document.url[:255],
+                'folded': fold(document.title)[:255],
+                'tokens': ' '.join(tokenize(f"{document.title} {document.text}")[:MAX_TOKENS]),
+            }
+            entry = existing.get(entity_id)
+            if entry is None:
+                to_create.append(SearchEntry(entity_type=entity_type, entity_id=entity_id, **values))
+            elif any(getattr(entry, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(entry, field, value)
+                to_update.append(entry)
+
+        if stale:
+            SearchEntry.objects.filter(pk__in=stale).delete()
+        SearchEntry.objects.bulk_create(to_create)
+        SearchEntry.objects.bulk_update(to_update, ['organization_id', 'title', 'subtitle', 'url', 'folded', 'tokens'])
+
+        # Words are rewritten only for the entries that changed
+        changed = to_create + to_update
+        SearchToken.objects.filter(entry__in=[entry.pk for entry in to_update]).delete()
+        SearchToken.objects.bulk_create([
+            SearchToken(entry_id=entry.pk, organization_id=entry.organization_id, token=token)
+            for entry in changed for token in entry.tokens.split()
+        ], batch_size=1000)
+        mentions.entries_changed(saved=changed, removed=removed)
+
+
+def search(organization_id, query, types=None, limit=20, per_type=None):
+    """
+    [{'type', 'id', 'title', 'subtitle', 'url'}] of the entries of the
+    organization whose words start with every term of the query, best first.
+    per_type caps the entries of each type, so many matching spaces do not
+    hide the pages and tasks.
+    """
+    terms = tokenize(query)[:MAX_TERMS]
+    if not terms:
+        return []
+
+    matches, whens = Q(), []
+    for position, term in enumerate(terms):
+        upper = _after_prefix(term)
+        condition = Q(token__gte=term, token__lt=upper) if upper else Q(token__gte=term)
+        matches |= condition
+        whens.append(When(condition, then=Value(position)))
+
+    tokens = SearchToken.objects.filter(matches, organization_id=organization_id)
+    if types:
+        tokens = tokens.filter(entry__entity_type__in=types)
+    rows = (
+        tokens.values('entry_id', 'entry__entity_type', 'entry__entity_id', 'entry__title', 'entry__subtitle', 'entry__url')
+        .annotate(
+            matched=Count(Case(*whens, output_field=IntegerField()), distinct=True),
+            starts=Case(When(entry__folded__startswith=fold(query), then=Value(1)), default=Value(0), output_field=IntegerField()),
+            boost=Case(
+                *[When(entry__entity_type=entity_type, then=Value(boost)) for entity_type, boost in BOOSTS.items()],
+                default=Value(0), output_field=IntegerField()
+            ),
+        )
+        .filter(matched=len(terms))
+    )
+    ranking = ('-starts', '-boost', 'entry__title')
+    if per_type:
+        rows = rows.annotate(type_rank=Window(
+            RowNumber(), partition_by=F('entry__entity_type'),
+            order_by=[F('starts').desc(), F('entry__title').asc()]
+        )).filter(type_rank__lte=per_type)
+    rows = rows.order_by(*ranking)[:limit]
+    return [
+        {
+            'type': row['entry__entity_type'],
+            'id': row['entry__entity_id'],
+            'title': row['entry__title'],
+            'subtitle': row['entry__subtitle'],
+            'url': row['entry__url'],
+        }
+        for row in rows
+    ]
+
+
+def rebuild(organization_id=None, batch_size=1000):
+    """Re-indexes every registered model (of one organization). Returns the number of objects."""
+    from core import mentions
+    total = 0
+    for model, (entity_type, _, organization_lookup) in _indexed.items():
+        with transaction.atomic():
+            entries = SearchEntry.objects.filter(entity_type=entity_type)
+            queryset = model._default_manager.order_by('pk')
+            if organization_id is not None:
+                entries = entries.filter(organization_id=organization_id)
+                queryset = queryset.filter(**{organization_lookup: organization_id})
+            mentions.invalidate(set(entries.values_list('organization_id', flat=True)))
+            entries.delete()
+            batch = []
+            for instance in queryset.iterator(chunk_size=batch_size):
+                batch.append(instance)
+                if len(batch) >= batch_size:
+                    update_entries(model, batch)
+                    total, batch = total + len(batch), []
+            update_entries(model, batch)
+            total += len(batch)
+    return total
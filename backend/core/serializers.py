@@ -31,7 +31,7 @@ class NotificationSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Notification
-        fields = ('id', 'type', 'title', 'message', 'link', 'is_read', 'created_at', 'actor', 'actor_name')
+        fields = ('id', 'type', 'title', 'message', 'link', 'is_read', 'created_at', 'actor', 'actor_name', 'item_count')
         
     def get_actor_name(self, obj):
         if obj.actor:
@@ -44,3 +44,109 @@ class UserFcmTokenSerializer(serializers.ModelSerializer):
     class Meta:
         model = UserFcmToken
         fields = ('token', 'device_type')
+
+from django.db import models
+from django.utils.module_loading import import_string
+
+def _names(value):
+    return {name.strip() for name in (value or '').split(',') if name.strip()}
+
+class DynamicFieldsMixin:
+    """
+    Sparse fieldsets for the ModelSerializer answering a request, read from
+    its query parameters:
+    - ?fields=id,title: only these fields
+    - ?omit=content: every field but these
+    - ?expand=space,content: nests the relations of Meta.expandable_fields
+      ({name: serializer class, dotted path, or None for the related model's
+      columns}) and adds back the Meta.heavy_fields that lists leave out.
+
+    Nested serializers and serializers used without a request are untouched.
+    core.mixins.SparseFieldsMixin defers the large columns a response does
+    not serialize (SerializerMethodFields must not read them).
+    """
+
+    @property
+    def _root_of_request(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        return parent is None and self.context.get('request') is not None
+
+    @property
+    def _is_list(self):
+        return isinstance(self.parent, serializers.ListSerializer)
+
+    def _param(self, name):
+        if not self._root_of_request:
+            return set()
+        return _names(self.context['request'].query_params.get(name))
+
+    @property
+    def expanded(self):
+        """Names of ?expand= this serializer knows."""
+        known = set(getattr(self.Meta, 'expandable_fields', {})) | set(getattr(self.Meta, 'heavy_fields', ()))
+        return self._param('expand') & known
+
+    def _expanded_field(self, name, serializer_class):
+        model_field = self.Meta.model._meta.get_field(name)
+        many = model_field.one_to_many or model_field.many_to_many
+        if serializer_class is None:
+            related = model_field.related_model
+            class Brief(serializers.ModelSerializer):
+                class Meta:
+                    model = related
+                    fields = [
+                        field.name for field in related._meta.concrete_fields
+                        if not isinstance(field, (models.TextField, models.JSONField))
+                    ]
+            serializer_class = Brief
+        elif isinstance(serializer_class, str):
+            serializer_class = import_string(serializer_class)
+        return serializer_class(many=many, read_only=True)
+
+    def get_fields(self):
+        fields = super().get_fields()
+        if not self._root_of_request:
+            return fields
+
+        expanded = self.expanded
+        if self._is_list:
+            for name in getattr(self.Meta, 'heavy_fields', ()):
+                if name not in expanded and name not in self._param('fields'):
+                    fields.pop(name, None)
+        for name, serializer_class in getattr(self.Meta, 'expandable_fields', {}).items():
+            if name in expanded:
+                fields[name] = self._expanded_field(name, serializer_class)
+
+        only, omit = self._param('fields'), self._param('omit')
+        if only:
+            fields = {name: field for name, field in fields.items() if name in only or name in expanded}
+        for name in omit:
+            fields.pop(name, None)
+        return fields
+
+    def optimize_queryset(self, queryset):
+        """
+        Defers the text and JSON columns no field serializes, and joins the
+        expanded forward relations (many-valued ones are left to the view).
+        """
+        fields = self.fields
+        sources = {field.source.split('.')[0] for field in fields.values() if not isinstance(field, serializers.SerializerMethodField)}
+        if '*' in sources:
+            return queryset
+
+        model = self.Meta.model
+        deferred = [
+            field.name for field in model._meta.concrete_fields
+            if isinstance(field, (models.TextField, models.JSONField)) and field.name not in sources and not field.primary_key
+        ]
+        if deferred:
+            queryset = queryset.defer(*deferred)
+        joins = [
+            name for name in self.expanded
+            if name in getattr(self.Meta, 'expandable_fields', {}) and model._meta.get_field(name).many_to_one
+        ]
+        if joins:
+            queryset = queryset.select_related(*joins)
+        return queryset
@@ -1,75 +1,205 @@
-import firebase_admin
-from firebase_admin import credentials, messaging
 import os
+import time
+import logging
+import threading
 from django.conf import settings
+from django.core.cache import cache
+from core.lazy import LazyImport
 
-# Initialize Firebase app only once
-if not firebase_admin._apps:
-    try:
-        cred_path = os.path.join(settings.BASE_DIR, 'config', 'crm-perso.json')
-        cred = credentials.Certificate(cred_path)
-        firebase_admin.initialize_app(cred)
-    except Exception as e:
-        print(f"Failed to initialize Firebase Admin: {e}")
+logger = logging.getLogger(__name__)
 
-def send_push_notification(user, title, body, data=None):
+# firebase_admin is only imported, and the app initialized, for the first push
+firebase_admin = LazyImport('firebase_admin')
+messaging = LazyImport('firebase_admin.messaging')
+exceptions = LazyImport('firebase_admin.exceptions')
+_init_lock = threading.Lock()
+_init_failed = False # Initialization is attempted (and its error logged) once per process
+
+MULTICAST_LIMIT = 500 # FCM maximum tokens per multicast
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 1.0 # Seconds, doubled after each attempt
+TOKEN_CACHE_TIMEOUT = 300
+
+
+def get_app():
+    """Initializes the Firebase app only once, on first use. None if it cannot be."""
+    global _init_failed
+    with _init_lock:
+        if _init_failed:
+            return None
+        if not firebase_admin._apps:
+            try:
+                from firebase_admin import credentials
+                cred_path = os.path.join(settings.BASE_DIR, 'config', 'crm-perso.json')
+                firebase_admin.initialize_app(credentials.Certificate(cred_path))
+            except Exception as e:
+                _init_failed = True
+                logger.error(f"Failed to initialize Firebase Admin: {e}")
+                return None
+        return firebase_admin.get_app()
+
+def _pruned_errors():
+    # The token will never work again: delete it
+    return (messaging.UnregisteredError, messaging.SenderIdMismatchError)
+
+def _transient_errors():
+    # Worth another attempt for the same token
+    return (
+        exceptions.UnavailableError, exceptions.InternalError,
+        exceptions.DeadlineExceededError, messaging.QuotaExceededError
+    )
+
+
+# --- Token cache ---
+
+def _token_key(user_id):
+    return f"fcm:tokens:{user_id}"
+
+def get_tokens(user_ids):
+    """{user_id: [token, ...]} for the users, cached tokens first, the rest in one query."""
+    from core.models import UserFcmToken
+
+    user_ids = {str(user_id) for user_id in user_ids}
+    cached = cache.get_many([_token_key(user_id) for user_id in user_ids])
+    tokens = {user_id: cached[_token_key(user_id)] for user_id in user_ids if _token_key(user_id) in cached}
+
+    missing = user_ids - set(tokens)
+    if missing:
+        loaded = {user_id: [] for user_id in missing}
+        for user_id, token in UserFcmToken.objects.filter(user_id__in=missing).values_list('user_id', 'token'):
+            loaded[str(user_id)].append(token)
+        cache.set_many({_token_key(user_id): value for user_id, value in loaded.items()}, TOKEN_CACHE_TIMEOUT)
+        tokens.update(loaded)
+    return tokens
+
+def invalidate_tokens(*user_ids):
+    cache.delete_many([_token_key(user_id) for user_id in user_ids])
+
+
+# --- Sending ---
+
+def _absolute_link(link):
+    # Google Web Push requires an absolute HTTPS URL
+    if link.startswith('http'):
+        return link
+    # Try to get the production frontend URL or fallback
+    base_url = os.getenv('FRONTEND_URL')
+    if not base_url:
+        if getattr(settings, 'CORS_ALLOWED_ORIGINS', None):
+            base_url = settings.CORS_ALLOWED_ORIGINS[0]
+        else:
+            base_url = 'https://crm-perso.vercel.app'
+    return f"{base_url.rstrip('/')}{link}"
+
+def _is_pruned(exception):
+    if isinstance(exception, _pruned_errors()):
+        return True
+    # Legacy error code
+    return getattr(exception, 'code', None) == 'messaging/registration-token-not-registered'
+
+def send_multicast(tokens, title, body, data=None):
     """
-    Send push notification to all fcm tokens of a given user.
+    Sends one notification to the tokens, in multicasts of MULTICAST_LIMIT.
+    Transient failures are retried for the failed tokens only; dead tokens
+    are deleted in one query. Returns the number of successful sends, 0
+    without even trying when Firebase is not configured.
     """
-    if data is None:
-        data = {}
-        
-    tokens = list(user.fcm_tokens.values_list('token', flat=True))
-    if not tokens:
+    from core.models import UserFcmToken
+
+    if get_app() is None:
         return 0
-        
+
+    data = data or {}
     webpush_config = None
     if 'url' in data:
-        link = data['url']
-        # Google Web Push requires an absolute HTTPS URL
-        if not link.startswith('http'):
-            # Try to get the production frontend URL or fallback
-            base_url = os.getenv('FRONTEND_URL')
-            if not base_url:
-                if getattr(settings, 'CORS_ALLOWED_ORIGINS', None):
-                    base_url = settings.CORS_ALLOWED_ORIGINS[0]
-                else:
-                    base_url = 'https://crm-perso.vercel.app'
-            
-            link = f"{base_url.rstrip('/')}{link}"
-            
         webpush_config = messaging.WebpushConfig(
-            fcm_options=messaging.WebpushFCMOptions(
-                link=link
-            )
+            fcm_options=messaging.WebpushFCMOptions(link=_absolute_link(data['url']))
         )
-        
-    message = messaging.MulticastMessage(
-        notification=messaging.Notification(
-            title=title,
-            body=body,
-        ),
-        data=data,
-        webpush=webpush_config,
-        tokens=tokens,
-    )
-    
-    try:
-        response = messaging.send_each_for_multicast(message)
-        # Handle failed tokens (e.g., app uninstalled)
-        if response.failure_count > 0:
-            responses = response.responses
-            failed_tokens = []
-            for idx, resp in enumerate(responses):
-                if not resp.success:
-                    # Clean up unregistered tokens
-                    if resp.exception and hasattr(resp.exception, 'code') and resp.exception.code == 'messaging/registration-token-not-registered':
-                         failed_tokens.append(tokens[idx])
-            
-            if failed_tokens:
-                user.fcm_tokens.filter(token__in=failed_tokens).delete()
-                
-        return response.success_count
-    except Exception as e:
-        print(f"Error sending FCM notification: {e}")
-        return 0
+
+    transient_errors = _transient_errors()
+    sent = 0
+    dead_tokens = []
+    for start in range(0, len(tokens), MULTICAST_LIMIT):
+        pending = tokens[start:start + MULTICAST_LIMIT]
+        for attempt in range(MAX_ATTEMPTS):
+            if attempt:
+                time.sleep(RETRY_DELAY * 2 ** (attempt - 1))
+            message = messaging.MulticastMessage(
+                notification=messaging.Notification(title=title, body=body),
+                data=data,
+                webpush=webpush_config,
+                tokens=pending,
+            )
+            try:
+                response = messaging.send_each_for_multicast(message)
+            except Exception as e:
+                logger.warning(f"FCM multicast of {len(pending)} tokens failed (attempt {attempt + 1}): {e}")
+                continue
+
+            retry = []
+            for token, resp in zip(pending, response.responses):
+                if resp.success:
+                    sent += 1
+                elif _is_pruned(resp.exception):
+                    dead_tokens.append(token)
+                elif isinstance(resp.exception, transient_errors):
+                    retry.append(token)
+                else:
+                    logger.warning(f"FCM send failed: {resp.exception}")
+            pending = retry
+            if not pending:
+                break
+        if pending:
+            logger.error(f"FCM: gave up on {len(pending)} tokens after {MAX_ATTEMPTS} attempts")
+
+    if dead_tokens:
+        # Clean up unregistered tokens (e.g., app uninstalled)
+        owners = set(UserFcmToken.objects.filter(token__in=dead_tokens).values_list('user_id', flat=True))
+        UserFcmToken.objects.filter(token__in=dead_tokens).delete()
+        invalidate_tokens(*owners)
+    return sent
+
+
+class PushDispatcher:
+    """
+    Collects the pushes of an event and sends them together: tokens of
+    every recipient are loaded at once, and recipients of the same message
+    share multicasts.
+
+        push = PushDispatcher()
+        for member in members:
+            push.add(member, "Contrat signé", message, {'url': link})
+        push.send()
+    """
+
+    def __init__(self):
+        self._messages = {} # (title, body, data items) -> [user_id, ...]
+
+    def add(self, user, title, body, data=None):
+        key = (title, body, tuple(sorted((data or {}).items())))
+        self._messages.setdefault(key, []).append(str(getattr(user, 'pk', user)))
+
+    def add_many(self, users, title, body, data=None):
+        for user in users:
+            self.add(user, title, body, data)
+
+    def send(self):
+        if not self._messages:
+            return 0
+        tokens = get_tokens({user_id for user_ids in self._messages.values() for user_id in user_ids})
+        sent = 0
+        for (title, body, data), user_ids in self._messages.items():
+            recipients = list(dict.fromkeys(token for user_id in dict.fromkeys(user_ids) for token in tokens.get(user_id, [])))
+            if recipients:
+                sent += send_multicast(recipients, title, body, dict(data))
+        self._messages = {}
+        return sent
+
+
+def send_push_notification(user, title, body, data=None):
+    """
+    Send push notification to all fcm tokens of a given user.
+    """
+    push = PushDispatcher()
+    push.add(user, title, body, data)
+    return push.send()
@@ -0,0 +1,58 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from core import dashboard, memberships, notifications, outbox, realtime
+from core.models import Notification, NotificationCounter
+
+@realtime.broadcaster(Notification)
+def notification_messages(notifications):
+    """New notifications are pushed to their recipient's socket."""
+    from core.serializers import NotificationSerializer
+    data = NotificationSerializer(notifications, many=True).data
+    return [
+        (realtime.user_channel(notification.recipient_id), {'type': 'notification.created', 'notification': item})
+        for notification, item in zip(notifications, data)
+    ]
+
+@receiver(post_save, sender=Notification)
+def count_created_notification(sender, instance, created, **kwargs):
+    # bulk_create and mark_read maintain the counter themselves (NotificationQuerySet)
+    if created and not instance.is_read:
+        NotificationCounter.adjust({instance.recipient_id: 1})
+
+@receiver(post_delete, sender=Notification)
+def count_deleted_notification(sender, instance, **kwargs):
+    if not instance.is_read:
+        # No counter: the next read counts the rows (and the user may be being deleted)
+        NotificationCounter.adjust({instance.recipient_id: -1}, create_missing=False)
+
+@outbox.handler(notifications.DIGEST_PUSH_HANDLER, 'notification.digest_push')
+def digest_push(event):
+    # The events of a push window after its first push, sent when it closes
+    notifications.send_digest_push(event.payload)
+
+# --- Dashboard cache (core/dashboard.py): the sections built from these rows expire ---
+
+@receiver(post_save, sender='pages.Page')
+@receiver(post_delete, sender='pages.Page')
+@receiver(post_save, sender='crm.Contract')
+@receiver(post_delete, sender='crm.Contract')
+@receiver(post_save, sender='crm.Space')
+@receiver(post_delete, sender='crm.Space')
+def invalidate_organization_dashboard(sender, instance, **kwargs):
+    dashboard.invalidate(organization_ids=[instance.organization_id])
+
+@receiver(post_save, sender='tasks.Task')
+@receiver(post_delete, sender='tasks.Task')
+def invalidate_task_dashboards(sender, instance, **kwargs):
+    # "My tasks" of the assignee, and of the previous one on a reassignment
+    previous = (getattr(instance, '_loaded_values', None) or {}).get('assigned_to_id')
+    dashboard.invalidate(organization_ids=[instance.organization_id], user_ids=[instance.assigned_to_id, previous])
+
+# --- Space roles of the permission checks (core/memberships.py) ---
+
+@receiver(post_save, sender='crm.SpaceMember')
+@receiver(post_delete, sender='crm.SpaceMember')
+def invalidate_space_roles(sender, instance, **kwargs):
+    # The previous user too when the row moved to someone else
+    previous = (getattr(instance, '_loaded_values', None) or {}).get('user_id')
+    memberships.invalidate([instance.user_id, previous])
@@ -0,0 +1,29 @@
+"""Assertions shared by the test modules of the apps."""
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryCountMixin:
+    """
+    For TestCase classes with an authenticated self.client: a list endpoint
+    runs the same number of queries for 2 or 6 rows, so a serializer field
+    reading a relation the queryset does not load fails the test.
+    """
+
+    def count_queries(self, url, params=None):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params or {})
+        self.assertEqual(response.status_code, 200, url)
+        return len(queries)
+
+    def assertConstantQueries(self, urls, create, params=None):
+        """create() adds one row (and its relations) each time it is called."""
+        urls = [urls] if isinstance(urls, str) else urls
+        for _ in range(2):
+            create()
+        for url in urls:
+            self.count_queries(url, params) # Per-user caches are filled
+        few = [self.count_queries(url, params) for url in urls]
+        for _ in range(4):
+            create()
+        self.assertEqual([self.count_queries(url, params) for url in urls], few, urls)
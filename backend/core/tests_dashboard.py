@@ -0,0 +1,69 @@
+import datetime
+from unittest.mock import patch
+from decimal import Decimal
+from django.test import TestCase
+from django.utils import timezone
+from django.core.cache import cache
+from rest_framework.test import APIClient
+from core.models import User, Organization
+from crm.models import Space, Contract
+from tasks.models import Task
+
+
+class DashboardCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.org = Organization.objects.create(name="Org Dashboard")
+        self.user = User.objects.create_user(username='dash', email='dash@test.com', password='pw', organization=self.org)
+        self.other = User.objects.create_user(username='dash2', email='dash2@test.com', password='pw', organization=self.org)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_sections_are_cached_until_a_change(self):
+        first = self.client.get('/api/dashboard/')
+        etag = first['ETag']
+        with self.assertNumQueries(0):
+            second = self.client.get('/api/dashboard/')
+            not_modified = self.client.get('/api/dashboard/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(not_modified.status_code, 304)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(title="Urgent", priority='high', organization=self.org, assigned_to=self.user)
+        changed = self.client.get('/api/dashboard/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, 200)
+        self.assertNotEqual(changed['ETag'], etag)
+        self.assertEqual([task['title'] for task in changed.data['my_tasks']], ["Urgent"])
+        self.assertEqual([task['title'] for task in changed.data['urgent_tasks']], ["Urgent"])
+
+    def test_user_sections_are_per_user(self):
+        other_client = APIClient()
+        other_client.force_authenticate(self.other)
+        other_client.get('/api/dashboard/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            task = Task.objects.create(title="Pour moi", organization=self.org, assigned_to=self.user)
+        self.assertEqual(other_client.get('/api/dashboard/').data['my_tasks'], [])
+        self.assertEqual(len(self.client.get('/api/dashboard/').data['my_tasks']), 1)
+
+        # A reassignment expires the sections of both assignees
+        with self.captureOnCommitCallbacks(execute=True):
+            task.assigned_to = self.other
+            task.save()
+        self.assertEqual(self.client.get('/api/dashboard/').data['my_tasks'], [])
+        self.assertEqual(len(other_client.get('/api/dashboard/').data['my_tasks']), 1)
+
+    def test_sections_expire_at_a_month_boundary(self):
+        space = Space.objects.create(name="Espace", organization=self.org)
+        with self.captureOnCommitCallbacks(execute=True):
+            Contract.objects.create(title="C", space=space, organization=self.org, status='signed', amount=Decimal('100'))
+        first = self.client.get('/api/dashboard/')
+        self.assertEqual(len(first.data['analytics']['revenue']), 1)
+
+        # Seven months later, without any save, the contract left the chart
+        later = timezone.now() + datetime.timedelta(days=215)
+        with patch('django.utils.timezone.now', return_value=later):
+            response = self.client.get('/api/dashboard/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertEqual(response.data['analytics']['revenue'], [])
@@ -0,0 +1,106 @@
+from datetime import timedelta
+from unittest.mock import patch
+from django.test import TestCase
+from django.utils import timezone
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from crum import impersonate
+from rest_framework.test import APIClient
+from core.models import User, Organization, Notification, NotificationCounter, OutboxEvent
+from core import notifications, outbox
+from crm.models import Space, Contract, SpaceMember
+
+
+class NotificationDigestTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.org = Organization.objects.create(name="Org Digest")
+        self.user = User.objects.create_user(username='digest', email='digest@test.com', password='pw', organization=self.org)
+
+    def _assignments(self, count, start=0):
+        return [
+            Notification(recipient=self.user, type='task_assigned', title=f"Nouvelle tâche assignée: T{i}", link='/tasks')
+            for i in range(start, start + count)
+        ]
+
+    def test_events_of_a_window_fold_into_one_digest(self):
+        with CaptureQueriesContext(connection) as queries:
+            notifications.notify(self._assignments(100))
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "core_notification"')]
+        self.assertEqual(len(inserts), 1)
+        digest = Notification.objects.get()
+        self.assertEqual((digest.item_count, digest.title), (100, "100 tâches vous ont été assignées"))
+        self.assertEqual(digest.message, "T99, T98, T97 et 97 autres")
+
+        notifications.notify(self._assignments(2, start=100))
+        digest.refresh_from_db()
+        self.assertEqual(Notification.objects.count(), 1)
+        self.assertEqual(digest.item_count, 102)
+        self.assertEqual(len(digest.items), notifications.MAX_ITEMS)
+        self.assertEqual(NotificationCounter.get_unread(self.user.id), 1)
+
+        # Read digests are closed: the next event starts a new one
+        Notification.objects.mark_read(self.user)
+        notifications.notify(self._assignments(1, start=200))
+        self.assertEqual(Notification.objects.count(), 2)
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        items = client.get(f'/api/notifications/{digest.id}/items/').data
+        self.assertEqual(items[0]['title'], "Nouvelle tâche assignée: T101")
+
+    def test_types_without_window_are_not_coalesced(self):
+        notifications.notify([Notification(recipient=self.user, type='mention', title=f"M{i}") for i in range(3)])
+        self.assertEqual(Notification.objects.filter(type='mention').count(), 3)
+
+    def test_one_push_per_recipient_and_window(self):
+        entries = [(self.user.id, 'task_assigned', f"Nouvelle tâche assignée: T{i}", "msg", {'url': '/tasks'}) for i in range(3)]
+        with patch('core.services.fcm.PushDispatcher.add') as mock_add, patch('core.services.fcm.PushDispatcher.send'):
+            notifications.dispatch_pushes(entries)
+            notifications.dispatch_pushes(entries[:1])
+        mock_add.assert_called_once_with(self.user.id, "3 tâches vous ont été assignées", "T0, T1, T2", {'url': '/tasks'})
+
+    def test_pushes_held_by_the_window_are_sent_when_it_closes(self):
+        entry = lambda i: (self.user.id, 'task_assigned', f"Nouvelle tâche assignée: T{i}", "msg", {'url': '/tasks'})
+        with patch('core.services.fcm.PushDispatcher.add') as mock_add, patch('core.services.fcm.PushDispatcher.send'):
+            notifications.dispatch_pushes([entry(0)])
+            # Two later bursts inside the window: one trailing push for both
+            notifications.dispatch_pushes([entry(1)])
+            notifications.dispatch_pushes([entry(2), entry(3)])
+            self.assertEqual(mock_add.call_count, 1)
+            self.assertEqual(OutboxEvent.objects.filter(handler=notifications.DIGEST_PUSH_HANDLER).count(), 1)
+
+            # Not due before the window closes
+            self.assertEqual(outbox.dispatch(handler=notifications.DIGEST_PUSH_HANDLER), 0)
+            later = timezone.now() + timedelta(seconds=notifications.get_window('task_assigned') + 1)
+            with patch('django.utils.timezone.now', return_value=later):
+                self.assertEqual(outbox.dispatch(handler=notifications.DIGEST_PUSH_HANDLER), 1)
+        mock_add.assert_called_with(str(self.user.id), "3 tâches vous ont été assignées", "T1, T2, T3", {'url': '/tasks'})
+
+    def test_signed_contracts_keep_their_title_and_digest_their_names(self):
+        member = User.objects.create_user(username='member', email='member@test.com', password='pw', organization=self.org)
+        space = Space.objects.create(name="Acme", organization=self.org)
+        SpaceMember.objects.create(space=space, user=member, role='editor')
+        contracts = [Contract.objects.create(title=f"Contrat {name}", space=space, organization=self.org) for name in "AB"]
+
+        with impersonate(self.user), self.settings(OUTBOX_CONF={'MODE': 'sync'}), \
+             patch('ai_assistant.signals.VectorStore.add_texts'), \
+             patch('core.services.fcm.PushDispatcher.add') as mock_add, patch('core.services.fcm.PushDispatcher.send'):
+            for contract in contracts:
+                with self.captureOnCommitCallbacks(execute=True):
+                    contract.status = 'signed'
+                    contract.save()
+                if contract is contracts[0]:
+                    notification = Notification.objects.get(recipient=member)
+                    self.assertEqual((notification.title, notification.message), ("Contrat signé", "Le contrat 'Contrat A' a été signé."))
+
+            digest = Notification.objects.get(recipient=member)
+            self.assertEqual((digest.title, digest.message), ("2 contrats ont été signés", "Contrat B, Contrat A"))
+            mock_add.assert_called_once_with(member.id, "Contrat signé", "Le contrat 'Contrat A' a été signé.", mock_add.call_args[0][3])
+
+            # The second signing waits for the end of the push window
+            later = timezone.now() + timedelta(seconds=notifications.get_window('contract_signed') + 1)
+            with patch('django.utils.timezone.now', return_value=later):
+                outbox.dispatch(handler=notifications.DIGEST_PUSH_HANDLER)
+        self.assertEqual(mock_add.call_args[0][1:3], ("Contrat signé", "Le contrat 'Contrat B' a été signé."))
@@ -0,0 +1,23 @@
+import sys
+import subprocess
+from django.test import TestCase
+from core.lazy import LazyImport
+
+
+class LazyImportTest(TestCase):
+    def test_module_is_imported_on_first_use(self):
+        sys.modules.pop('colorsys', None)
+        colorsys = LazyImport('colorsys')
+        self.assertNotIn('colorsys', sys.modules)
+        self.assertEqual(colorsys.rgb_to_hsv(0, 0, 0), (0, 0, 0.0))
+        self.assertIn('colorsys', sys.modules)
+
+    def test_missing_optional_module_is_falsy(self):
+        self.assertFalse(LazyImport('not_an_installed_sdk'))
+        self.assertTrue(LazyImport('json', 'dumps'))
+
+    def test_startup_does_not_import_heavy_sdks(self):
+        heavy = ['chromadb', 'firebase_admin', 'openai', 'google.generativeai', 'googleapiclient', 'pypdf']
+        code = f"import sys, django; django.setup(); print([m for m in {heavy!r} if m in sys.modules])"
+        result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+        self.assertEqual(result.stdout.strip().splitlines()[-1], '[]', result.stderr)
@@ -0,0 +1,86 @@
+import time
+from unittest.mock import patch
+from django.test import TestCase
+from django.core.cache import cache
+from rest_framework.test import APIClient
+from core.models import User, Organization, SearchEntry
+from core import search, mentions
+from crm.models import Contact
+from tasks.models import Task
+from pages.models import Page
+
+
+class MentionIndexTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        mentions.clear()
+        self.org = Organization.objects.create(name="Org Mentions")
+        self.user = User.objects.create_user(username='mention', email='mention@test.com', password='pw', organization=self.org)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.page = Page.objects.create(title="Compte rendu", organization=self.org)
+            Contact.objects.create(first_name="Céline", last_name="Comte", organization=self.org)
+            Task.objects.create(title="Compter les stocks", organization=self.org)
+
+    def labels(self, query):
+        return [mention['label'] for mention in self.client.get('/api/search/mentions/', {'q': query}).data]
+
+    def test_keystrokes_are_served_from_memory(self):
+        # Titles starting with the query first
+        self.assertEqual(self.labels("com"), ["Compte rendu", "Compter les stocks", "Céline Comte"])
+        queries = ["c", "ce", "cel", "celi", "CÉLINE co", "stock"]
+        expected = [
+            [{key: entry[key] for key in ('type', 'id', 'title', 'url')} for entry in search.search(self.org.id, query, types=mentions.TYPES)]
+            for query in queries
+        ]
+        with self.assertNumQueries(0):
+            self.assertEqual([mentions.lookup(self.org.id, query) for query in queries], expected)
+        self.assertEqual(self.labels("celine"), ["Céline Comte"])
+
+    def test_index_of_another_worker_expires(self):
+        mentions.lookup(self.org.id, "com")
+        # Deleted by another worker: neither the entries nor the generation of this one changed
+        SearchEntry.objects.filter(entity_type='page', entity_id=str(self.page.id)).delete()
+        self.assertIn("Compte rendu", [mention['title'] for mention in mentions.lookup(self.org.id, "compte")])
+        with patch('core.mentions.time.monotonic', return_value=time.monotonic() + mentions.MAX_AGE):
+            self.assertEqual([mention['title'] for mention in mentions.lookup(self.org.id, "compte")], ["Compter les stocks"])
+
+    def test_changes_are_applied_in_place(self):
+        mentions.lookup(self.org.id, "com")
+        with self.captureOnCommitCallbacks(execute=True):
+            Page.objects.create(title="Compta 2026", organization=self.org)
+            self.page.title = "Procès-verbal"
+            self.page.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(
+                [mention['title'] for mention in mentions.lookup(self.org.id, "comp")],
+                ["Compta 2026", "Compter les stocks"]
+            )
+            self.assertEqual([mention['title'] for mention in mentions.lookup(self.org.id, "proces")], ["Procès-verbal"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.page.delete()
+        self.assertEqual(mentions.lookup(self.org.id, "proces"), [])
+
+    def test_changes_of_other_workers_rebuild_the_index(self):
+        mentions.lookup(self.org.id, "com")
+        # Another worker saved an entry: only the generation changed here
+        cache.incr(mentions._generation_key(self.org.id))
+        Page.objects.create(title="Compta", organization=self.org)
+        with self.assertNumQueries(1):
+            self.assertIn("Compta", [mention['title'] for mention in mentions.lookup(self.org.id, "compta")])
+
+    def test_least_recently_used_organizations_are_evicted(self):
+        other = Organization.objects.create(name="Other")
+        with self.captureOnCommitCallbacks(execute=True):
+            Page.objects.create(title="Compta", organization=other)
+        with patch.object(mentions, 'MAX_ENTRIES', 4):
+            mentions.lookup(self.org.id, "com") # 3 entries
+            mentions.lookup(other.id, "com") # 1 more
+            self.assertEqual(list(mentions._indexes), [self.org.id, other.id])
+            with self.captureOnCommitCallbacks(execute=True):
+                Task.objects.create(title="Commande", organization=self.org)
+            mentions.lookup(self.org.id, "com")
+            mentions.lookup(other.id, "com") # Over the budget: the least recently used goes
+            self.assertEqual(list(mentions._indexes), [other.id])
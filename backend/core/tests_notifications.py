@@ -0,0 +1,69 @@
+from datetime import timedelta
+from io import StringIO
+from django.test import TestCase
+from django.utils import timezone
+from django.core.management import call_command
+from rest_framework.test import APIClient
+from core.models import User, Organization, Notification, NotificationCounter, ArchivedNotification
+
+
+class NotificationReadStateTest(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="Org Unread")
+        self.user = User.objects.create_user(username='unread', email='unread@test.com', password='pw', organization=self.org)
+        self.other = User.objects.create_user(username='other-unread', email='ou@test.com', password='pw', organization=self.org)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _notifications(self, count, user=None):
+        return Notification.objects.bulk_create([
+            Notification(recipient=user or self.user, type='system', title=f"N{i}") for i in range(count)
+        ])
+
+    def test_counter_is_maintained_on_create_read_and_delete(self):
+        notifications = self._notifications(3)
+        Notification.objects.create(recipient=self.user, type='system', title="Seule")
+        with self.assertNumQueries(1):
+            self.assertEqual(NotificationCounter.get_unread(self.user.id), 4)
+
+        with self.assertNumQueries(2): # One UPDATE of the rows, one of the counter
+            self.assertEqual(Notification.objects.mark_read(self.user, ids=[n.id for n in notifications[:2]]), 2)
+        # Already read: nothing changes
+        self.assertEqual(Notification.objects.mark_read(self.user, ids=[notifications[0].id]), 0)
+        notifications[2].delete()
+        self.assertEqual(NotificationCounter.get_unread(self.user.id), 1)
+
+    def test_counter_starts_from_existing_rows(self):
+        self._notifications(2)
+        NotificationCounter.objects.all().delete()
+        self.assertEqual(NotificationCounter.get_unread(self.user.id), 2)
+
+    def test_batch_mark_read_by_ids_and_cursor(self):
+        old, middle, recent = self._notifications(3)
+        Notification.objects.filter(pk=old.pk).update(created_at=timezone.now() - timedelta(days=2))
+        Notification.objects.filter(pk=middle.pk).update(created_at=timezone.now() - timedelta(days=1))
+        foreign = self._notifications(1, user=self.other)[0]
+
+        response = self.client.post('/api/notifications/mark_read/', {'before_id': str(middle.id)}, format='json')
+        self.assertEqual(response.data['updated'], 2)
+        response = self.client.post('/api/notifications/mark_read/', {'ids': [str(recent.id), str(foreign.id)]}, format='json')
+        self.assertEqual(response.data['updated'], 1)
+
+        self.assertEqual(self.client.get('/api/notifications/unread_count/').data, {'unread_count': 0})
+        self.assertFalse(Notification.objects.get(pk=foreign.pk).is_read)
+        self.assertEqual(NotificationCounter.get_unread(self.other.id), 1)
+
+        self.assertEqual(self.client.post(f'/api/notifications/{foreign.id}/mark_read/').status_code, 404)
+        self.assertEqual(self.client.post('/api/notifications/mark_read/', {'ids': ['nope']}, format='json').status_code, 400)
+
+    def test_archive_moves_old_read_notifications(self):
+        old_read, old_unread, recent_read = self._notifications(3)
+        Notification.objects.filter(pk__in=[old_read.pk, old_unread.pk]).update(created_at=timezone.now() - timedelta(days=120))
+        Notification.objects.mark_read(self.user, ids=[old_read.pk, recent_read.pk])
+
+        call_command('archive_notifications', days=90, batch=1, stdout=StringIO())
+
+        self.assertEqual(set(Notification.objects.values_list('id', flat=True)), {old_unread.id, recent_read.id})
+        archived = ArchivedNotification.objects.get()
+        self.assertEqual((archived.id, archived.title, archived.recipient), (old_read.id, old_read.title, self.user))
+        self.assertEqual(NotificationCounter.get_unread(self.user.id), 1)
@@ -0,0 +1,117 @@
+from unittest.mock import patch
+from datetime import timedelta
+from io import StringIO
+from django.test import TestCase
+from django.utils import timezone
+from django.core.management import call_command
+from crum import get_current_user, impersonate
+from core.models import User, Organization, OutboxEvent
+from core import outbox
+from crm.models import Space, Meeting, ActivityLog
+
+
+class OutboxTest(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="Org Outbox")
+        self.user = User.objects.create_user(username='outbox', email='outbox@test.com', password='pw', organization=self.org)
+        self.space = Space.objects.create(name="Acme", organization=self.org)
+        self.calls = []
+        outbox._handlers['tests.flaky'] = {'func': self._flaky, 'events': {'test.ping'}}
+        self.addCleanup(outbox._handlers.pop, 'tests.flaky')
+
+    def _flaky(self, event):
+        self.calls.append((event.payload, get_current_user()))
+        if event.payload.get('fail'):
+            raise RuntimeError("provider down")
+
+    def test_save_only_records_events(self):
+        with impersonate(self.user), \
+             patch('crm.signals.GoogleCalendarService.create_event') as mock_google, \
+             patch('ai_assistant.signals.VectorStore.add_texts') as mock_index:
+            meeting = Meeting.objects.create(title="Kickoff", space=self.space, organization=self.org, created_by=self.user)
+
+        # Nothing ran inside the transaction
+        mock_google.assert_not_called()
+        mock_index.assert_not_called()
+        self.assertFalse(ActivityLog.objects.filter(entity_type='Réunion').exists())
+
+        handlers = set(OutboxEvent.objects.filter(event_type='meeting.created').values_list('handler', flat=True))
+        self.assertTrue({'crm.google_calendar', 'crm.meeting_activity', 'ai.vector_index', 'automation.trigger'} <= handlers)
+        event = OutboxEvent.objects.filter(event_type='meeting.created').first()
+        self.assertEqual(event.payload['id'], str(meeting.id))
+        self.assertEqual(event.actor, self.user)
+
+    def test_events_are_delivered_after_commit(self):
+        with impersonate(self.user), \
+             patch('crm.signals.GoogleCalendarService.create_event') as mock_google, \
+             patch('ai_assistant.signals.VectorStore.add_texts') as mock_index, \
+             self.settings(OUTBOX_CONF={'MODE': 'sync'}), \
+             self.captureOnCommitCallbacks(execute=True):
+            Meeting.objects.create(title="Kickoff", space=self.space, organization=self.org, created_by=self.user)
+            mock_google.assert_not_called()
+
+        mock_google.assert_called_once()
+        mock_index.assert_called()
+        log = ActivityLog.objects.get(entity_type='Réunion')
+        self.assertEqual(log.actor, self.user)
+        self.assertFalse(OutboxEvent.objects.exclude(status='done').exists())
+
+    def test_failed_delivery_is_retried_then_dead_lettered(self):
+        with self.settings(OUTBOX_CONF={'MODE': 'worker', 'MAX_ATTEMPTS': 2, 'RETRY_DELAY': 60}):
+            with impersonate(self.user):
+                event = outbox.publish('test.ping', {'fail': True})[0]
+
+            self.assertEqual(outbox.dispatch(handler='tests.flaky'), 1)
+            event.refresh_from_db()
+            self.assertEqual((event.status, event.attempts), ('pending', 1))
+            self.assertIn("provider down", event.last_error)
+            self.assertGreater(event.available_at, timezone.now())
+            self.assertEqual(self.calls[0][1], self.user)
+
+            # Not due yet
+            self.assertEqual(outbox.dispatch(handler='tests.flaky'), 0)
+
+            OutboxEvent.objects.filter(pk=event.pk).update(available_at=timezone.now())
+            outbox.dispatch(handler='tests.flaky')
+            event.refresh_from_db()
+            self.assertEqual((event.status, event.attempts), ('dead', 2))
+
+            outbox.requeue(OutboxEvent.objects.filter(pk=event.pk))
+            OutboxEvent.objects.filter(pk=event.pk).update(payload={})
+            outbox.dispatch(handler='tests.flaky')
+            event.refresh_from_db()
+            self.assertEqual(event.status, 'done')
+
+    def test_handler_writes_roll_back_on_failure(self):
+        def failing(event):
+            ActivityLog.objects.create(space=self.space, action='created', entity_type='Test', entity_name='x')
+            raise RuntimeError("boom")
+
+        outbox._handlers['tests.rollback'] = {'func': failing, 'events': {'test.rollback'}}
+        self.addCleanup(outbox._handlers.pop, 'tests.rollback')
+
+        with self.settings(OUTBOX_CONF={'MODE': 'worker'}):
+            outbox.publish('test.rollback')
+            outbox.dispatch(handler='tests.rollback')
+
+        self.assertFalse(ActivityLog.objects.filter(entity_type='Test').exists())
+        self.assertEqual(OutboxEvent.objects.get(handler='tests.rollback').status, 'pending')
+
+    def test_claimed_event_is_not_delivered_twice(self):
+        with self.settings(OUTBOX_CONF={'MODE': 'worker'}):
+            event = outbox.publish('test.ping', {})[0]
+            OutboxEvent.objects.filter(pk=event.pk).update(status='processing', locked_at=timezone.now())
+            self.assertEqual(outbox.dispatch(handler='tests.flaky'), 0)
+            self.assertEqual(self.calls, [])
+
+    def test_purge_deletes_old_delivered_events(self):
+        with self.settings(OUTBOX_CONF={'MODE': 'worker'}):
+            old, recent, dead = (outbox.publish('test.ping', {'n': i})[0] for i in range(3))
+        OutboxEvent.objects.filter(pk=old.pk).update(status='done', processed_at=timezone.now() - timedelta(days=10))
+        OutboxEvent.objects.filter(pk=recent.pk).update(status='done', processed_at=timezone.now() - timedelta(days=1))
+        OutboxEvent.objects.filter(pk=dead.pk).update(status='dead', processed_at=timezone.now() - timedelta(days=10))
+
+        out = StringIO()
+        call_command('run_outbox', '--purge-done', '--days', '7', '--once', stdout=out)
+        self.assertIn("Purged 1 delivered events.", out.getvalue())
+        self.assertEqual(set(OutboxEvent.objects.filter(handler='tests.flaky').values_list('id', flat=True)), {recent.id, dead.id})
@@ -0,0 +1,95 @@
+import json
+import base64
+from datetime import timedelta
+from urllib.parse import urlparse
+from django.test import TestCase
+from django.utils import timezone
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from core.models import User, Organization, Notification
+from ai_assistant.models import Conversation, Message
+
+
+class KeysetPaginationTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.org = Organization.objects.create(name="Org Cursors")
+        self.user = User.objects.create_user(username='cursors', email='cursors@test.com', password='pw', organization=self.org)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        now = timezone.now()
+        self.notifications = Notification.objects.bulk_create([
+            Notification(recipient=self.user, type='system', title=f"N{i}") for i in range(23)
+        ])
+        # Groups of 5 share their created_at: ties are broken by the id
+        for i, notification in enumerate(self.notifications):
+            Notification.objects.filter(pk=notification.pk).update(created_at=now - timedelta(minutes=i // 5))
+        self.expected = [
+            str(pk) for pk in Notification.objects.filter(recipient=self.user).order_by('-created_at', '-id').values_list('id', flat=True)
+        ]
+
+    def get(self, url, params=None):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def follow(self, link):
+        link = urlparse(link)
+        return self.get(f"{link.path}?{link.query}")
+
+    def test_walk_forward_and_back(self):
+        page = self.get('/api/notifications/', {'page_size': 4})
+        self.assertNotIn('count', page)
+        self.assertIsNone(page['previous'])
+        pages = [[item['id'] for item in page['results']]]
+        while page['next']:
+            page = self.follow(page['next'])
+            pages.append([item['id'] for item in page['results']])
+        self.assertEqual([pk for ids in pages for pk in ids], self.expected)
+        self.assertEqual(len(pages[-1]), 3)
+
+        back = [[item['id'] for item in page['results']]]
+        while page['previous']:
+            page = self.follow(page['previous'])
+            back.append([item['id'] for item in page['results']])
+        self.assertEqual(back[::-1], pages)
+
+    def test_new_rows_do_not_shift_the_pages(self):
+        first = self.get('/api/notifications/', {'page_size': 5})
+        Notification.objects.create(recipient=self.user, type='system', title="Nouvelle")
+        second = self.follow(first['next'])
+        self.assertEqual([item['id'] for item in second['results']], self.expected[5:10])
+
+    def test_deep_pages_cost_the_same(self):
+        def queries(link):
+            with CaptureQueriesContext(connection) as captured:
+                page = self.follow(link) if link.startswith('http') else self.get(link)
+            self.assertFalse([query for query in captured.captured_queries if 'COUNT(' in query['sql'].upper()])
+            self.assertFalse([query for query in captured.captured_queries if 'OFFSET' in query['sql'].upper()])
+            return len(captured), page
+
+        first, page = queries('/api/notifications/?page_size=2')
+        while page['next']:
+            count, page = queries(page['next'])
+            self.assertEqual(count, first)
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get('/api/notifications/', {'cursor': 'pas-un-curseur'}).status_code, 404)
+        for values in (["pas une date", self.expected[0]], [timezone.now().isoformat(), "pas un uuid"], [None, self.expected[0]], [[], {}]):
+            cursor = base64.urlsafe_b64encode(json.dumps([values, False]).encode()).decode('ascii')
+            self.assertEqual(self.client.get('/api/notifications/', {'cursor': cursor}).status_code, 404, values)
+
+    def test_conversation_history(self):
+        conversations = [Conversation.objects.create(user=self.user, title=f"C{i}") for i in range(3)]
+        for i in range(5):
+            Message.objects.create(conversation=conversations[0], role='user', content=f"M{i}")
+        history = self.get('/api/ai/history/', {'page_size': 2})
+        self.assertEqual([item['title'] for item in history['results']], ["C2", "C1"])
+        self.assertEqual([item['title'] for item in self.follow(history['next'])['results']], ["C0"])
+
+        # Latest messages first, each page in chronological order
+        detail = self.get(f'/api/ai/history/{conversations[0].id}/', {'page_size': 3})
+        self.assertEqual([item['content'] for item in detail['results']], ["M2", "M3", "M4"])
+        self.assertEqual([item['content'] for item in self.follow(detail['next'])['results']], ["M0", "M1"])
@@ -0,0 +1,75 @@
+from unittest.mock import patch
+from django.test import TestCase
+from django.core.cache import cache
+from rest_framework.test import APIClient, APIRequestFactory, force_authenticate
+from rest_framework.request import Request
+from core.models import User, Organization
+from core import memberships
+from crm.models import Space, ActivityLog, Contract, SpaceMember
+from core.permissions import SpaceRolePermission
+
+
+class SpaceRolePermissionTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.org = Organization.objects.create(name="Org Roles")
+        self.user = User.objects.create_user(username='roles', email='roles@test.com', password='pw', organization=self.org)
+        self.space = Space.objects.create(name="Roles", organization=self.org)
+        self.other_space = Space.objects.create(name="Private", organization=self.org)
+        self.member = SpaceMember.objects.create(space=self.space, user=self.user, role='editor')
+        self.contracts = [Contract.objects.create(title=f"C{i}", space=self.space, organization=self.org) for i in range(3)]
+        self.private = Contract.objects.create(title="Private", space=self.other_space, organization=self.org)
+
+    def request(self, method='get'):
+        request = getattr(APIRequestFactory(), method)('/api/crm/contracts/')
+        force_authenticate(request, self.user)
+        return Request(request)
+
+    def check(self, request, obj):
+        return SpaceRolePermission().has_object_permission(request, None, obj)
+
+    def test_roles_are_loaded_once(self):
+        request = self.request()
+        with self.assertNumQueries(1):
+            self.assertEqual([self.check(request, contract) for contract in self.contracts], [True, True, True])
+            self.assertFalse(self.check(request, self.private)) # obj.space is not loaded either
+        # Next requests load them again: no cross-request cache by default
+        with self.assertNumQueries(1):
+            self.assertFalse(self.check(self.request('delete'), self.contracts[0]))
+
+    def test_cross_request_cache_is_opt_in(self):
+        with patch.object(memberships, 'CACHE_TIMEOUT', 60):
+            self.check(self.request(), self.contracts[0])
+            # Next requests of the user read the cache
+            with self.assertNumQueries(0):
+                self.assertFalse(self.check(self.request('delete'), self.contracts[0]))
+                self.assertTrue(self.check(self.request('patch'), self.contracts[0]))
+                self.assertTrue(self.check(self.request(), self.space))
+
+            # Moving the row to another user drops the cached roles of the previous one
+            other = User.objects.create_user(username='roles2', email='roles2@test.com', password='pw', organization=self.org)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.member.user = other
+                self.member.save()
+            self.assertFalse(self.check(self.request(), self.contracts[0]))
+
+    def test_membership_changes_apply_to_the_next_check(self):
+        request = self.request('delete')
+        self.assertFalse(self.check(request, self.contracts[0]))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.member.role = 'admin'
+            self.member.save()
+        self.assertTrue(self.check(self.request('delete'), self.contracts[0]))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.member.delete()
+        self.assertFalse(self.check(self.request(), self.contracts[0]))
+
+    def test_activity_log_requires_admin_role(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        ActivityLog.objects.create(space=self.space, actor=self.user, action='created', entity_type='Contrat', entity_name="C0")
+        self.assertEqual(client.get('/api/crm/activities/', {'space': str(self.space.id)}).data['results'], [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.member.role = 'admin'
+            self.member.save()
+        self.assertEqual(len(client.get('/api/crm/activities/', {'space': str(self.space.id)}).data['results']), 1)
@@ -0,0 +1,88 @@
+from unittest.mock import patch
+from django.test import TestCase
+from django.core.cache import cache
+from firebase_admin import messaging
+from core.models import User, Organization, UserFcmToken
+from core.services import fcm
+
+
+class PushDispatcherTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.org = Organization.objects.create(name="Org Push")
+        self.users = User.objects.bulk_create([
+            User(username=f'push{i}', email=f'push{i}@test.com', organization=self.org)
+            for i in range(200)
+        ])
+        UserFcmToken.objects.bulk_create([
+            UserFcmToken(user=user, token=f'token-{i}-{device}')
+            for i, user in enumerate(self.users) for device in range(3)
+        ])
+        # No Firebase credentials in the tests: the sends themselves are patched
+        app = patch('core.services.fcm.get_app', return_value=object())
+        self.get_app = app.start()
+        self.addCleanup(app.stop)
+
+    @staticmethod
+    def _response(results):
+        return messaging.BatchResponse([messaging.SendResponse({'name': 'ok'} if error is None else None, error) for error in results])
+
+    def test_recipients_share_multicasts_of_500(self):
+        calls = []
+
+        def send(message):
+            calls.append(len(message.tokens))
+            return self._response([None] * len(message.tokens))
+
+        push = fcm.PushDispatcher()
+        push.add_many(self.users, "Contrat signé", "Le contrat 'X' a été signé.", {'url': '/crm'})
+        with patch('firebase_admin.messaging.send_each_for_multicast', side_effect=send), \
+             self.assertNumQueries(1):
+            self.assertEqual(push.send(), 600)
+        self.assertEqual(calls, [500, 100])
+
+        # Tokens are cached for the next event
+        with patch('firebase_admin.messaging.send_each_for_multicast', side_effect=send), \
+             self.assertNumQueries(0):
+            fcm.send_push_notification(self.users[0], "Titre", "Message")
+
+    def test_dead_tokens_are_pruned_and_transient_failures_retried(self):
+        user = self.users[0]
+        attempts = []
+
+        errors = {'token-0-1': messaging.UnregisteredError('gone'), 'token-0-2': messaging.QuotaExceededError('later')}
+
+        def send(message):
+            attempts.append(list(message.tokens))
+            if len(attempts) == 1:
+                return self._response([errors.get(token) for token in message.tokens])
+            return self._response([None] * len(message.tokens))
+
+        with patch('firebase_admin.messaging.send_each_for_multicast', side_effect=send), \
+             patch('core.services.fcm.time.sleep'):
+            self.assertEqual(fcm.send_push_notification(user, "Titre", "Message"), 2)
+
+        self.assertEqual(attempts[1], ['token-0-2'])
+        self.assertEqual(set(user.fcm_tokens.values_list('token', flat=True)), {'token-0-0', 'token-0-2'})
+        # The pruned token left the cache too
+        self.assertEqual(set(fcm.get_tokens([user.id])[str(user.id)]), {'token-0-0', 'token-0-2'})
+
+    def test_nothing_is_attempted_without_firebase(self):
+        self.get_app.return_value = None
+        with patch('firebase_admin.messaging.send_each_for_multicast') as send, \
+             patch('core.services.fcm.time.sleep') as sleep:
+            self.assertEqual(fcm.send_push_notification(self.users[0], "Titre", "Message"), 0)
+        send.assert_not_called()
+        sleep.assert_not_called()
+
+
+class FirebaseInitTest(TestCase):
+    def test_failed_initialization_is_attempted_once(self):
+        with patch.object(fcm, '_init_failed', False), patch.dict('firebase_admin._apps', clear=True), \
+             patch('firebase_admin.credentials.Certificate', side_effect=IOError("crm-perso.json not found")) as certificate, \
+             self.assertLogs('core.services.fcm', 'ERROR') as logged:
+            self.assertIsNone(fcm.get_app())
+            self.assertIsNone(fcm.get_app())
+            self.assertEqual(fcm.send_multicast(['token'], "Titre", "Message"), 0)
+        certificate.assert_called_once()
+        self.assertEqual(len(logged.records), 1)
@@ -0,0 +1,87 @@
+import re
+from datetime import datetime
+from django.test import TestCase
+from django.utils import timezone
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from core.models import User, Organization
+from crm.models import Space, Meeting, Contract
+from tasks.models import Task
+from ai_assistant.tools.analytics import AnalyticsTools
+from ai_assistant.tools.tasks import TaskTools
+from ai_assistant.utils.periods import period_range
+
+
+class QueryPlanTest(TestCase):
+    """
+    EXPLAINs the queries of the dashboard, the AI tools and the list endpoints
+    and fails when one of them reads a whole table instead of an index.
+    """
+    TABLES = ('tasks_task', 'crm_contract', 'crm_meeting', 'pages_page', 'core_analyticsrollup')
+
+    def setUp(self):
+        cache.clear()
+        self.org = Organization.objects.create(name="Org Plans")
+        self.user = User.objects.create_user(username='plans', email='plans@test.com', password='pw', organization=self.org)
+        self.space = Space.objects.create(name="Acme", organization=self.org)
+        Task.objects.create(title="T", organization=self.org, assigned_to=self.user, priority='high', due_date=timezone.now())
+        Contract.objects.create(title="C", space=self.space, organization=self.org, status='active', amount=10)
+        Meeting.objects.create(title="M", space=self.space, organization=self.org, date=timezone.now())
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _full_scans(self, sql):
+        vendor = connection.vendor
+        with connection.cursor() as cursor:
+            if vendor == 'sqlite':
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+                # "SCAN <table>" reads every row, "SEARCH <table> USING INDEX" does not
+                return [row[-1] for row in cursor.fetchall() if re.match(r'SCAN (%s)\b' % '|'.join(self.TABLES), row[-1])]
+            if vendor == 'mysql':
+                cursor.execute(f"EXPLAIN {sql}")
+                columns = [column[0] for column in cursor.description]
+                return [row for row in cursor.fetchall() if dict(zip(columns, row))['type'] == 'ALL' and dict(zip(columns, row))['table'] in self.TABLES]
+            if vendor == 'postgresql':
+                # Tiny test tables: make the planner show which index it can use
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                cursor.execute(f"EXPLAIN {sql}")
+                return [row[0] for row in cursor.fetchall() if re.search(r'Seq Scan on (%s)\b' % '|'.join(self.TABLES), row[0])]
+        self.skipTest(f"No plan check for {vendor}")
+
+    def assertNoFullScan(self, run):
+        with CaptureQueriesContext(connection) as queries:
+            run()
+        selects = [q['sql'] for q in queries.captured_queries if q['sql'].startswith('SELECT') and any(t in q['sql'] for t in self.TABLES)]
+        self.assertTrue(selects)
+        for sql in selects:
+            self.assertEqual(self._full_scans(sql), [], sql)
+
+    def test_dashboard(self):
+        self.assertNoFullScan(lambda: self.client.get('/api/dashboard/'))
+
+    def test_ai_tools(self):
+        for period in ('this_month', 'last_month', 'this_year'):
+            for entity_type in ('contract', 'task', 'meeting'):
+                self.assertNoFullScan(lambda: AnalyticsTools.analyze_data(entity_type, time_period=period, user=self.user))
+            self.assertNoFullScan(lambda: AnalyticsTools.analyze_data(
+                'contract', metric='sum_amount', time_period=period, filters={'status': 'signed'}, user=self.user
+            ))
+        self.assertNoFullScan(lambda: AnalyticsTools.analyze_data('task', metric='urgent_tasks', user=self.user))
+        for due_date_range in ('today', 'this_week', 'this_month', 'last_month', 'overdue'):
+            self.assertNoFullScan(lambda: TaskTools.list_tasks(due_date_range=due_date_range, user=self.user))
+            self.assertNoFullScan(lambda: TaskTools.list_tasks(status='todo', due_date_range=due_date_range, user=self.user))
+
+    def test_list_endpoints(self):
+        self.assertNoFullScan(lambda: self.client.get('/api/tasks/'))
+        self.assertNoFullScan(lambda: self.client.get('/api/tasks/kanban/'))
+        self.assertNoFullScan(lambda: self.client.get('/api/crm/contracts/?status=active'))
+        self.assertNoFullScan(lambda: self.client.get('/api/crm/meetings/'))
+
+    def test_periods_are_half_open(self):
+        now = timezone.make_aware(datetime(2026, 3, 15, 12))
+        start, end = period_range('last_month', now)
+        self.assertEqual((start.date().isoformat(), end.date().isoformat()), ('2026-02-01', '2026-03-01'))
+        start, end = period_range('this_month', timezone.make_aware(datetime(2026, 12, 31, 23, 30)))
+        self.assertEqual((start.month, end.year, end.month), (12, 2027, 1))
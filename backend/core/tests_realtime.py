@@ -0,0 +1,118 @@
+import json
+import asyncio
+from unittest.mock import patch
+from django.test import TestCase
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from core.models import User, Organization, Notification
+from core import realtime
+from crm.models import Space, ActivityLog, SpaceMember
+from core.websocket import notifications_socket
+
+
+class RealtimeNotificationTest(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="Org Realtime")
+        self.user = User.objects.create_user(username='rt', email='rt@test.com', password='pw', organization=self.org)
+
+    def _notification(self, title="Nouvelle tâche"):
+        return Notification(recipient=self.user, type='task_assigned', title=title)
+
+    def test_bulk_created_notifications_are_pushed_after_commit(self):
+        with patch.object(realtime, 'publish') as mock_publish:
+            with self.captureOnCommitCallbacks(execute=False) as callbacks:
+                Notification.objects.bulk_create([self._notification("A"), self._notification("B")])
+            mock_publish.assert_not_called()
+            for callback in callbacks:
+                callback()
+
+        channels = {call.args[0] for call in mock_publish.call_args_list}
+        titles = [call.args[1]['notification']['title'] for call in mock_publish.call_args_list]
+        self.assertEqual(channels, {f"user:{self.user.id}"})
+        self.assertEqual(titles, ["A", "B"])
+
+    def test_mark_all_read_pushes_the_unread_count(self):
+        Notification.objects.bulk_create([self._notification()])
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with patch.object(realtime, 'publish') as mock_publish:
+            client.post('/api/notifications/mark_all_read/')
+        mock_publish.assert_called_once_with(
+            f"user:{self.user.id}", {'type': 'notification.read', 'unread_count': 0, 'all': True}
+        )
+
+    def test_socket_receives_messages_of_its_user(self):
+        Notification.objects.bulk_create([self._notification()])
+        token = str(AccessToken.for_user(self.user))
+
+        async def scenario():
+            socket = ApplicationCommunicator(notifications_socket, {
+                'type': 'websocket', 'path': '/ws/notifications/', 'query_string': f"token={token}".encode()
+            })
+            await socket.send_input({'type': 'websocket.connect'})
+            self.assertEqual((await socket.receive_output(5))['type'], 'websocket.accept')
+            hello = json.loads((await socket.receive_output(5))['text'])
+
+            # Published from another thread, e.g. an outbox worker
+            await asyncio.get_running_loop().run_in_executor(None, realtime.publish, f"user:{self.user.id}", {'type': 'notification.created'})
+            realtime.publish("user:someone-else", {'type': 'notification.created'})
+            pushed = json.loads((await socket.receive_output(5))['text'])
+            self.assertTrue(await socket.receive_nothing(0.1))
+
+            await socket.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await socket.wait(5)
+            return hello, pushed
+
+        hello, pushed = async_to_sync(scenario)()
+        self.assertEqual(hello, {'type': 'hello', 'unread_count': 1})
+        self.assertEqual(pushed, {'type': 'notification.created'})
+
+    def test_activity_reaches_only_the_space_admins(self):
+        space = Space.objects.create(name="Privé", organization=self.org)
+        editor = User.objects.create_user(username='rt-editor', email='rt-editor@test.com', password='pw', organization=self.org)
+        SpaceMember.objects.create(space=space, user=self.user, role='admin')
+        SpaceMember.objects.create(space=space, user=editor, role='editor')
+        with self.captureOnCommitCallbacks() as callbacks:
+            ActivityLog.objects.create(space=space, actor=self.user, action='updated', entity_type='Contrat', entity_name="Confidentiel")
+
+        def commit():
+            for callback in callbacks:
+                callback()
+
+        async def scenario():
+            sockets = []
+            for user in (self.user, editor):
+                socket = ApplicationCommunicator(notifications_socket, {
+                    'type': 'websocket', 'path': '/ws/notifications/',
+                    'query_string': f"token={AccessToken.for_user(user)}".encode()
+                })
+                await socket.send_input({'type': 'websocket.connect'})
+                await socket.receive_output(5) # accept
+                await socket.receive_output(5) # hello
+                sockets.append(socket)
+
+            await sync_to_async(commit)()
+            admin_socket, editor_socket = sockets
+            pushed = json.loads((await admin_socket.receive_output(5))['text'])
+            editor_received_nothing = await editor_socket.receive_nothing(0.2)
+
+            for socket in sockets:
+                await socket.send_input({'type': 'websocket.disconnect', 'code': 1000})
+                await socket.wait(5)
+            return pushed, editor_received_nothing
+
+        pushed, editor_received_nothing = async_to_sync(scenario)()
+        self.assertEqual((pushed['type'], pushed['activity']['entity_name']), ('activity.created', "Confidentiel"))
+        self.assertTrue(editor_received_nothing)
+
+    def test_socket_rejects_invalid_token(self):
+        async def scenario():
+            socket = ApplicationCommunicator(notifications_socket, {
+                'type': 'websocket', 'path': '/ws/notifications/', 'query_string': b'token=invalid'
+            })
+            await socket.send_input({'type': 'websocket.connect'})
+            return await socket.receive_output(5)
+
+        self.assertEqual(async_to_sync(scenario)(), {'type': 'websocket.close', 'code': 4401})
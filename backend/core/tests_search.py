@@ -0,0 +1,104 @@
+import importlib
+from io import StringIO
+from django.test import TestCase
+from django.core.management import call_command
+from django.apps import apps
+from rest_framework.test import APIClient
+from core.models import User, Organization, SearchEntry, SearchToken
+from core import search
+from crm.models import Space, Contact
+from tasks.models import Task
+from pages.models import Page
+from databases.models import Database
+
+
+class SearchIndexTest(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="Org Search")
+        self.user = User.objects.create_user(username='finder', email='finder@test.com', password='pw', organization=self.org)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def titles(self, query, **kwargs):
+        return [entry['title'] for entry in search.search(self.org.id, query, **kwargs)]
+
+    def test_accents_case_and_word_prefixes(self):
+        Page.objects.create(title="Réunion Café", organization=self.org)
+        Task.objects.create(title="Relancer le client", organization=self.org)
+        self.assertEqual(self.titles("cafe"), ["Réunion Café"])
+        self.assertEqual(self.titles("REUN caf"), ["Réunion Café"])
+        self.assertEqual(self.titles("café relancer"), [])
+        self.assertEqual(self.titles("nion"), []) # Word prefixes, not substrings
+
+    def test_migration_backfills_existing_objects(self):
+        backfill = importlib.import_module('core.migrations.0012_backfill_search_index').backfill
+        Page.objects.create(title="Compte rendu", organization=self.org)
+        Contact.objects.create(first_name="Ana", last_name="Lopez", email="ana@acme.com", organization=self.org)
+        SearchEntry.objects.all().delete() # Created before the index existed
+        backfill(apps, None)
+        backfill(apps, None) # Entries already there are kept
+        self.assertEqual(self.titles("compte"), ["Compte rendu"])
+        self.assertEqual(self.titles("acme"), ["Ana Lopez"])
+        self.assertEqual(SearchEntry.objects.filter(entity_type='contact').count(), 1)
+
+    def test_global_search_caps_each_type(self):
+        for i in range(12):
+            Space.objects.create(name=f"Projet {i}", organization=self.org)
+        Task.objects.create(title="Projet de relance", organization=self.org)
+        results = self.client.get('/api/search/global/', {'q': "projet"}).data
+        types = [result['type'] for result in results]
+        # Spaces (and their wiki pages) rank first but leave room for the task
+        self.assertEqual((types.count('space'), types.count('page'), types.count('task')), (5, 5, 1))
+        self.assertEqual([result['title'] for result in results[:5]], [f"Projet {i}" for i in (0, 1, 10, 11, 2)])
+
+    def test_global_and_mention_views(self):
+        space = Space.objects.create(name="Contoso", organization=self.org)
+        Contact.objects.create(first_name="Ana", last_name="Contos", email="ana@contoso.com", position="CEO", organization=self.org, space=space)
+        page = Page.objects.create(title="Contrat cadre", organization=self.org)
+        Database.objects.create(title="Contacts", page=page)
+        Task.objects.create(title="Contrôle", status='todo', organization=self.org)
+        Space.objects.create(name="Contoso", organization=Organization.objects.create(name="Other"))
+
+        results = self.client.get('/api/search/global/', {'q': 'con'}).data
+        # The space page comes with the space. Titles starting with the query, then spaces > contacts > pages > databases > tasks
+        self.assertEqual(
+            [(result['type'], result['title'], result['subtitle']) for result in results],
+            [('space', "Contoso", 'Space'), ('page', "Contoso", 'Page'), ('page', "Contrat cadre", 'Page'), ('database', "Contacts", 'Database'),
+             ('task', "Contrôle", 'Task (todo)'), ('contact', "Ana Contos", 'CEO')]
+        )
+        self.assertEqual(results[0]['url'], f'/crm/spaces/{space.id}')
+
+        mentions = self.client.get('/api/search/mentions/', {'q': 'cont'}).data
+        self.assertNotIn('database', [mention['type'] for mention in mentions])
+        self.assertEqual(mentions[0], {'id': str(space.id), 'type': 'space', 'label': "Contoso", 'url': f'/crm/spaces/{space.id}'})
+        # Other words of the document (the email of a contact) are searchable too
+        self.assertEqual(self.titles("ana contoso"), ["Ana Contos"])
+
+    def test_index_follows_changes(self):
+        task = Task.objects.create(title="Ancien titre", organization=self.org)
+        task.title = "Nouveau titre"
+        task.save()
+        self.assertEqual(self.titles("ancien"), [])
+        self.assertEqual(self.titles("nouveau"), ["Nouveau titre"])
+        task.delete()
+        self.assertEqual(self.titles("titre"), [])
+        self.assertFalse(SearchToken.objects.exists())
+
+    def test_one_query_per_search(self):
+        for i in range(30):
+            Page.objects.create(title=f"Projet {i}", organization=self.org)
+        with self.assertNumQueries(1):
+            results = search.search(self.org.id, "projet 1", limit=20)
+        self.assertEqual(sorted(result['title'] for result in results), sorted(f"Projet {i}" for i in [1] + list(range(10, 20))))
+
+    def test_rebuild(self):
+        Page.objects.create(title="Budget", organization=self.org)
+        SearchEntry.objects.all().delete()
+        self.assertEqual(self.titles("budget"), [])
+        call_command('rebuild_search_index', organization=[str(self.org.id)], stdout=StringIO())
+        self.assertEqual(self.titles("budget"), ["Budget"])
+
+    def test_prefix_upper_bounds(self):
+        self.assertEqual(search._after_prefix('abc'), 'abd')
+        self.assertEqual(search._after_prefix('az'), 'b')
+        self.assertEqual(search._after_prefix('zz'), None)
@@ -0,0 +1,68 @@
+from django.test import TestCase
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from core.models import User, Organization
+from crm.models import Space, Contract, SpaceMember
+from tasks.models import Task
+from pages.models import Page
+
+
+class SparseFieldsTest(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="Org Fields")
+        self.user = User.objects.create_user(username='fields', email='fields@test.com', password='pw', organization=self.org)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.space = Space.objects.create(name="Acme", organization=self.org)
+        SpaceMember.objects.create(space=self.space, user=self.user, role='admin')
+        self.contract = Contract.objects.create(
+            title="Cadre", space=self.space, organization=self.org, extracted_text="x" * 10000, content={'blocks': []}
+        )
+
+    def get(self, url, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        sql = ' '.join(query['sql'] for query in queries.captured_queries if 'crm_contract' in query['sql'])
+        return response.data, sql
+
+    def test_lists_leave_heavy_columns_out(self):
+        data, sql = self.get('/api/crm/contracts/')
+        contract = data['results'][0]
+        self.assertNotIn('extracted_text', contract)
+        self.assertNotIn('content', contract)
+        self.assertIn('space_name', contract)
+        self.assertNotIn('"extracted_text"', sql)
+
+        data, sql = self.get('/api/crm/contracts/', expand='extracted_text')
+        self.assertEqual(len(data['results'][0]['extracted_text']), 10000)
+        self.assertNotIn('content', data['results'][0])
+
+        data, _ = self.get(f'/api/crm/contracts/{self.contract.id}/')
+        self.assertEqual((len(data['extracted_text']), data['content']), (10000, {'blocks': []}))
+
+    def test_fields_and_omit(self):
+        data, sql = self.get('/api/crm/contracts/', fields='id,title')
+        self.assertEqual(data['results'], [{'id': str(self.contract.id), 'title': "Cadre"}])
+        self.assertNotIn('"content"', sql)
+
+        data, _ = self.get(f'/api/crm/contracts/{self.contract.id}/', omit='extracted_text,organization_details')
+        self.assertNotIn('extracted_text', data)
+        self.assertNotIn('organization_details', data)
+        self.assertEqual(data['content'], {'blocks': []})
+
+        Page.objects.create(title="Notes", content='{"blocks": [1]}', organization=self.org)
+        data, _ = self.get('/api/pages/', fields='title,content')
+        self.assertIn({'title': "Notes", 'content': '{"blocks": [1]}'}, data['results'])
+
+    def test_expand_relations(self):
+        Task.objects.create(title="Relance", space=self.space, organization=self.org)
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get('/api/crm/contracts/', {'expand': 'space', 'fields': 'title,space'}).data
+        self.assertEqual(data['results'][0]['space']['name'], "Acme")
+        self.assertNotIn('notes', data['results'][0]['space']) # Text columns are left out of nested objects
+        self.assertEqual(len([query for query in queries.captured_queries if 'crm_space' in query['sql']]), 1)
+
+        task = self.client.get('/api/tasks/', {'expand': 'space'}).data['results'][0]
+        self.assertEqual(task['space']['id'], str(self.space.id))
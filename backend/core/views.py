@@ -7,9 +7,8 @@ from rest_framework.views import APIView
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
-from django.db.models import Q, Case, When, Value, IntegerField
+from django.db.models import Case, When, Value, IntegerField
 from pages.models import Page
-from crm.models import Space, Contact
 from tasks.models import Task
 from django.contrib.auth import get_user_model
 
@@ -17,145 +16,87 @@ class CustomTokenObtainPairView(TokenObtainPairView):
     permission_classes = (AllowAny,)
 
 class MentionSearchView(APIView):
+    """@mentions in the editor, called on every keystroke: served from memory (core/mentions.py)."""
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
+        from core import mentions
         query = request.query_params.get('q', '')
         if not query:
             return Response([])
 
-        results = []
-
-        # Search Pages
-        pages = Page.objects.filter(organization=request.user.organization, title__icontains=query)[:5]
-        for page in pages:
-            results.append({
-                'id': str(page.id),
-                'type': 'page',
-                'label': page.title,
-                'url': f'/pages/{page.id}'
-            })
-
-        # Search Spaces
-        spaces = Space.objects.filter(organization=request.user.organization, name__icontains=query)[:5]
-        for space in spaces:
-            results.append({
-                'id': str(space.id),
-                'type': 'space',
-                'label': space.name,
-                'url': f'/crm/spaces/{space.id}'
-            })
-
-        # Search Contacts
-        contacts = Contact.objects.filter(
-            Q(first_name__icontains=query) | Q(last_name__icontains=query),
-            organization=request.user.organization
-        )[:5]
-        for contact in contacts:
-            results.append({
-                'id': str(contact.id),
-                'type': 'contact',
-                'label': f"{contact.first_name} {contact.last_name}",
-                'url': f'/crm/contacts/{contact.id}'
-            })
-
-        # Search Tasks
-        tasks = Task.objects.filter(organization=request.user.organization, title__icontains=query)[:5]
-        for task in tasks:
-            results.append({
-                'id': str(task.id),
-                'type': 'task',
-                'label': task.title,
-                'url': f'/tasks' # Task board doesn't have detail view yet, maybe add query param?
-            })
-
-        return Response(results)
+        entries = mentions.lookup(request.user.organization_id, query)
+        return Response([
+            {'id': entry['id'], 'type': entry['type'], 'label': entry['title'], 'url': entry['url']}
+            for entry in entries
+        ])
 
 class GlobalSearchView(APIView):
+    """Pages, databases, spaces, contacts and tasks from the search index (core/search.py)."""
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
+        from core import search
         query = request.query_params.get('q', '')
         if not query:
             return Response([])
 
-        results = []
-
-        # Search Pages
-        pages = Page.objects.filter(organization=request.user.organization, title__icontains=query)[:5]
-        for page in pages:
-            results.append({
-                'id': str(page.id),
-                'type': 'page',
-                'title': page.title,
-                'subtitle': 'Page',
-                'url': f'/pages/{page.id}'
-            })
-
-        # Search Databases
-        from databases.models import Database
-        databases = Database.objects.filter(page__organization=request.user.organization, title__icontains=query)[:5]
-        for db in databases:
-            results.append({
-                'id': str(db.id),
-                'type': 'database',
-                'title': db.title,
-                'subtitle': 'Database',
-                'url': f'/databases/{db.id}'
-            })
-
-        # Search Spaces
-        spaces = Space.objects.filter(organization=request.user.organization, name__icontains=query)[:5]
-        for space in spaces:
-            results.append({
-                'id': str(space.id),
-                'type': 'space',
-                'title': space.name,
-                'subtitle': 'Space',
-                'url': f'/crm/spaces/{space.id}'
-            })
-
-        # Search Contacts
-        contacts = Contact.objects.filter(
-            Q(first_name__icontains=query) | Q(last_name__icontains=query),
-            organization=request.user.organization
-        )[:5]
-        for contact in contacts:
-            results.append({
-                'id': str(contact.id),
-                'type': 'contact',
-                'title': f"{contact.first_name} {contact.last_name}",
-                'subtitle': contact.position or 'Contact',
-                'url': f'/crm/contacts/{contact.id}'
-            })
-
-        # Search Tasks
-        tasks = Task.objects.filter(organization=request.user.organization, title__icontains=query)[:5]
-        for task in tasks:
-            results.append({
-                'id': str(task.id),
-                'type': 'task',
-                'title': task.title,
-                'subtitle': f"Task ({task.status})",
-                'url': f'/tasks'
-            })
-
-        return Response(results)
+        # At most 5 per type (pages, databases, spaces, contacts, tasks)
+        entries = search.search(request.user.organization_id, query, limit=25, per_type=5)
+        return Response([
+            {'id': entry['id'], 'type': entry['type'], 'title': entry['title'], 'subtitle': entry['subtitle'], 'url': entry['url']}
+            for entry in entries
+        ])
 
 class DashboardView(APIView):
+    """
+    Sections are cached per organization or per user (core/dashboard.py) and
+    the response carries an ETag: If-None-Match answers 304 without queries.
+    """
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        # Recent Pages
-        recent_pages = Page.objects.filter(organization=request.user.organization).order_by('-updated_at')[:5]
-        recent_pages_data = [{
+        from django.utils.http import parse_etags
+        from core import dashboard
+
+        user = request.user
+        generations = dashboard.get_generations(user)
+        etag = dashboard.etag(user, generations)
+        headers = {'ETag': etag, 'Cache-Control': 'private, no-cache'}
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            return Response(status=304, headers=headers)
+
+        sections = dashboard.get_sections(
+            user, generations,
+            org_sections={
+                'recent_pages': lambda: self.recent_pages(user),
+                'urgent_tasks': lambda: self.urgent_tasks(user),
+                'active_contracts': lambda: self.active_contracts(user),
+                'analytics': lambda: self.analytics(user),
+            },
+            user_sections={
+                'my_tasks': lambda: self.my_tasks(user),
+            },
+        )
+        return Response({
+            'recent_pages': sections['recent_pages'],
+            'my_tasks': sections['my_tasks'],
+            'urgent_tasks': sections['urgent_tasks'],
+            'active_contracts': sections['active_contracts'],
+            'analytics': sections['analytics'],
+        }, headers=headers)
+
+    def recent_pages(self, user):
+        recent_pages = Page.objects.filter(organization=user.organization_id).order_by('-updated_at')[:5]
+        return [{
             'id': str(p.id),
             'title': p.title,
             'updated_at': p.updated_at
         } for p in recent_pages]
 
-        # My Tasks - Urgent first (High priority), then by due date (earliest first), nulls last
-        my_tasks = Task.objects.filter(organization=request.user.organization, assigned_to=request.user).exclude(status='done').annotate(
+    def my_tasks(self, user):
+        # Urgent first (High priority), then by due date (earliest first), nulls last
+        my_tasks = Task.objects.filter(organization=user.organization_id, assigned_to=user).exclude(status='done').annotate(
             priority_sort=Case(
                 When(priority='high', then=Value(1)),
                 When(priority='medium', then=Value(2)),
@@ -169,7 +110,7 @@ class DashboardView(APIView):
                 output_field=IntegerField(),
             )
         ).order_by('priority_sort', 'due_date_sort', 'due_date')[:5]
-        my_tasks_data = [{
+        return [{
             'id': str(t.id),
             'title': t.title,
             'status': t.status,
@@ -177,9 +118,10 @@ class DashboardView(APIView):
             'due_date': t.due_date
         } for t in my_tasks]
 
-        # Urgent Tasks (Organization wide, High priority, Not done)
+    def urgent_tasks(self, user):
+        # Organization wide, High priority, Not done
         urgent_tasks = Task.objects.filter(
-            organization=request.user.organization, 
+            organization=user.organization_id,
             priority='high'
         ).exclude(status='done').annotate(
              due_date_sort=Case(
@@ -187,9 +129,9 @@ class DashboardView(APIView):
                 default=Value(0),
                 output_field=IntegerField(),
             )
-        ).order_by('due_date_sort', 'due_date')[:5]
-        
-        urgent_tasks_data = [{
+        ).select_related('assigned_to').order_by('due_date_sort', 'due_date')[:5]
+
+        return [{
             'id': str(t.id),
             'title': t.title,
             'status': t.status,
@@ -198,11 +140,10 @@ class DashboardView(APIView):
             'assigned_to': f"{t.assigned_to.first_name} {t.assigned_to.last_name}" if t.assigned_to else "Unassigned"
         } for t in urgent_tasks]
 
-
-        # Active Contracts
+    def active_contracts(self, user):
         from crm.models import Contract
-        active_contracts = Contract.objects.filter(organization=request.user.organization, status='active').order_by('end_date')[:5]
-        active_contracts_data = [{
+        active_contracts = Contract.objects.filter(organization=user.organization_id, status='active').select_related('space').order_by('end_date')[:5]
+        return [{
             'id': str(c.id),
             'title': c.title,
             'space': c.space.name,
@@ -210,85 +151,64 @@ class DashboardView(APIView):
             'amount': c.amount
         } for c in active_contracts]
 
-        # Analytics - Revenue (Last 6 months)
-        from django.db.models import Sum, Count
-        from django.db.models.functions import TruncMonth
-        from django.utils import timezone
-        from datetime import timedelta
-        import locale
-        
+    def analytics(self, user):
+        # Read from the monthly rollups (core/analytics.py), a few rows per month
+        # whatever the number of contracts and tasks
+        from core import analytics
+
         # French month names mapping
         MONTHS_FR = {
             1: 'Janv', 2: 'Févr', 3: 'Mars', 4: 'Avr', 5: 'Mai', 6: 'Juin',
             7: 'Juil', 8: 'Août', 9: 'Sept', 10: 'Oct', 11: 'Nov', 12: 'Déc'
         }
 
-        six_months_ago = timezone.now() - timedelta(days=180)
-        revenue_data = Contract.objects.filter(
-            organization=request.user.organization,
-            status='signed', 
-            created_at__gte=six_months_ago
-        ).annotate(
-            month=TruncMonth('created_at')
-        ).values('month').annotate(
-            total=Sum('amount')
-        ).order_by('month')
-        
+        # Revenue of the contracts signed, per creation month (last 6 months)
         revenue_chart = [
             {
-                'name': MONTHS_FR[item['month'].month], 
-                'value': item['total'] or 0
-            } for item in revenue_data
+                'name': MONTHS_FR[month.month],
+                'value': amount
+            } for month, amount in analytics.monthly_amounts(user.organization_id, 'contract', 'signed', months=6)
         ]
 
         # Analytics - Task Distribution
-        task_counts = Task.objects.filter(organization=request.user.organization).values('status').annotate(count=Count('id'))
-        
         TASK_STATUS_FR = {
             'todo': 'À faire',
             'in_progress': 'En cours',
             'done': 'Terminé',
             'blocked': 'Bloqué'
         }
-        
+
         task_chart = [
             {
-                'name': TASK_STATUS_FR.get(item['status'], item['status']), 
-                'value': item['count']
-            } for item in task_counts
+                'name': TASK_STATUS_FR.get(status, status),
+                'value': count
+            } for status, count in analytics.status_counts(user.organization_id, 'task').items()
         ]
 
         # Analytics - Sales Funnel (Contracts by status)
-        funnel_counts = Contract.objects.filter(organization=request.user.organization).values('status').annotate(count=Count('id'))
         # Order: Draft -> Active -> Signed -> Finished
         status_order = ['draft', 'active', 'signed', 'finished']
-        
+
         CONTRACT_STATUS_FR = {
             'draft': 'Brouillon',
             'active': 'Actif',
             'signed': 'Signé',
             'finished': 'Terminé'
         }
-        
-        funnel_map = {item['status']: item['count'] for item in funnel_counts}
+
+        funnel_map = analytics.status_counts(user.organization_id, 'contract')
         funnel_chart = [
             {
-                'name': CONTRACT_STATUS_FR.get(status, status), 
+                'name': CONTRACT_STATUS_FR.get(status, status),
                 'value': funnel_map.get(status, 0)
             } for status in status_order
         ]
 
-        return Response({
-            'recent_pages': recent_pages_data,
-            'my_tasks': my_tasks_data,
-            'urgent_tasks': urgent_tasks_data,
-            'active_contracts': active_contracts_data,
-            'analytics': {
-                'revenue': revenue_chart,
-                'tasks': task_chart,
-                'funnel': funnel_chart
-            }
-        })
+        return {
+            'revenue': revenue_chart,
+            'tasks': task_chart,
+            'funnel': funnel_chart
+        }
 
 class UserViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = UserSerializer
@@ -303,25 +223,91 @@ class UserViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data)
 
 from .serializers import NotificationSerializer
-from .models import Notification
+from .models import Notification, NotificationCounter
+from .pagination import KeysetPagination
+from . import realtime
+from django.utils.dateparse import parse_datetime
+from django.core.exceptions import ValidationError as DjangoValidationError
 
 class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = NotificationSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-created_at', '-id')
 
     def get_queryset(self):
         return Notification.objects.filter(recipient=self.request.user)
 
+    def _publish_read(self, **payload):
+        # Other tabs and devices of the user update their badge
+        realtime.publish(realtime.user_channel(self.request.user.id), {
+            'type': 'notification.read',
+            'unread_count': NotificationCounter.get_unread(self.request.user.id),
+            **payload
+        })
+
+    @action(detail=True, methods=['get'])
+    def items(self, request, pk=None):
+        """The events folded into a digest (a plain notification is its own single item)."""
+        notification = self.get_object()
+        if not notification.items:
+            return Response([{
+                'title': notification.title, 'message': notification.message, 'link': notification.link,
+                'actor': notification.actor_id, 'created_at': notification.created_at
+            }])
+        return Response(list(reversed(notification.items)))
+
+    @action(detail=False, methods=['get'])
+    def unread_count(self, request):
+        return Response({'unread_count': NotificationCounter.get_unread(request.user.id)})
+
     @action(detail=True, methods=['post'])
     def mark_read(self, request, pk=None):
-        notification = self.get_object()
-        notification.is_read = True
-        notification.save()
+        # One UPDATE, no load/save of the notification
+        try:
+            updated = Notification.objects.mark_read(request.user, ids=[pk])
+        except (ValueError, DjangoValidationError):
+            return Response({'error': 'Notification not found'}, status=404)
+        if not updated and not self.get_queryset().filter(pk=pk).exists():
+            return Response({'error': 'Notification not found'}, status=404)
+        self._publish_read(ids=[pk])
         return Response({'status': 'marked as read'})
 
+    @action(detail=False, methods=['post'], url_path='mark_read')
+    def mark_read_batch(self, request):
+        """
+        Body: {"ids": [...]} or {"before": "<ISO datetime>" | "before_id": "<notification id>"}
+        (everything created up to that point, e.g. the oldest notification displayed).
+        """
+        ids = request.data.get('ids')
+        before = request.data.get('before')
+        before_id = request.data.get('before_id')
+
+        if before:
+            before = parse_datetime(str(before))
+            if before is None:
+                return Response({'error': 'Invalid before datetime'}, status=400)
+        elif before_id:
+            try:
+                before = self.get_queryset().filter(pk=before_id).values_list('created_at', flat=True).first()
+            except (ValueError, DjangoValidationError):
+                before = None
+            if before is None:
+                return Response({'error': 'Notification not found'}, status=404)
+        elif not isinstance(ids, list) or not ids:
+            return Response({'error': 'ids, before or before_id required'}, status=400)
+
+        try:
+            updated = Notification.objects.mark_read(request.user, ids=ids if not before else None, before=before)
+        except (ValueError, DjangoValidationError):
+            return Response({'error': 'Invalid notification ids'}, status=400)
+        self._publish_read(**({'before': before} if before else {'ids': ids}))
+        return Response({'status': 'marked as read', 'updated': updated})
+
     @action(detail=False, methods=['post'])
     def mark_all_read(self, request):
-        self.get_queryset().filter(is_read=False).update(is_read=True)
+        Notification.objects.mark_read(request.user)
+        self._publish_read(all=True)
         return Response({'status': 'all marked as read'})
 
 from django.core.files.storage import default_storage
@@ -352,6 +338,7 @@ class UploadView(APIView):
 
 from .serializers import UserFcmTokenSerializer
 from .models import UserFcmToken
+from .services.fcm import invalidate_tokens
 
 class FcmTokenView(APIView):
     permission_classes = [IsAuthenticated]
@@ -367,5 +354,6 @@ class FcmTokenView(APIView):
                 token=token,
                 defaults={'device_type': device_type}
             )
+            invalidate_tokens(request.user.id)
             return Response({'status': 'token saved'})
         return Response(serializer.errors, status=400)
@@ -0,0 +1,99 @@
+"""
+WebSocket endpoint of real-time notifications (ws(s)://<host>/ws/notifications/?token=<access JWT>).
+
+Server -> client messages (JSON):
+- {"type": "hello", "unread_count": n} once connected
+- {"type": "notification.created", "notification": {...}}
+- {"type": "notification.read", "ids": [...] | "before": "<datetime>" | "all": true, "unread_count": n}
+- {"type": "activity.created", "space_id": "...", "activity": {...}} (admins of the space)
+- {"type": "ping"} after HEARTBEAT seconds of silence
+
+The client may send "ping" (answered with {"type": "pong"}). The socket is
+closed with code 4401 when the token is invalid or expires: reconnect with
+a fresh token.
+"""
+import json
+import time
+import asyncio
+from urllib.parse import parse_qs
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from . import realtime
+
+CLOSE_UNAUTHORIZED = 4401
+
+
+@sync_to_async
+def _authenticate(raw_token):
+    """(user, token expiry timestamp) or (None, None)."""
+    from rest_framework_simplejwt.tokens import AccessToken
+    from rest_framework_simplejwt.exceptions import TokenError
+    from core.models import User
+
+    close_old_connections()
+    try:
+        token = AccessToken(raw_token)
+    except TokenError:
+        return None, None
+    user = User.objects.filter(pk=token.get('user_id'), is_active=True).first()
+    return user, token.get('exp')
+
+
+@sync_to_async
+def _unread_count(user):
+    from core.models import NotificationCounter
+    return NotificationCounter.get_unread(user.pk)
+
+
+async def notifications_socket(scope, receive, send):
+    event = await receive()
+    if event['type'] != 'websocket.connect':
+        return
+
+    query = parse_qs(scope.get('query_string', b'').decode())
+    user, expires_at = await _authenticate((query.get('token') or [''])[0])
+    if user is None:
+        await send({'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+        return
+
+    await send({'type': 'websocket.accept'})
+
+    # Subscribed before counting, so nothing created in between is missed
+    hub = realtime.get_hub()
+    subscription = hub.subscribe([realtime.user_channel(user.pk)])
+    heartbeat = realtime.get_conf()['HEARTBEAT']
+
+    receiving = sending = None
+    try:
+        await send({'type': 'websocket.send', 'text': json.dumps({'type': 'hello', 'unread_count': await _unread_count(user)})})
+        receiving = asyncio.ensure_future(receive())
+        sending = asyncio.ensure_future(subscription.get())
+        while True:
+            timeout = heartbeat
+            if expires_at:
+                timeout = min(timeout, max(expires_at - time.time(), 0))
+            done, _ = await asyncio.wait({receiving, sending}, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            if expires_at and time.time() >= expires_at:
+                await send({'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+                break
+            if not done:
+                await send({'type': 'websocket.send', 'text': '{"type": "ping"}'})
+                continue
+
+            if receiving in done:
+                message = receiving.result()
+                if message['type'] == 'websocket.disconnect':
+                    break
+                if message.get('text', '').strip('" ') == 'ping':
+                    await send({'type': 'websocket.send', 'text': '{"type": "pong"}'})
+                receiving = asyncio.ensure_future(receive())
+
+            if sending in done:
+                await send({'type': 'websocket.send', 'text': json.dumps(sending.result())})
+                sending = asyncio.ensure_future(subscription.get())
+    finally:
+        for future in (receiving, sending):
+            if future:
+                future.cancel()
+        hub.unsubscribe(subscription)
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.26 on 2026-10-19 17:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0021_space_github_repo'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contract',
+            index=models.Index(fields=['organization', 'end_date'], name='contract_org_end_date_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.26 on 2026-10-19 17:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0022_contract_contract_org_end_date_idx'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='contract',
+            index=models.Index(fields=['organization', 'status', 'end_date'], name='contract_org_status_end_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='contract',
+            index=models.Index(fields=['organization', 'start_date'], name='contract_org_start_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='meeting',
+            index=models.Index(fields=['organization', 'date'], name='meeting_org_date_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.26 on 2026-10-19 18:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0023_query_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['space', 'timestamp', 'id'], name='activity_space_time_idx'),
+        ),
+    ]
@@ -1,6 +1,8 @@
 from django.db import models
 from django.conf import settings
 import uuid
+from core.models import ChangeTrackingMixin
+from core.realtime import BroadcastQuerySet
 import secrets
 
 class SpaceType(models.Model):
@@ -44,7 +46,7 @@ class Space(models.Model):
     def __str__(self):
         return self.name
 
-class SpaceMember(models.Model):
+class SpaceMember(ChangeTrackingMixin, models.Model):
     ROLE_CHOICES = (
         ('admin', 'Admin'),
         ('editor', 'Éditeur'),
@@ -80,7 +82,7 @@ class Contact(models.Model):
     def __str__(self):
         return f"{self.first_name} {self.last_name}"
 
-class Contract(models.Model):
+class Contract(ChangeTrackingMixin, models.Model):
     STATUS_CHOICES = (
         ('draft', 'Draft'),
         ('active', 'Active'),
@@ -103,6 +105,16 @@ class Contract(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Range scans on end dates (scheduled automations)
+            models.Index(fields=['organization', 'end_date'], name='contract_org_end_date_idx'),
+            # Status filters ordered by end date (dashboard active contracts, list filters)
+            models.Index(fields=['organization', 'status', 'end_date'], name='contract_org_status_end_idx'),
+            # Period ranges (analyze_data)
+            models.Index(fields=['organization', 'start_date'], name='contract_org_start_date_idx'),
+        ]
+
     def __str__(self):
         return self.title
     created_at = models.DateTimeField(auto_now_add=True)
@@ -121,7 +133,7 @@ class ContractTemplate(models.Model):
     def __str__(self):
         return self.name
 
-class Meeting(models.Model):
+class Meeting(ChangeTrackingMixin, models.Model):
     TYPE_CHOICES = (
         ('phone', 'Phone'),
         ('in_person', 'In Person'),
@@ -140,6 +152,12 @@ class Meeting(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Period ranges and date filters (analyze_data, meeting lists)
+            models.Index(fields=['organization', 'date'], name='meeting_org_date_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -213,8 +231,14 @@ class ActivityLog(models.Model):
     details = models.JSONField(default=dict, blank=True, help_text="Stores change deltas like {'old_status': 'draft', 'new_status': 'signed'}")
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    objects = BroadcastQuerySet.as_manager()
+
     class Meta:
         ordering = ['-timestamp']
+        indexes = [
+            # Keyset pages of a space's log (core/pagination.py)
+            models.Index(fields=['space', 'timestamp', 'id'], name='activity_space_time_idx'),
+        ]
 
     def __str__(self):
         return f"{self.actor} {self.action} {self.entity_type} '{self.entity_name}' in {self.space.name}"
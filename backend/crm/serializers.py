@@ -1,12 +1,14 @@
 from rest_framework import serializers
 from .models import Space, Contact, Contract, Meeting, Document, MeetingTemplate, SharedLink, ContractTemplate, SpaceType, SpaceMember, ActivityLog
+from core.serializers import DynamicFieldsMixin
 from core.validators import validate_cross_organization_reference
 
-class ContactSerializer(serializers.ModelSerializer):
+class ContactSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Contact
         fields = '__all__'
         read_only_fields = ['organization']
+        expandable_fields = {'space': None}
 
     def validate(self, data):
         validate_cross_organization_reference(
@@ -15,7 +17,7 @@ class ContactSerializer(serializers.ModelSerializer):
         )
         return data
 
-class ContractSerializer(serializers.ModelSerializer):
+class ContractSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     space_name = serializers.ReadOnlyField(source='space.name')
     organization_details = serializers.SerializerMethodField()
     created_by_name = serializers.SerializerMethodField()
@@ -24,6 +26,9 @@ class ContractSerializer(serializers.ModelSerializer):
         model = Contract
         fields = '__all__'
         read_only_fields = ['organization']
+        # Full PDF text and Editor.js document: in lists only with ?expand=
+        heavy_fields = ('content', 'extracted_text')
+        expandable_fields = {'space': None}
 
     def get_organization_details(self, obj):
         return {
@@ -47,7 +52,7 @@ class ContractSerializer(serializers.ModelSerializer):
         )
         return data
 
-class ContractTemplateSerializer(serializers.ModelSerializer):
+class ContractTemplateSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = ContractTemplate
         fields = '__all__'
@@ -60,13 +65,13 @@ class ContractTemplateSerializer(serializers.ModelSerializer):
         )
         return data
 
-class SpaceTypeSerializer(serializers.ModelSerializer):
+class SpaceTypeSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = SpaceType
         fields = '__all__'
         read_only_fields = ['organization']
 
-class SpaceMemberSerializer(serializers.ModelSerializer):
+class SpaceMemberSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     user_details = serializers.SerializerMethodField()
     
     class Meta:
@@ -81,13 +86,14 @@ class SpaceMemberSerializer(serializers.ModelSerializer):
             'email': obj.user.email,
         }
 
-class MeetingSerializer(serializers.ModelSerializer):
+class MeetingSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     space_name = serializers.ReadOnlyField(source='space.name')
     
     class Meta:
         model = Meeting
         fields = '__all__'
         read_only_fields = ['organization', 'created_by']
+        expandable_fields = {'space': None, 'contract': None}
 
     def validate(self, data):
         validate_cross_organization_reference(
@@ -97,7 +103,7 @@ class MeetingSerializer(serializers.ModelSerializer):
         )
         return data
 
-class SpaceSerializer(serializers.ModelSerializer):
+class SpaceSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     contacts = ContactSerializer(many=True, read_only=True)
     contracts = ContractSerializer(many=True, read_only=True)
     meetings = MeetingSerializer(many=True, read_only=True)
@@ -122,7 +128,52 @@ class SpaceSerializer(serializers.ModelSerializer):
             }
         return None
 
-class DocumentSerializer(serializers.ModelSerializer):
+class ContactPreviewSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Contact
+        fields = ['id', 'first_name', 'last_name', 'position']
+
+class ContractPreviewSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Contract
+        fields = ['id', 'title', 'status', 'amount']
+
+class MeetingPreviewSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Meeting
+        fields = ['id', 'title', 'date']
+
+class SpaceListSerializer(SpaceSerializer):
+    """
+    Spaces in lists: counts and the few latest contacts, contracts and
+    meetings instead of all of them. The view annotates the counts and
+    prefetches the previews (preview_<relation>); ?expand=contacts,... adds
+    the full nested lists back.
+    """
+    contacts = None
+    contracts = None
+    meetings = None
+    contacts_count = serializers.IntegerField(read_only=True)
+    contracts_count = serializers.IntegerField(read_only=True)
+    meetings_count = serializers.IntegerField(read_only=True)
+    contacts_preview = ContactPreviewSerializer(source='preview_contacts', many=True, read_only=True)
+    contracts_preview = ContractPreviewSerializer(source='preview_contracts', many=True, read_only=True)
+    meetings_preview = MeetingPreviewSerializer(source='preview_meetings', many=True, read_only=True)
+
+    class Meta(SpaceSerializer.Meta):
+        expandable_fields = {
+            'contacts': ContactSerializer,
+            'contracts': ContractSerializer,
+            'meetings': MeetingSerializer,
+        }
+
+    def get_fields(self):
+        fields = super().get_fields()
+        for name in self.expanded:
+            fields.pop(f'{name}_preview', None)
+        return fields
+
+class DocumentSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     space_name = serializers.ReadOnlyField(source='space.name')
     contract_title = serializers.ReadOnlyField(source='contract.title')
 
@@ -130,6 +181,7 @@ class DocumentSerializer(serializers.ModelSerializer):
         model = Document
         fields = '__all__'
         read_only_fields = ['organization']
+        expandable_fields = {'space': None, 'contract': None}
 
     def validate(self, data):
         validate_cross_organization_reference(
@@ -139,13 +191,13 @@ class DocumentSerializer(serializers.ModelSerializer):
         )
         return data
 
-class MeetingTemplateSerializer(serializers.ModelSerializer):
+class MeetingTemplateSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = MeetingTemplate
         fields = '__all__'
         read_only_fields = ['organization']
 
-class SharedLinkSerializer(serializers.ModelSerializer):
+class SharedLinkSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, required=False, allow_blank=True)
 
     class Meta:
@@ -171,7 +223,7 @@ class SharedLinkSerializer(serializers.ModelSerializer):
         )
         return data
 
-class ActivityLogSerializer(serializers.ModelSerializer):
+class ActivityLogSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     actor_name = serializers.SerializerMethodField()
 
     class Meta:
@@ -1,10 +1,10 @@
-from django.db.models.signals import post_save, pre_save
+from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from crum import get_current_user
 from core.models import Notification
-from .models import Space, ActivityLog, SpaceMember
+from .models import Space, ActivityLog, SpaceMember, Contact
 from pages.models import Page
-from core.services.fcm import send_push_notification
+from core import analytics, notifications, outbox, realtime, search
 
 @receiver(post_save, sender=Space)
 def create_space_wiki_page(sender, instance, created, **kwargs):
@@ -16,16 +16,41 @@ def create_space_wiki_page(sender, instance, created, **kwargs):
             content=f'{{"blocks": [{{"type": "header", "data": {{"text": "{instance.name} Wiki", "level": 1}}}}]}}'
         )
 
-from .models import Contract
+from .models import Contract, Meeting, Document
 import os
-from pypdf import PdfReader
+from core.lazy import LazyImport
 
+PdfReader = LazyImport('pypdf', 'PdfReader')
+
+# --- Outbox publishers: saves only record events, side effects run after commit ---
+
+@receiver(post_save, sender=Space)
+@receiver(post_save, sender=SpaceMember)
 @receiver(post_save, sender=Contract)
-def extract_contract_text(sender, instance, created, **kwargs):
+@receiver(post_save, sender=Meeting)
+@receiver(post_save, sender=Document)
+def publish_crm_saved(sender, instance, created, update_fields=None, **kwargs):
+    changes = {}
+    if not created and hasattr(instance, 'get_changes'):
+        # Contracts and meetings know their diff, a save that changes nothing publishes nothing
+        changes = instance.get_changes(update_fields)
+        if not changes:
+            return
+    outbox.publish_instance(instance, 'created' if created else 'updated', changes=changes)
+
+@receiver(post_delete, sender=Space)
+@receiver(post_delete, sender=Contract)
+@receiver(post_delete, sender=Meeting)
+def publish_crm_deleted(sender, instance, **kwargs):
+    outbox.publish_instance(instance, 'deleted')
+
+@outbox.handler('crm.contract_text', 'contract.created', 'contract.updated')
+def extract_contract_text(event):
     """
     Extracts text from the uploaded PDF file and saves it to extracted_text.
     """
-    if instance.file and not instance.extracted_text:
+    instance = outbox.load_instance(event, Contract)
+    if instance and instance.file and not instance.extracted_text:
         try:
             file_path = instance.file.path
             if not os.path.exists(file_path):
@@ -40,7 +65,7 @@ def extract_contract_text(sender, instance, created, **kwargs):
             for page in reader.pages:
                 text += page.extract_text() + "\n"
             
-            # Save extracted text without triggering signals again
+            # Only extracted_text is saved, the resulting contract.updated event has no changes
             instance.extracted_text = text
             instance.save(update_fields=['extracted_text'])
             print(f"Successfully extracted text from {instance.title}")
@@ -48,15 +73,16 @@ def extract_contract_text(sender, instance, created, **kwargs):
         except Exception as e:
             print(f"Error extracting text from contract {instance.id}: {str(e)}")
 
-from .models import Meeting
 from integrations.services import GoogleCalendarService
 
-@receiver(post_save, sender=Meeting)
-def sync_meeting_to_google(sender, instance, created, **kwargs):
+@outbox.handler('crm.google_calendar', 'meeting.created')
+def sync_meeting_to_google(event):
     """
     Syncs the meeting to Google Calendar if the user has connected their account.
     """
-    if instance.created_by:
+    instance = outbox.load_instance(event, Meeting)
+    created = event.event_type == 'meeting.created'
+    if instance and instance.created_by:
         # We only sync if there's a user attached
         # Ideally we should check if it's a new meeting or update
         # For now, create_event handles creation. update_event logic is needed for updates.
@@ -66,8 +92,6 @@ def sync_meeting_to_google(sender, instance, created, **kwargs):
         # else:
         #     GoogleCalendarService.update_event(instance.created_by, instance)
 
-from django.db.models.signals import post_delete
-from .models import Document, Contract
 
 @receiver(post_delete, sender=Document)
 def delete_document_file(sender, instance, **kwargs):
@@ -87,11 +111,12 @@ def delete_contract_file(sender, instance, **kwargs):
 
 # --- New Signals for ActivityLog & Notifications ---
 
-@receiver(post_save, sender=SpaceMember)
-def spacemember_activity_log_post_save(sender, instance, created, **kwargs):
+@outbox.handler('crm.member_activity', 'spacemember.created')
+def spacemember_activity_log_post_save(event):
     user = get_current_user()
     if not user or not user.is_authenticated: return
-    if created:
+    instance = SpaceMember.objects.filter(pk=event.payload['id']).select_related('user', 'space').first()
+    if instance:
         name = f"{instance.user.first_name} {instance.user.last_name}".strip() or instance.user.email
         ActivityLog.objects.create(
             space=instance.space, actor=user, action='created',
@@ -108,56 +133,45 @@ def spacemember_activity_log_post_delete(sender, instance, **kwargs):
         entity_type='Membre', entity_name=name
     )
 
-@receiver(pre_save, sender=Contract)
-def capture_old_contract_state(sender, instance, **kwargs):
-    if instance.pk:
-        try:
-            old_instance = Contract.objects.get(pk=instance.pk)
-            instance._old_status = old_instance.status
-        except Contract.DoesNotExist:
-            pass
+def _contract_signed(event):
+    status = event.payload.get('changes', {}).get('status')
+    return bool(status) and status[1] == 'signed'
 
-@receiver(post_save, sender=Contract)
-def contract_activity_log_post_save(sender, instance, created, **kwargs):
+@outbox.handler('crm.contract_activity', 'contract.created', 'contract.updated')
+def contract_activity_log_post_save(event):
     user = get_current_user()
     if not user or not user.is_authenticated: return
+    instance = outbox.load_instance(event, Contract)
+    if not instance: return
 
-    if created:
+    if event.event_type == 'contract.created':
         if instance.space:
             ActivityLog.objects.create(
                 space=instance.space, actor=user, action='created',
                 entity_type='Contrat', entity_name=instance.title
             )
     else:
-        old_status = getattr(instance, '_old_status', None)
+        status = event.payload.get('changes', {}).get('status')
         details = {}
-        if old_status and old_status != instance.status:
-            details['status'] = {'old': old_status, 'new': instance.status}
+        if status:
+            details['status'] = {'old': status[0], 'new': status[1]}
             
             # Notification on sign
-            if instance.status == 'signed' and old_status != 'signed' and instance.space:
+            if _contract_signed(event) and instance.space:
                 members = instance.space.members.exclude(id=user.id)
-                notifications = []
-                title = "Contrat signé"
-                message = f"Le contrat '{instance.title}' a été signé."
+                title, message = _contract_signed_text(instance)
                 link = f"/crm/spaces/{instance.space.id}?tab=contracts"
                 
+                # Several signings in a row end up in one digest per member
+                signed = []
                 for member in members:
-                    notifications.append(
-                        Notification(
-                            recipient=member, actor=user, type='contract_signed',
-                            title=title, message=message, link=link
-                        )
+                    notification = Notification(
+                        recipient=member, actor=user, type='contract_signed',
+                        title=title, message=message, link=link
                     )
-                    send_push_notification(
-                        user=member,
-                        title=title,
-                        body=message,
-                        data={'url': link}
-                    )
-                    
-                if notifications:
-                    Notification.objects.bulk_create(notifications)
+                    notification.digest_label = instance.title # Digests list the contract names
+                    signed.append(notification)
+                notifications.notify(signed)
 
         if details and instance.space:
             ActivityLog.objects.create(
@@ -165,6 +179,25 @@ def contract_activity_log_post_save(sender, instance, created, **kwargs):
                 entity_type='Contrat', entity_name=instance.title, details=details
             )
 
+def _contract_signed_text(contract):
+    return "Contrat signé", f"Le contrat '{contract.title}' a été signé."
+
+@outbox.handler('crm.contract_push', 'contract.updated')
+def contract_signed_push(event):
+    user = get_current_user()
+    if not user or not user.is_authenticated or not _contract_signed(event): return
+    instance = outbox.load_instance(event, Contract)
+    if not instance or not instance.space: return
+
+    # One token query and one multicast per 500 devices for the whole space,
+    # at most one push per member during the digest window
+    title, message = _contract_signed_text(instance)
+    data = {'url': f"/crm/spaces/{instance.space.id}?tab=contracts"}
+    notifications.dispatch_pushes([
+        (member_id, 'contract_signed', title, message, data, instance.title)
+        for member_id in instance.space.members.exclude(id=user.id).values_list('id', flat=True)
+    ])
+
 @receiver(post_delete, sender=Contract)
 def contract_activity_log_post_delete(sender, instance, **kwargs):
     user = get_current_user()
@@ -175,12 +208,13 @@ def contract_activity_log_post_delete(sender, instance, **kwargs):
             entity_type='Contrat', entity_name=instance.title
         )
 
-@receiver(post_save, sender=Meeting)
-def meeting_activity_log_post_save(sender, instance, created, **kwargs):
+@outbox.handler('crm.meeting_activity', 'meeting.created', 'meeting.updated')
+def meeting_activity_log_post_save(event):
     user = get_current_user()
     if not user or not user.is_authenticated: return
-    if instance.space:
-        action = 'created' if created else 'updated'
+    instance = outbox.load_instance(event, Meeting)
+    if instance and instance.space:
+        action = 'created' if event.event_type == 'meeting.created' else 'updated'
         ActivityLog.objects.create(
             space=instance.space, actor=user, action=action,
             entity_type='Réunion', entity_name=instance.title
@@ -196,11 +230,12 @@ def meeting_activity_log_post_delete(sender, instance, **kwargs):
             entity_type='Réunion', entity_name=instance.title
         )
 
-@receiver(post_save, sender=Document)
-def document_activity_log_post_save(sender, instance, created, **kwargs):
+@outbox.handler('crm.document_activity', 'document.created')
+def document_activity_log_post_save(event):
     user = get_current_user()
     if not user or not user.is_authenticated: return
-    if created and instance.space:
+    instance = outbox.load_instance(event, Document)
+    if instance and instance.space:
         ActivityLog.objects.create(
             space=instance.space, actor=user, action='created',
             entity_type='Document', entity_name=instance.name
@@ -215,3 +250,35 @@ def document_activity_log_post_delete(sender, instance, **kwargs):
             space=instance.space, actor=user, action='deleted',
             entity_type='Document', entity_name=instance.name
         )
+
+@realtime.broadcaster(ActivityLog)
+def activity_messages(activities):
+    """Sent to the admins of the space only, the readers of its log (ActivityLogViewSet)."""
+    from .serializers import ActivityLogSerializer
+    admins = {}
+    for space_id, user_id in SpaceMember.objects.filter(
+        space_id__in={activity.space_id for activity in activities}, role='admin'
+    ).values_list('space_id', 'user_id'):
+        admins.setdefault(space_id, []).append(user_id)
+    data = ActivityLogSerializer(activities, many=True).data
+    return [
+        (realtime.user_channel(user_id), {'type': 'activity.created', 'space_id': activity.space_id, 'activity': item})
+        for activity, item in zip(activities, data)
+        for user_id in admins.get(activity.space_id, ())
+    ]
+
+# Dashboard rollups per month and status, kept in the transaction of the change
+analytics.track(Contract, 'contract', amount_field='amount')
+
+# --- Global search entries (core/search.py) ---
+
+@search.indexed(Space, 'space')
+def space_search_entry(space):
+    return search.Entry(space.organization_id, space.name, 'Space', f'/crm/spaces/{space.id}')
+
+@search.indexed(Contact, 'contact')
+def contact_search_entry(contact):
+    return search.Entry(
+        contact.organization_id, f"{contact.first_name} {contact.last_name}", contact.position or 'Contact',
+        f'/crm/contacts/{contact.id}', text=contact.email or ''
+    )
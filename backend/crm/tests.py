@@ -1,3 +1,117 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from core.models import Organization
+from core.testing import QueryCountMixin
+from crm.models import Space, SpaceType, Contact, Contract, Meeting, Document, SpaceMember, ActivityLog
 
-# Create your tests here.
+User = get_user_model()
+
+
+class ListQueryCountTest(QueryCountMixin, TestCase):
+
+    def setUp(self):
+        self.org = Organization.objects.create(name="Org Lists")
+        self.user = User.objects.create_user(username='lists', email='lists@test.com', password='pw', organization=self.org)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.space_type = SpaceType.objects.create(name="Client", organization=self.org)
+        self.space = Space.objects.create(name="Acme", type=self.space_type, organization=self.org)
+        SpaceMember.objects.create(space=self.space, user=self.user, role='admin')
+        self.counter = 0
+
+    def author(self):
+        self.counter += 1
+        return User.objects.create_user(
+            username=f'author{self.counter}', email=f'author{self.counter}@test.com', password='pw',
+            first_name="Auteur", organization=self.org
+        )
+
+    def test_contracts(self):
+        self.assertConstantQueries('/api/crm/contracts/', lambda: Contract.objects.create(
+            title="Contrat", space=Space.objects.create(name="Client", organization=self.org),
+            organization=self.org, created_by=self.author()
+        ))
+
+    def test_meetings(self):
+        self.assertConstantQueries('/api/crm/meetings/', lambda: Meeting.objects.create(
+            title="Point", space=Space.objects.create(name="Client", organization=self.org), organization=self.org
+        ))
+
+    def test_documents(self):
+        def create():
+            space = Space.objects.create(name="Client", organization=self.org)
+            contract = Contract.objects.create(title="Contrat", space=space, organization=self.org)
+            Document.objects.create(name="Annexe", file='documents/annexe.pdf', space=space, contract=contract, organization=self.org)
+        self.assertConstantQueries('/api/crm/documents/', create)
+
+    def test_space_members(self):
+        self.assertConstantQueries('/api/crm/space-members/', lambda: SpaceMember.objects.create(
+            space=self.space, user=self.author(), role='editor'
+        ))
+
+    def test_spaces_with_nested_rows(self):
+        def create():
+            space = Space.objects.create(name="Client", type=self.space_type, organization=self.org)
+            Contact.objects.create(first_name="Ana", last_name="Lopez", space=space, organization=self.org)
+            Contract.objects.create(title="Contrat", space=space, organization=self.org, created_by=self.author())
+            Meeting.objects.create(title="Point", space=space, organization=self.org)
+        self.assertConstantQueries('/api/crm/spaces/', create)
+        self.assertConstantQueries('/api/crm/spaces/', create, params={'expand': 'contacts,contracts,meetings'})
+
+    def test_activity_log(self):
+        self.assertConstantQueries(
+            '/api/crm/activities/',
+            lambda: ActivityLog.objects.create(space=self.space, actor=self.author(), action='created', entity_type='Contrat', entity_name="C"),
+            params={'space': str(self.space.id)}
+        )
+
+
+class SpaceListTest(TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="Org Spaces")
+        self.user = User.objects.create_user(username='spaces', email='spaces@test.com', password='pw', organization=self.org)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.space = Space.objects.create(name="Acme", organization=self.org)
+        SpaceMember.objects.create(space=self.space, user=self.user, role='admin')
+        for i in range(10):
+            Contact.objects.create(first_name=f"Contact{i}", last_name="Acme", space=self.space, organization=self.org)
+        for i in range(5):
+            Contract.objects.create(title=f"Contrat {i}", space=self.space, organization=self.org, extracted_text="x" * 5000)
+        Space.objects.create(name="Vide", organization=self.org)
+
+    def spaces(self, **params):
+        response = self.client.get('/api/crm/spaces/', params)
+        self.assertEqual(response.status_code, 200)
+        return {space['name']: space for space in response.data['results']}
+
+    def test_list_shows_counts_and_previews(self):
+        spaces = self.spaces()
+        acme = spaces["Acme"]
+        self.assertNotIn('contacts', acme)
+        self.assertNotIn('contracts', acme)
+        self.assertEqual((acme['contacts_count'], acme['contracts_count'], acme['meetings_count']), (10, 5, 0))
+        self.assertEqual([contact['first_name'] for contact in acme['contacts_preview']], ["Contact9", "Contact8", "Contact7"])
+        self.assertEqual(set(acme['contracts_preview'][0]), {'id', 'title', 'status', 'amount'})
+        self.assertEqual((spaces["Vide"]['contacts_count'], spaces["Vide"]['contacts_preview']), (0, []))
+
+    def test_previews_load_only_the_shown_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.spaces()
+        previews = [query['sql'] for query in queries if 'preview_rank' in query['sql']]
+        self.assertEqual(len(previews), 3)
+        for column in ('extracted_text', 'content', 'notes', 'email'):
+            self.assertFalse([sql for sql in previews if f'."{column}"' in sql], column)
+
+    def test_expand_and_detail_nest_the_full_lists(self):
+        acme = self.spaces(expand='contacts')["Acme"]
+        self.assertEqual(len(acme['contacts']), 10)
+        self.assertNotIn('contacts_preview', acme)
+        self.assertEqual(len(acme['contracts_preview']), 3)
+
+        detail = self.client.get(f'/api/crm/spaces/{self.space.id}/').data
+        self.assertEqual((len(detail['contacts']), len(detail['contracts'])), (10, 5))
+        self.assertEqual(len(detail['contracts'][0]['extracted_text']), 5000)
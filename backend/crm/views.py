@@ -1,13 +1,15 @@
 from rest_framework import viewsets, permissions
-from django.db.models import Q
+from django.db.models import Q, F, Prefetch, Count, OuterRef, Subquery, Window
+from django.db.models.functions import Coalesce, RowNumber
 from core.permissions import HasGeminiSecret, SpaceRolePermission
-from core.mixins import OrganizationScopeMixin
+from core.mixins import OrganizationScopeMixin, SparseFieldsMixin
+from core.pagination import KeysetPagination
 
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
 from .models import Space, Contact, Contract, Meeting, Document, MeetingTemplate, SharedLink, ContractTemplate, SpaceType, SpaceMember, ActivityLog
-from .serializers import SpaceSerializer, ContactSerializer, ContractSerializer, MeetingSerializer, DocumentSerializer, MeetingTemplateSerializer, SharedLinkSerializer, ContractTemplateSerializer, SpaceTypeSerializer, SpaceMemberSerializer, ActivityLogSerializer
+from .serializers import SpaceSerializer, SpaceListSerializer, ContactSerializer, ContractSerializer, MeetingSerializer, DocumentSerializer, MeetingTemplateSerializer, SharedLinkSerializer, ContractTemplateSerializer, SpaceTypeSerializer, SpaceMemberSerializer, ActivityLogSerializer
 
 class ContractTemplateViewSet(OrganizationScopeMixin, viewsets.ModelViewSet):
     queryset = ContractTemplate.objects.all()
@@ -19,6 +21,8 @@ class SpaceTypeViewSet(OrganizationScopeMixin, viewsets.ModelViewSet):
     serializer_class = SpaceTypeSerializer
     permission_classes = [HasGeminiSecret]
 
+# Querysets load what their serializer reads: one query per list, whatever the page size (crm/tests.py)
+
 class SpaceMemberViewSet(viewsets.ModelViewSet):
     queryset = SpaceMember.objects.all()
     serializer_class = SpaceMemberSerializer
@@ -30,10 +34,42 @@ class SpaceMemberViewSet(viewsets.ModelViewSet):
         user = self.request.user
         if not user.is_authenticated or not hasattr(user, 'organization'):
             return SpaceMember.objects.none()
-        return SpaceMember.objects.filter(space__organization=user.organization)
-
-class SpaceViewSet(OrganizationScopeMixin, viewsets.ModelViewSet):
-    queryset = Space.objects.all()
+        return SpaceMember.objects.filter(space__organization=user.organization).select_related('user')
+
+def _count_per_space(model):
+    """Rows of model per space, as a subquery (no join multiplying the spaces)."""
+    counts = model.objects.filter(space=OuterRef('pk')).order_by().values('space').annotate(count=Count('pk')).values('count')
+    return Coalesce(Subquery(counts), 0)
+
+def _latest_per_space(lookup, queryset, size):
+    """The size latest rows of each space, in space.preview_<lookup>."""
+    ranked = queryset.annotate(
+        preview_rank=Window(RowNumber(), partition_by=F('space_id'), order_by=F('created_at').desc())
+    ).filter(preview_rank__lte=size).order_by('-created_at')
+    return Prefetch(lookup, queryset=ranked, to_attr=f'preview_{lookup}')
+
+class SpaceViewSet(SparseFieldsMixin, OrganizationScopeMixin, viewsets.ModelViewSet):
+    """
+    The list shows counts and PREVIEW_SIZE latest contacts, contracts and
+    meetings per space (SpaceListSerializer); ?expand=contacts,contracts,meetings
+    nests the full lists. Other actions always nest them.
+    """
+    PREVIEW_SIZE = 3
+    # Nested contracts and meetings get their space from the prefetch
+    NESTED = {
+        'contacts': 'contacts',
+        'contracts': Prefetch('contracts', queryset=Contract.objects.select_related('organization', 'created_by')),
+        'meetings': 'meetings',
+    }
+    # Only the columns of the *PreviewSerializer, plus the window's: not the
+    # extracted text and content of every contract
+    PREVIEWS = {
+        'contacts': Contact.objects.only('id', 'first_name', 'last_name', 'position', 'space_id', 'created_at'),
+        'contracts': Contract.objects.only('id', 'title', 'status', 'amount', 'space_id', 'created_at'),
+        'meetings': Meeting.objects.only('id', 'title', 'date', 'space_id', 'created_at'),
+    }
+
+    queryset = Space.objects.select_related('type').prefetch_related('members')
     serializer_class = SpaceSerializer
     permission_classes = [HasGeminiSecret, SpaceRolePermission]
 
@@ -41,13 +77,36 @@ class SpaceViewSet(OrganizationScopeMixin, viewsets.ModelViewSet):
 
     filterset_fields = ['name', 'industry']
 
+    def get_expand(self):
+        if self.action != 'list':
+            return set(self.NESTED)
+        requested = self.request.query_params.get('expand', '')
+        return {name.strip() for name in requested.split(',')} & set(self.NESTED)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        expand = self.get_expand()
+        queryset = queryset.prefetch_related(*[self.NESTED[name] for name in expand])
+        if self.action == 'list':
+            queryset = queryset.annotate(**{
+                f'{name}_count': _count_per_space(preview.model) for name, preview in self.PREVIEWS.items()
+            }).prefetch_related(*[
+                _latest_per_space(name, preview, self.PREVIEW_SIZE) for name, preview in self.PREVIEWS.items() if name not in expand
+            ])
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == 'list':
+            return SpaceListSerializer
+        return super().get_serializer_class()
+
     def perform_create(self, serializer):
         # Create the space
         space = serializer.save(organization=self.request.user.organization)
         # Create the admin member link using the current user
         SpaceMember.objects.create(space=space, user=self.request.user, role='admin')
 
-class ContactViewSet(OrganizationScopeMixin, viewsets.ModelViewSet):
+class ContactViewSet(SparseFieldsMixin, OrganizationScopeMixin, viewsets.ModelViewSet):
     queryset = Contact.objects.all()
     serializer_class = ContactSerializer
     permission_classes = [HasGeminiSecret, SpaceRolePermission]
@@ -56,8 +115,8 @@ class ContactViewSet(OrganizationScopeMixin, viewsets.ModelViewSet):
 
     filterset_fields = ['space', 'email']
 
-class ContractViewSet(OrganizationScopeMixin, viewsets.ModelViewSet):
-    queryset = Contract.objects.all()
+class ContractViewSet(SparseFieldsMixin, OrganizationScopeMixin, viewsets.ModelViewSet):
+    queryset = Contract.objects.select_related('space', 'organization', 'created_by')
     serializer_class = ContractSerializer
     permission_classes = [HasGeminiSecret, SpaceRolePermission]
 
@@ -71,8 +130,8 @@ class ContractViewSet(OrganizationScopeMixin, viewsets.ModelViewSet):
             created_by=self.request.user
         )
 
-class MeetingViewSet(OrganizationScopeMixin, viewsets.ModelViewSet):
-    queryset = Meeting.objects.all()
+class MeetingViewSet(SparseFieldsMixin, OrganizationScopeMixin, viewsets.ModelViewSet):
+    queryset = Meeting.objects.select_related('space')
     serializer_class = MeetingSerializer
     permission_classes = [HasGeminiSecret, SpaceRolePermission]
 
@@ -92,8 +151,8 @@ class MeetingViewSet(OrganizationScopeMixin, viewsets.ModelViewSet):
             created_by=self.request.user
         )
 
-class DocumentViewSet(OrganizationScopeMixin, viewsets.ModelViewSet):
-    queryset = Document.objects.all()
+class DocumentViewSet(SparseFieldsMixin, OrganizationScopeMixin, viewsets.ModelViewSet):
+    queryset = Document.objects.select_related('space', 'contract')
     serializer_class = DocumentSerializer
     permission_classes = [HasGeminiSecret, SpaceRolePermission]
     filter_backends = [DjangoFilterBackend]
@@ -131,6 +190,8 @@ class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = [HasGeminiSecret, SpaceRolePermission]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['space']
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-timestamp', '-id')
 
     def get_queryset(self):
         user = self.request.user
@@ -140,9 +201,9 @@ class ActivityLogViewSet(viewsets.ReadOnlyModelViewSet):
             return ActivityLog.objects.none()
             
         # Ensure user is an admin of this space
-        member = SpaceMember.objects.filter(space_id=space_id, user=user).first()
-        if not member or member.role != 'admin':
+        from core import memberships
+        if memberships.role(self.request, space_id) != 'admin':
             return ActivityLog.objects.none()
             
-        return ActivityLog.objects.filter(space_id=space_id, space__organization=user.organization)
+        return ActivityLog.objects.filter(space_id=space_id, space__organization=user.organization).select_related('actor')
 
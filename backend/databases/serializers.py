@@ -1,15 +1,16 @@
 from rest_framework import serializers
 from .models import Database, Property, PropertyValue
 from pages.models import Page
+from core.serializers import DynamicFieldsMixin
 
-class PropertySerializer(serializers.ModelSerializer):
+class PropertySerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     database = serializers.ReadOnlyField(source='database.id')
 
     class Meta:
         model = Property
         fields = '__all__'
 
-class PropertyValueSerializer(serializers.ModelSerializer):
+class PropertyValueSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     property_name = serializers.ReadOnlyField(source='property.name')
     property_type = serializers.ReadOnlyField(source='property.type')
 
@@ -17,7 +18,7 @@ class PropertyValueSerializer(serializers.ModelSerializer):
         model = PropertyValue
         fields = '__all__'
 
-class DatabaseSerializer(serializers.ModelSerializer):
+class DatabaseSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     properties = PropertySerializer(many=True, read_only=True)
 
     class Meta:
@@ -0,0 +1,8 @@
+from core import search
+from .models import Database
+
+@search.indexed(Database, 'database', organization_lookup='page__organization')
+def database_search_entry(database):
+    # Databases belong to an organization through their page
+    organization_id = database.page.organization_id if database.page_id else None
+    return search.Entry(organization_id, database.title, 'Database', f'/databases/{database.id}')
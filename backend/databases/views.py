@@ -1,11 +1,12 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from core.mixins import SparseFieldsMixin
 from .models import Database, Property, PropertyValue
 from pages.models import Page
 from .serializers import DatabaseSerializer, PropertySerializer, RowSerializer, PropertyValueSerializer
 
-class DatabaseViewSet(viewsets.ModelViewSet):
+class DatabaseViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     queryset = Database.objects.all()
     serializer_class = DatabaseSerializer
 
@@ -106,6 +107,6 @@ class DatabaseViewSet(viewsets.ModelViewSet):
             return Response(serializer.data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
-class PropertyValueViewSet(viewsets.ModelViewSet):
+class PropertyValueViewSet(SparseFieldsMixin, viewsets.ModelViewSet):
     queryset = PropertyValue.objects.all()
     serializer_class = PropertyValueSerializer
@@ -1,10 +1,13 @@
 import os
 import datetime
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
 from django.conf import settings
+from core.lazy import LazyImport
 from .models import UserIntegration
 
+# Google API client and requests are imported on first call, not when crm.signals loads
+Credentials = LazyImport('google.oauth2.credentials', 'Credentials')
+build = LazyImport('googleapiclient.discovery', 'build')
+
 class GoogleCalendarService:
     SCOPES = ['https://www.googleapis.com/auth/calendar']
 
@@ -72,7 +75,7 @@ class GoogleCalendarService:
             print(f"Error creating Google Calendar event: {str(e)}")
             return None
 
-import requests
+requests = LazyImport('requests')
 
 class GithubService:
     BASE_URL = "https://api.github.com"
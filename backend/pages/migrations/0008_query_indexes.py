@@ -0,0 +1,17 @@
+# Generated by Django 4.2.26 on 2026-10-19 17:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('pages', '0007_alter_page_space'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='page',
+            index=models.Index(fields=['organization', '-updated_at'], name='page_org_updated_idx'),
+        ),
+    ]
@@ -22,6 +22,10 @@ class Page(models.Model):
 
     class Meta:
         ordering = ['title']
+        indexes = [
+            # Recently updated pages (dashboard)
+            models.Index(fields=['organization', '-updated_at'], name='page_org_updated_idx'),
+        ]
 
     def save(self, *args, **kwargs):
         # Calculate path before saving
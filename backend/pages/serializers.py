@@ -1,13 +1,17 @@
 from rest_framework import serializers
+from core.serializers import DynamicFieldsMixin
 from .models import Page
 
-class PageSerializer(serializers.ModelSerializer):
+class PageSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     database_id = serializers.ReadOnlyField(source='database_schema.id')
 
     class Meta:
         model = Page
         fields = '__all__'
         read_only_fields = ('path', 'created_at', 'updated_at')
+        # Full Editor.js document: in lists only with ?expand=content
+        heavy_fields = ('content',)
+        expandable_fields = {'space': None, 'parent': None}
 
 class PageTreeSerializer(serializers.ModelSerializer):
     children = serializers.SerializerMethodField()
@@ -18,5 +22,9 @@ class PageTreeSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'path', 'page_type', 'children', 'database_id']
 
     def get_children(self, obj):
-        children = obj.children.all().order_by('title')
-        return PageTreeSerializer(children, many=True).data
+        if 'children' in self.context:
+            # {parent id: pages}, built by PageViewSet.tree
+            children = self.context['children'].get(obj.id, [])
+        else:
+            children = obj.children.all().order_by('title')
+        return PageTreeSerializer(children, many=True, context=self.context).data
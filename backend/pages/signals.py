@@ -0,0 +1,16 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from core import outbox, search
+from .models import Page
+
+@receiver(post_save, sender=Page)
+def publish_page_saved(sender, instance, created, **kwargs):
+    outbox.publish_instance(instance, 'created' if created else 'updated')
+
+@receiver(post_delete, sender=Page)
+def publish_page_deleted(sender, instance, **kwargs):
+    outbox.publish_instance(instance, 'deleted')
+
+@search.indexed(Page, 'page')
+def page_search_entry(page):
+    return search.Entry(page.organization_id, page.title, 'Page', f'/pages/{page.id}')
@@ -1,3 +1,32 @@
 from django.test import TestCase
+from django.contrib.auth import get_user_model
+from rest_framework.test import APIClient
+from core.models import Organization
+from core.testing import QueryCountMixin
+from databases.models import Database
+from pages.models import Page
 
-# Create your tests here.
+User = get_user_model()
+
+
+class PageListQueryCountTest(QueryCountMixin, TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="Org Pages")
+        self.user = User.objects.create_user(username='pages', email='pages@test.com', password='pw', organization=self.org)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_page_tree(self):
+        root = Page.objects.create(title=f"Racine {Page.objects.count()}", organization=self.org)
+        child = Page.objects.create(title="Enfant", parent=root, organization=self.org)
+        Page.objects.create(title="Petit-enfant", parent=child, organization=self.org)
+        Database.objects.create(title="Base", page=child)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.assertConstantQueries(['/api/pages/', '/api/pages/tree/'], self.create_page_tree)
+
+        root = self.client.get('/api/pages/tree/').data[0]
+        self.assertEqual(root['title'], "Racine 0")
+        self.assertEqual([child['title'] for child in root['children']], ["Enfant"])
+        self.assertIsNotNone(root['children'][0]['database_id'])
+        self.assertEqual([page['title'] for page in root['children'][0]['children']], ["Petit-enfant"])
@@ -1,17 +1,21 @@
 from rest_framework import viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from core.mixins import OrganizationScopeMixin
+from core.mixins import OrganizationScopeMixin, SparseFieldsMixin
 from .models import Page
 from .serializers import PageSerializer, PageTreeSerializer
 
-class PageViewSet(OrganizationScopeMixin, viewsets.ModelViewSet):
-    queryset = Page.objects.all()
+class PageViewSet(SparseFieldsMixin, OrganizationScopeMixin, viewsets.ModelViewSet):
+    queryset = Page.objects.select_related('database_schema')
     serializer_class = PageSerializer
 
     @action(detail=False, methods=['get'])
     def tree(self, request):
+        # One query for the whole tree, children are looked up in memory
+        children = {}
+        for page in self.get_queryset().defer('content').order_by('title'):
+            children.setdefault(page.parent_id, []).append(page)
         # Get root pages (no parent)
-        root_pages = self.get_queryset().filter(parent__isnull=True).order_by('title')
-        serializer = PageTreeSerializer(root_pages, many=True)
+        root_pages = children.get(None, [])
+        serializer = PageTreeSerializer(root_pages, many=True, context={'children': children})
         return Response(serializer.data)
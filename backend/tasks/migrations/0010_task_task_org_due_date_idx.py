@@ -0,0 +1,17 @@
+# Generated by Django 4.2.26 on 2026-10-19 17:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0009_alter_task_space'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['organization', 'due_date'], name='task_org_due_date_idx'),
+        ),
+    ]
@@ -1,8 +1,9 @@
 from django.db import models
 from django.conf import settings
 import uuid
+from core.models import ChangeTrackingMixin
 
-class Task(models.Model):
+class Task(ChangeTrackingMixin, models.Model):
     STATUS_CHOICES = (
         ('draft', 'Draft'),
         ('todo', 'To Do'),
@@ -37,6 +38,16 @@ class Task(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Range scans on due dates (scheduled automations)
+            models.Index(fields=['organization', 'due_date'], name='task_org_due_date_idx'),
+            # Status filters ordered/ranged by due date (list_tasks, kanban, analyze_data)
+            models.Index(fields=['organization', 'status', 'due_date'], name='task_org_status_due_idx'),
+            # Urgent tasks ordered by due date (dashboard, analyze_data)
+            models.Index(fields=['organization', 'priority', 'due_date'], name='task_org_priority_due_idx'),
+            # Default ordering of the task lists
+            models.Index(fields=['organization', '-created_at'], name='task_org_created_idx'),
+        ]
 
     def __str__(self):
         return self.title
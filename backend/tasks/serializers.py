@@ -1,8 +1,9 @@
 from rest_framework import serializers
 from .models import Task
+from core.serializers import DynamicFieldsMixin
 from core.validators import validate_cross_organization_reference
 
-class TaskSerializer(serializers.ModelSerializer):
+class TaskSerializer(DynamicFieldsMixin, serializers.ModelSerializer):
     assigned_to_name = serializers.ReadOnlyField(source='assigned_to.username')
     space_name = serializers.SerializerMethodField()
 
@@ -23,6 +24,7 @@ class TaskSerializer(serializers.ModelSerializer):
         model = Task
         fields = '__all__'
         read_only_fields = ['organization']
+        expandable_fields = {'space': None, 'contract': None, 'contact': None}
 
     def validate(self, data):
         # Skip this validation for public access (anonymous users)
@@ -1,119 +1,170 @@
-from django.db.models.signals import post_save, pre_save, post_delete
-from django.dispatch import receiver
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver, Signal
 from crum import get_current_user
 from tasks.models import Task
 from crm.models import ActivityLog
-from core.models import Notification
-from core.services.fcm import send_push_notification
+from core.models import Notification, User
+from core.notifications import notify, dispatch_pushes
+from core import analytics, dashboard, outbox, search
 
-@receiver(pre_save, sender=Task)
-def capture_old_task_state(sender, instance, **kwargs):
+# Sent after Task.objects.bulk_create (which skips post_save) with
+# instances=[Task, ...] and user=the creator.
+tasks_bulk_created = Signal()
+
+# Dashboard rollups per month and status, kept in the transaction of the change
+analytics.track(Task, 'task')
+
+@search.indexed(Task, 'task')
+def task_search_entry(task):
+    return search.Entry(task.organization_id, task.title, f"Task ({task.status})", '/tasks')
+
+@receiver(post_save, sender=Task)
+def publish_task_saved(sender, instance, created, update_fields=None, **kwargs):
     """
-    Capture the state of the task before it is saved so we can compare
-    changes in post_save.
+    Records the change in the outbox, side effects run after commit.
+    The diff comes from the values loaded with the task (ChangeTrackingMixin),
+    a save that changes nothing publishes nothing.
     """
-    if instance.pk:
-        try:
-            old_instance = Task.objects.get(pk=instance.pk)
-            instance._old_status = old_instance.status
-            instance._old_assigned_to = old_instance.assigned_to
-        except Task.DoesNotExist:
-            pass
+    changes = {} if created else instance.get_changes(update_fields)
+    if not created and not changes:
+        return
 
-@receiver(post_save, sender=Task)
-def task_post_save_actions(sender, instance, created, **kwargs):
+    outbox.publish_instance(instance, 'created' if created else 'updated', changes=changes)
+
+@receiver(tasks_bulk_created)
+def publish_tasks_bulk_created(sender, instances, user=None, **kwargs):
+    analytics.record_created(Task, instances)
+    search.update_entries(Task, instances)
+    dashboard.invalidate(
+        organization_ids=[instance.organization_id for instance in instances],
+        user_ids=[instance.assigned_to_id for instance in instances]
+    )
+    outbox.publish('task.bulk_created', {'ids': [str(instance.id) for instance in instances]}, actor=user)
+
+def _assignment_notification(task, reassigned=False):
+    title = f"{'Tâche réassignée' if reassigned else 'Nouvelle tâche assignée'}: {task.title}"
+    message = f"La tâche '{task.title}' vous a été assignée."
+    return title, message
+
+def _full_name(user):
+    return f"{user.first_name} {user.last_name}".strip() if user else None
+
+def _notified_tasks(event):
+    """(task, reassigned) pairs whose assignee must be notified for this event."""
+    user = get_current_user()
+    if event.event_type == 'task.bulk_created':
+        tasks = Task.objects.filter(id__in=event.payload.get('ids', [])).select_related('assigned_to')
+        return [(task, False) for task in tasks if task.assigned_to_id and task.assigned_to != user]
+
+    task = outbox.load_instance(event, Task)
+    if not task or not task.assigned_to_id or task.assigned_to == user:
+        return []
+    if event.event_type == 'task.created':
+        return [(task, False)]
+    if 'assigned_to' in event.payload.get('changes', {}):
+        return [(task, True)]
+    return []
+
+@outbox.handler('tasks.activity', 'task.created', 'task.updated', 'task.bulk_created')
+def task_activity(event):
     """
-    Handle ActivityLog and Notifications using django-crum to get the user.
+    Handle ActivityLog and Notifications, the user is the actor of the event.
     """
     user = get_current_user()
-    
+
     # We only log actions if there is an active user (e.g. not management commands)
     if not user or not user.is_authenticated:
         return
 
     # 1. Handle Creation
-    if created:
-        if hasattr(instance, 'space') and instance.space:
-            ActivityLog.objects.create(
-                space=instance.space,
-                actor=user,
-                action='created',
-                entity_type='Tâche',
-                entity_name=instance.title
-            )
-        
-        # Notification on assignment
-        if instance.assigned_to and instance.assigned_to != user:
-            title = f"Nouvelle tâche assignée: {instance.title}"
-            message = f"La tâche '{instance.title}' vous a été assignée."
-            Notification.objects.create(
-                recipient=instance.assigned_to,
-                actor=user,
-                type='task_assigned',
-                title=title,
-                message=message,
-                link='/tasks'
-            )
-            send_push_notification(
-                user=instance.assigned_to,
-                title=title,
-                body=message,
-                data={'url': '/tasks'}
-            )
-            
-    # 2. Handle Update
+    if event.event_type == 'task.bulk_created':
+        tasks = list(Task.objects.filter(id__in=event.payload.get('ids', [])).select_related('space'))
+        ActivityLog.objects.bulk_create([
+            ActivityLog(space=task.space, actor=user, action='created', entity_type='Tâche', entity_name=task.title)
+            for task in tasks if task.space_id
+        ])
     else:
-        old_status = getattr(instance, '_old_status', None)
-        old_assignee = getattr(instance, '_old_assigned_to', None)
-        
-        details = {}
-        if old_status and old_status != instance.status:
-            details['status'] = {
-                'old': old_status,
-                'new': instance.status
-            }
-            
-        if hasattr(instance, '_old_assigned_to') and old_assignee != instance.assigned_to:
-            details['assignee'] = {
-                'old': f"{old_assignee.first_name} {old_assignee.last_name}".strip() if old_assignee else None,
-                'new': f"{instance.assigned_to.first_name} {instance.assigned_to.last_name}".strip() if instance.assigned_to else None,
-            }
-            
-            # Notification on re-assignment
-            if instance.assigned_to and instance.assigned_to != user:
-                title = f"Tâche réassignée: {instance.title}"
-                message = f"La tâche '{instance.title}' vous a été assignée."
-                Notification.objects.create(
-                    recipient=instance.assigned_to,
+        task = outbox.load_instance(event, Task)
+        if not task:
+            return
+
+        if event.event_type == 'task.created':
+            if task.space:
+                ActivityLog.objects.create(
+                    space=task.space,
                     actor=user,
-                    type='task_assigned',
-                    title=title,
-                    message=message,
-                    link='/tasks'
+                    action='created',
+                    entity_type='Tâche',
+                    entity_name=task.title
                 )
-                send_push_notification(
-                    user=instance.assigned_to,
-                    title=title,
-                    body=message,
-                    data={'url': '/tasks'}
+
+        # 2. Handle Update
+        else:
+            changes = event.payload.get('changes', {})
+            details = {}
+            if 'status' in changes:
+                details['status'] = {
+                    'old': changes['status'][0],
+                    'new': changes['status'][1]
+                }
+
+            if 'assigned_to' in changes:
+                assignees = {str(pk): assignee for pk, assignee in User.objects.in_bulk([pk for pk in changes['assigned_to'] if pk]).items()}
+                old_id, new_id = changes['assigned_to']
+                details['assignee'] = {
+                    'old': _full_name(assignees.get(old_id)),
+                    'new': _full_name(assignees.get(new_id)),
+                }
+
+            if details and task.space:
+                ActivityLog.objects.create(
+                    space=task.space,
+                    actor=user,
+                    action='updated',
+                    entity_type='Tâche',
+                    entity_name=task.title,
+                    details=details
                 )
 
-        if details and hasattr(instance, 'space') and instance.space:
-            ActivityLog.objects.create(
-                space=instance.space,
-                actor=user,
-                action='updated',
-                entity_type='Tâche',
-                entity_name=instance.title,
-                details=details
-            )
+    # Notification on assignment / re-assignment
+    notifications = []
+    for task, reassigned in _notified_tasks(event):
+        title, message = _assignment_notification(task, reassigned)
+        notifications.append(Notification(
+            recipient=task.assigned_to,
+            actor=user,
+            type='task_assigned',
+            title=title,
+            message=message,
+            link='/tasks'
+        ))
+    # One digest per assignee, however many tasks the event touched
+    notify(notifications)
+
+@outbox.handler('tasks.push', 'task.created', 'task.updated', 'task.bulk_created')
+def task_push(event):
+    """
+    Push notifications are delivered separately so a Firebase failure only
+    retries the push, not the activity log.
+    """
+    user = get_current_user()
+    if not user or not user.is_authenticated:
+        return
+
+    entries = []
+    for task, reassigned in _notified_tasks(event):
+        title, message = _assignment_notification(task, reassigned)
+        entries.append((task.assigned_to_id, 'task_assigned', title, message, {'url': '/tasks'}))
+    dispatch_pushes(entries)
 
 @receiver(post_delete, sender=Task)
 def task_post_delete_actions(sender, instance, **kwargs):
+    outbox.publish_instance(instance, 'deleted')
+
     user = get_current_user()
     if not user or not user.is_authenticated:
         return
-        
+
     if hasattr(instance, 'space') and instance.space:
         ActivityLog.objects.create(
             space=instance.space,
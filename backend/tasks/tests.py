@@ -1,9 +1,11 @@
 from django.test import TestCase
 from django.contrib.auth import get_user_model
 from rest_framework.test import APIClient
+from rest_framework import status
 from core.models import Organization
+from core.testing import QueryCountMixin
+from crm.models import Space, Contact
 from tasks.models import Task
-from rest_framework import status
 
 User = get_user_model()
 
@@ -52,3 +54,19 @@ class OrganizationIsolationTest(TestCase):
         task_ids = [task['id'] for task in response.data['results']]
         self.assertIn(str(self.task_a.id), task_ids)
         self.assertIn(str(self.task_b.id), task_ids)
+
+
+class TaskListQueryCountTest(QueryCountMixin, TestCase):
+    def setUp(self):
+        self.org = Organization.objects.create(name="Org Task Lists")
+        self.user = User.objects.create_user(username='tasklists', email='tasklists@test.com', password='pw', organization=self.org)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_task(self):
+        space = Space.objects.create(name="Client", organization=self.org)
+        contact = Contact.objects.create(first_name="Ana", last_name="Lopez", space=space, organization=self.org)
+        Task.objects.create(title="Relance", space=space, contact=contact, assigned_to=self.user, organization=self.org)
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.assertConstantQueries(['/api/tasks/', '/api/tasks/kanban/'], self.create_task)
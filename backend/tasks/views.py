@@ -1,18 +1,19 @@
 from rest_framework import viewsets, permissions
 from core.permissions import HasGeminiSecret, SpaceRolePermission
-from core.mixins import OrganizationScopeMixin
+from core.mixins import OrganizationScopeMixin, SparseFieldsMixin
+from core.pagination import KeysetPagination
 
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from .models import Task
 from .serializers import TaskSerializer
 
-class TaskViewSet(OrganizationScopeMixin, viewsets.ModelViewSet):
-    queryset = Task.objects.all()
+class TaskViewSet(SparseFieldsMixin, OrganizationScopeMixin, viewsets.ModelViewSet):
+    queryset = Task.objects.select_related('space', 'assigned_to', 'contact')
     serializer_class = TaskSerializer
     permission_classes = [HasGeminiSecret, SpaceRolePermission]
-
-
+    pagination_class = KeysetPagination
+    keyset_ordering = ('-created_at', '-id')
 
     @action(detail=False, methods=['get'])
     def kanban(self, request):
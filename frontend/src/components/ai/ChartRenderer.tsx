@@ -13,11 +13,16 @@ interface ChartRendererProps {
         y: string;
     };
     description?: string;
+    // Several bars/lines (e.g. one per industry): keys of data, with their display names
+    series?: string[];
+    labels?: Record<string, string>;
 }
 
 const COLORS = ['#6366f1', '#8b5cf6', '#ec4899', '#f43f5e', '#10b981', '#3b82f6'];
 
-const ChartRenderer: React.FC<ChartRendererProps> = ({ type, data, title, dataKeys, description }) => {
+const ChartRenderer: React.FC<ChartRendererProps> = ({ type, data, title, dataKeys, description, series, labels }) => {
+    const keys = series && series.length > 0 ? series : [dataKeys.y];
+    const multiple = keys.length > 1;
 
     // Formatting for Tooltip
     const formatValue = (value: number) => {
@@ -37,7 +42,10 @@ const ChartRenderer: React.FC<ChartRendererProps> = ({ type, data, title, dataKe
                             contentStyle={{ borderRadius: '12px', border: 'none', boxShadow: '0 4px 6px -1px rgb(0 0 0 / 0.1)' }}
                             cursor={{ fill: '#f3f4f6' }}
                         />
-                        <Bar dataKey={dataKeys.y} fill="url(#colorGradient)" radius={[4, 4, 0, 0]} />
+                        {keys.map((key, index) => (
+                            <Bar key={key} dataKey={key} name={labels?.[key] ?? key} fill={multiple ? COLORS[index % COLORS.length] : 'url(#colorGradient)'} radius={[4, 4, 0, 0]} />
+                        ))}
+                        {multiple && <Legend verticalAlign="bottom" height={36} iconType="circle" wrapperStyle={{ fontSize: '11px' }} />}
                         <defs>
                             <linearGradient id="colorGradient" x1="0" y1="0" x2="0" y2="1">
                                 <stop offset="0%" stopColor="#6366f1" stopOpacity={1} />
@@ -53,7 +61,10 @@ const ChartRenderer: React.FC<ChartRendererProps> = ({ type, data, title, dataKe
                         <XAxis dataKey={dataKeys.x} tick={{ fontSize: 10 }} axisLine={false} tickLine={false} />
                         <YAxis tick={{ fontSize: 10 }} axisLine={false} tickLine={false} tickFormatter={formatValue} />
                         <Tooltip contentStyle={{ borderRadius: '12px', border: 'none', boxShadow: '0 4px 6px -1px rgb(0 0 0 / 0.1)' }} />
-                        <Line type="monotone" dataKey={dataKeys.y} stroke="#6366f1" strokeWidth={3} dot={{ r: 4, fill: '#6366f1', strokeWidth: 2, stroke: '#fff' }} activeDot={{ r: 6 }} />
+                        {keys.map((key, index) => (
+                            <Line key={key} type="monotone" dataKey={key} name={labels?.[key] ?? key} stroke={COLORS[index % COLORS.length]} strokeWidth={3} dot={{ r: 4, fill: COLORS[index % COLORS.length], strokeWidth: 2, stroke: '#fff' }} activeDot={{ r: 6 }} />
+                        ))}
+                        {multiple && <Legend verticalAlign="bottom" height={36} iconType="circle" wrapperStyle={{ fontSize: '11px' }} />}
                     </LineChart>
                 );
             case 'area':
@@ -69,7 +80,10 @@ const ChartRenderer: React.FC<ChartRendererProps> = ({ type, data, title, dataKe
                         <XAxis dataKey={dataKeys.x} tick={{ fontSize: 10 }} axisLine={false} tickLine={false} />
                         <YAxis tick={{ fontSize: 10 }} axisLine={false} tickLine={false} tickFormatter={formatValue} />
                         <Tooltip contentStyle={{ borderRadius: '12px', border: 'none', boxShadow: '0 4px 6px -1px rgb(0 0 0 / 0.1)' }} />
-                        <Area type="monotone" dataKey={dataKeys.y} stroke="#6366f1" fillOpacity={1} fill="url(#colorArea)" />
+                        {keys.map((key, index) => (
+                            <Area key={key} type="monotone" dataKey={key} name={labels?.[key] ?? key} stroke={COLORS[index % COLORS.length]} fillOpacity={1} fill={multiple ? 'none' : 'url(#colorArea)'} />
+                        ))}
+                        {multiple && <Legend verticalAlign="bottom" height={36} iconType="circle" wrapperStyle={{ fontSize: '11px' }} />}
                     </AreaChart>
                 );
             case 'pie':
@@ -3,6 +3,7 @@ import { Send, Loader2, X, ExternalLink, Mic, Square, Paperclip, Bot, User, Spar
 import { useNavigate, useLocation } from 'react-router-dom';
 import api from '../../api/axios';
 import { useChat, type Message } from '../../context/ChatContext';
+import ChartRenderer from './ChartRenderer';
 import ReactMarkdown from 'react-markdown';
 import rehypeHighlight from 'rehype-highlight';
 import remarkGfm from 'remark-gfm';
@@ -434,6 +435,17 @@ const ChatInterface: React.FC<ChatInterfaceProps> = ({ onClose }) => {
                                                 <span>{msg.action.label}</span>
                                             </button>
                                         )}
+                                        {msg.action.type === 'UI_CHART' && msg.action.data && msg.action.dataKeys && (
+                                            <ChartRenderer
+                                                type={msg.action.chart_type || 'bar'}
+                                                data={msg.action.data}
+                                                title={msg.action.title || ''}
+                                                description={msg.action.description || undefined}
+                                                dataKeys={msg.action.dataKeys}
+                                                series={msg.action.series}
+                                                labels={msg.action.labels}
+                                            />
+                                        )}
                                         {msg.action.type === 'CHOICES' && (
                                             <div className="flex flex-wrap gap-2">
                                                 {((index === 0 ? suggestions : msg.action?.choices) || []).map((choice, idx) => (
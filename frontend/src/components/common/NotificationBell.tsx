@@ -7,6 +7,7 @@ import { fr } from 'date-fns/locale';
 import clsx from 'clsx';
 import { useQuery, useMutation, useQueryClient } from '@tanstack/react-query';
 import { requestForToken, onMessageListener } from '../../lib/firebase';
+import { useNotificationSocket, UNREAD_COUNT_KEY } from '../../hooks/useNotificationSocket';
 
 export interface Notification {
     id: string;
@@ -17,6 +18,7 @@ export interface Notification {
     is_read: boolean;
     created_at: string;
     actor_name: string;
+    item_count: number;
 }
 
 interface NotificationBellProps {
@@ -28,6 +30,8 @@ const NotificationBell: React.FC<NotificationBellProps> = ({ direction = 'down',
     const [isOpen, setIsOpen] = useState(false);
     const navigate = useNavigate();
     const queryClient = useQueryClient();
+    // New notifications and read states are pushed over the socket
+    const socketConnected = useNotificationSocket();
 
     // Init Firebase Push Notifications
     useEffect(() => {
@@ -36,11 +40,13 @@ const NotificationBell: React.FC<NotificationBellProps> = ({ direction = 'down',
         onMessageListener()
             .then((payload: any) => {
                 console.log('Received foreground message: ', payload);
-                // Refetch notifications to reflect the new push natively
-                queryClient.invalidateQueries({ queryKey: ['notifications'] });
+                // Refetch notifications to reflect the new push natively (already pushed when the socket is up)
+                if (!socketConnected) {
+                    queryClient.invalidateQueries({ queryKey: ['notifications'] });
+                }
             })
             .catch((err) => console.log('failed: ', err));
-    }, [queryClient]);
+    }, [queryClient, socketConnected]);
 
     // Fetch notifications
     const { data: notifications = [] } = useQuery<Notification[]>({
@@ -52,7 +58,14 @@ const NotificationBell: React.FC<NotificationBellProps> = ({ direction = 'down',
         },
     });
 
-    const unreadCount = notifications.filter(n => !n.is_read).length;
+    // Unread notifications of every page, not only of the first one fetched above
+    const { data: unreadCount = 0 } = useQuery<number>({
+        queryKey: UNREAD_COUNT_KEY,
+        queryFn: async () => {
+            const { data } = await api.get('/notifications/unread_count/');
+            return data.unread_count;
+        },
+    });
 
     // Mark as read mutation
     const markAsReadMutation = useMutation({
@@ -60,7 +73,8 @@ const NotificationBell: React.FC<NotificationBellProps> = ({ direction = 'down',
             await api.post(`/notifications/${id}/mark_read/`);
         },
         onSuccess: () => {
-            queryClient.invalidateQueries({ queryKey: ['notifications'] });
+            // The socket sends the new read state
+            if (!socketConnected) queryClient.invalidateQueries({ queryKey: ['notifications'] });
         },
     });
 
@@ -70,7 +84,7 @@ const NotificationBell: React.FC<NotificationBellProps> = ({ direction = 'down',
             await api.post('/notifications/mark_all_read/');
         },
         onSuccess: () => {
-            queryClient.invalidateQueries({ queryKey: ['notifications'] });
+            if (!socketConnected) queryClient.invalidateQueries({ queryKey: ['notifications'] });
         },
     });
 
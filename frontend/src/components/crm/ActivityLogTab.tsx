@@ -3,6 +3,7 @@ import api from '../../api/axios';
 import { Activity, File, Briefcase, Users, Calendar, CheckSquare } from 'lucide-react';
 import { formatDistanceToNow } from 'date-fns';
 import { fr } from 'date-fns/locale';
+import { onRealtimeMessage } from '../../hooks/useNotificationSocket';
 
 interface ActivityLog {
     id: string;
@@ -43,6 +44,13 @@ const ActivityLogTab: React.FC<ActivityLogTabProps> = ({ spaceId }) => {
         }
     }, [spaceId]);
 
+    // New activity of this space is pushed over the notification socket
+    useEffect(() => onRealtimeMessage((message) => {
+        if (message.type === 'activity.created' && message.space_id === spaceId) {
+            setActivities(current => [message.activity, ...current.filter(a => a.id !== message.activity.id)]);
+        }
+    }), [spaceId]);
+
     const getActionText = (action: string) => {
         switch (action) {
             case 'created': return 'a ajouté';
@@ -8,6 +8,14 @@ export interface Message {
         label?: string;
         url?: string;
         choices?: { label: string; value: string }[];
+        // UI_CHART (ANALYZE_DATA)
+        chart_type?: 'bar' | 'line' | 'pie' | 'area';
+        title?: string;
+        description?: string | null;
+        data?: Record<string, string | number>[];
+        dataKeys?: { x: string; y: string };
+        series?: string[];
+        labels?: Record<string, string>;
     };
     sources?: Array<{
         id: string;
@@ -0,0 +1,105 @@
+import { useEffect, useState } from 'react';
+import { useQueryClient } from '@tanstack/react-query';
+import api from '../api/axios';
+import type { Notification } from '../components/common/NotificationBell';
+
+const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000/api';
+// ws(s)://<backend>/ws/notifications/
+const SOCKET_URL = `${API_URL.replace(/^http/, 'ws').replace(/\/api\/?$/, '')}/ws/notifications/`;
+const CLOSE_UNAUTHORIZED = 4401;
+
+export interface RealtimeMessage {
+    type: string;
+    [key: string]: any;
+}
+
+const listeners = new Set<(message: RealtimeMessage) => void>();
+
+// Lets other components react to pushed messages (e.g. 'activity.created')
+export const onRealtimeMessage = (listener: (message: RealtimeMessage) => void) => {
+    listeners.add(listener);
+    return () => { listeners.delete(listener); };
+};
+
+// Badge count, maintained by the server (NotificationCounter) across all pages
+export const UNREAD_COUNT_KEY = ['notifications', 'unread_count'];
+
+/**
+ * Keeps a WebSocket open to receive notifications as they are created.
+ * The ['notifications'] query and the unread count are updated in place,
+ * nothing is polled while connected.
+ */
+export const useNotificationSocket = () => {
+    const queryClient = useQueryClient();
+    const [connected, setConnected] = useState(false);
+
+    useEffect(() => {
+        let socket: WebSocket | null = null;
+        let retryTimer: number | undefined;
+        let attempts = 0;
+        let hasConnected = false;
+        let stopped = false;
+
+        const connect = () => {
+            const token = localStorage.getItem('access_token');
+            if (!token || stopped) return;
+
+            socket = new WebSocket(`${SOCKET_URL}?token=${encodeURIComponent(token)}`);
+            socket.onopen = () => {
+                attempts = 0;
+                setConnected(true);
+            };
+            socket.onmessage = (event) => {
+                const message: RealtimeMessage = JSON.parse(event.data);
+                if (typeof message.unread_count === 'number') {
+                    // 'hello' and 'notification.read' carry the server counter
+                    queryClient.setQueryData<number>(UNREAD_COUNT_KEY, message.unread_count);
+                } else if (message.type === 'notification.created') {
+                    // A digest that absorbed more events ('notification.updated') stays one unread row
+                    queryClient.setQueryData<number>(UNREAD_COUNT_KEY, (count = 0) => count + 1);
+                }
+                if (message.type === 'notification.created' || message.type === 'notification.updated') {
+                    // A digest that absorbed more events moves back to the top
+                    queryClient.setQueryData<Notification[]>(['notifications'], (current = []) => [
+                        message.notification,
+                        ...current.filter(n => n.id !== message.notification.id),
+                    ]);
+                } else if (message.type === 'notification.read') {
+                    const before = message.before ? new Date(message.before).getTime() : null;
+                    queryClient.setQueryData<Notification[]>(['notifications'], (current = []) =>
+                        current.map(n => (
+                            message.all || message.ids?.includes(n.id) || (before !== null && new Date(n.created_at).getTime() <= before)
+                                ? { ...n, is_read: true }
+                                : n
+                        ))
+                    );
+                } else if (message.type === 'hello' && hasConnected) {
+                    // Reconnected: catch up on what was missed while offline
+                    queryClient.invalidateQueries({ queryKey: ['notifications'] });
+                }
+                if (message.type === 'hello') hasConnected = true;
+                listeners.forEach(listener => listener(message));
+            };
+            socket.onclose = async (event) => {
+                setConnected(false);
+                if (stopped) return;
+                if (event.code === CLOSE_UNAUTHORIZED) {
+                    // Expired access token: any API call refreshes it
+                    await api.get('/users/me/').catch(() => undefined);
+                }
+                const delay = Math.min(1000 * 2 ** attempts, 30000);
+                attempts += 1;
+                retryTimer = window.setTimeout(connect, delay);
+            };
+        };
+
+        connect();
+        return () => {
+            stopped = true;
+            window.clearTimeout(retryTimer);
+            socket?.close();
+        };
+    }, [queryClient]);
+
+    return connected;
+};